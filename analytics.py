@@ -0,0 +1,115 @@
+# analytics.py
+# Cycle-time (created -> completed) analytics over hot + archived completions.
+# Everything here works on whole columns; there are no per-row Python loops.
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+
+from db import Task, ArchivedTaskCount
+from archive import completed_tasks_query
+from events import latest_event_id, TASK_COMPLETED, TASK_STATUS_CHANGED, TASK_DELETED, PROJECT_DELETED
+
+PERCENTILES = (0.5, 0.75, 0.9, 0.95)
+
+# Histogram buckets in hours (left-closed)
+DURATION_BINS = [0, 1, 4, 24, 72, 168, 720, np.inf]
+DURATION_LABELS = ["<1h", "1-4h", "4-24h", "1-3d", "3-7d", "1-4w", "4w+"]
+
+
+# Events that can change which tasks count as completed, or when
+COMPLETION_EVENTS = (TASK_COMPLETED, TASK_STATUS_CHANGED, TASK_DELETED, PROJECT_DELETED)
+
+
+def data_version(db, workspace_id):
+    """Cheap token that changes whenever the completed-task set may have changed.
+
+    Other events (new inbox tasks, milestones, recurrences) leave it alone.
+    """
+    hot = (
+        db.query(func.count(Task.id))
+        .filter(Task.workspace_id == workspace_id, Task.status == "done")
+        .scalar()
+    )
+    cold = (
+        db.query(func.sum(ArchivedTaskCount.done))
+        .filter(ArchivedTaskCount.workspace_id == workspace_id)
+        .scalar()
+    )
+    return (latest_event_id(db, workspace_id, COMPLETION_EVENTS), hot or 0, int(cold or 0))
+
+
+def load_cycle_times(db, workspace_id, limit=None, offset=0):
+    """One row per completed task (newest first) with an `hours` cycle-time column.
+
+    `limit`/`offset` read one page instead of the whole history.
+    """
+    q = completed_tasks_query(workspace_id)
+    if limit is not None:
+        q = q.limit(limit).offset(offset)
+    df = pd.read_sql(q, db.connection())
+    df["created_at"] = pd.to_datetime(df["created_at"])
+    df["completed_at"] = pd.to_datetime(df["completed_at"])
+    df["hours"] = (df["completed_at"] - df["created_at"]).dt.total_seconds() / 3600
+    for col in ("context", "area", "priority"):
+        df[col] = df[col].fillna("-")
+    return df
+
+
+def format_durations(hours):
+    """'2d 3h' / '4h 12m' / '35m' labels for a Series of hours ('-' when unknown)."""
+    total_min = np.floor(hours.clip(lower=0).fillna(0).to_numpy() * 60).astype(np.int64)
+    days, rem = np.divmod(total_min, 1440)
+    hrs, mins = np.divmod(rem, 60)
+    d, h, m = (pd.Series(a, index=hours.index).astype(str) for a in (days, hrs, mins))
+    out = np.where(days > 0, d + "d " + h + "h", np.where(hrs > 0, h + "h " + m + "m", m + "m"))
+    return pd.Series(out, index=hours.index).where(hours.notna(), "-")
+
+
+def cycle_time_summary(df, by):
+    """Count, mean and percentiles of cycle time (hours) per `by` group."""
+    valid = df[df["hours"].notna()]
+    if valid.empty:
+        return pd.DataFrame(columns=[by, "tasks", "mean"] + [f"p{int(p * 100)}" for p in PERCENTILES])
+    g = valid.groupby(by)["hours"]
+    out = g.quantile(list(PERCENTILES)).unstack()
+    out.columns = [f"p{int(p * 100)}" for p in PERCENTILES]
+    out.insert(0, "tasks", g.size())
+    out.insert(1, "mean", g.mean())
+    return out.reset_index().sort_values("tasks", ascending=False)
+
+
+def weekly_throughput(df):
+    """Completed tasks per week (weeks start Monday), gaps filled with 0."""
+    done = df["completed_at"].dropna()
+    if done.empty:
+        return pd.DataFrame({"Week": pd.Series(dtype="datetime64[ns]"), "Tasks": pd.Series(dtype=int)})
+    weeks = done.dt.to_period("W-SUN").dt.start_time
+    counts = weeks.value_counts()
+    idx = pd.date_range(counts.index.min(), counts.index.max(), freq="W-MON")
+    counts = counts.reindex(idx, fill_value=0)
+    return pd.DataFrame({"Week": idx, "Tasks": counts.to_numpy()})
+
+
+def duration_histogram(df):
+    buckets = pd.cut(df["hours"].clip(lower=0), bins=DURATION_BINS, labels=DURATION_LABELS, right=False)
+    counts = buckets.value_counts(sort=False)
+    return pd.DataFrame({"Bucket": counts.index.astype(str), "Tasks": counts.to_numpy()})
+
+
+GROUPS = ("area", "context", "priority")
+
+
+def cycle_time_stats(df):
+    """Everything the Cycle Time tab shows, reduced to aggregates.
+
+    Small enough to cache and copy on every rerun, unlike the per-task frame.
+    """
+    hours = df["hours"].dropna()
+    return {
+        "completed": len(df),
+        "median": hours.quantile(0.5) if len(hours) else None,
+        "p90": hours.quantile(0.9) if len(hours) else None,
+        "summaries": {by: cycle_time_summary(df, by) for by in GROUPS},
+        "histogram": duration_histogram(df),
+        "weekly": weekly_throughput(df),
+    }
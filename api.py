@@ -0,0 +1,380 @@
+# api.py
+# Read-only JSON API over the same models as the dashboard, for clients that
+# shouldn't have to run the Streamlit UI (widgets, cron reports, bots).
+#   uvicorn api:app --port 8600
+#
+# The workspace comes from the bearer token, never from the request itself.
+# DASHBOARD_API_TOKENS maps tokens to workspaces ("tok1=alice@x.com,tok2=bob@y.com");
+# DASHBOARD_API_TOKEN is a single token for DASHBOARD_WORKSPACE. With no tokens
+# configured the API is anonymous and limited to DASHBOARD_WORKSPACE.
+# Responses carry a weak ETag derived from cheap per-table versions (count,
+# max id, max updated_at), so a poll that matches If-None-Match gets a 304
+# before the real query runs. Bodies are gzipped when the client accepts it.
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs
+
+from sqlalchemy import func
+
+from db import (
+    init_db, SessionLocal, scoped, DEFAULT_WORKSPACE,
+    Project, System, Experiment, Task, ArchivedTaskCount, Event
+)
+from archive import archived_done_by_area
+from events import read_events
+
+ANONYMOUS_WORKSPACE = os.environ.get("DASHBOARD_WORKSPACE", DEFAULT_WORKSPACE)
+
+
+def _load_tokens():
+    """{token: workspace} from the environment."""
+    tokens = {}
+    for pair in os.environ.get("DASHBOARD_API_TOKENS", "").split(","):
+        token, sep, ws = pair.strip().rpartition("=")
+        if sep and token and ws:
+            tokens[token] = ws
+    single = os.environ.get("DASHBOARD_API_TOKEN")
+    if single:
+        tokens[single] = ANONYMOUS_WORKSPACE
+    return tokens
+
+API_TOKENS = _load_tokens()
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+GZIP_MIN_BYTES = 1024
+
+EXPERIMENT_SORT_COLUMNS = {
+    "sharpe": Experiment.sharpe,
+    "cagr": Experiment.cagr,
+    "max_drawdown": Experiment.max_drawdown,
+    "win_rate": Experiment.win_rate,
+    "rr_ratio": Experiment.rr_ratio,
+    "trades": Experiment.trades,
+    "run_date": Experiment.run_date,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# --------- SERIALISATION ---------
+
+def _row(obj, fields):
+    return {f: getattr(obj, f) for f in fields}
+
+TASK_FIELDS = (
+    "id", "title", "description", "status", "area", "priority", "due_date",
+    "created_at", "completed_at", "project_id", "system_id",
+    "is_today_focus", "is_milestone", "is_active_milestone",
+)
+PROJECT_FIELDS = ("id", "name", "description", "status", "area", "created_at", "target_date")
+SYSTEM_FIELDS = (
+    "id", "name", "description", "status", "system_type", "repo_url",
+    "platform", "created_at", "project_id",
+)
+EXPERIMENT_FIELDS = (
+    "id", "name", "system_id", "run_date", "period", "qc_url", "code_version",
+    "sharpe", "max_drawdown", "cagr", "win_rate", "rr_ratio", "trades",
+    "notes", "decision",
+)
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"not JSON serialisable: {type(value).__name__}")
+
+
+# --------- PARAMS ---------
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+def _int_param(params, name, default=None, lo=None, hi=None):
+    raw = _param(params, name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer")
+    if lo is not None and value < lo:
+        raise ApiError(400, f"'{name}' must be >= {lo}")
+    return min(value, hi) if hi is not None else value
+
+def _limit(params):
+    return _int_param(params, "limit", DEFAULT_LIMIT, lo=1, hi=MAX_LIMIT)
+
+def _keyset_page(q, model, params, fields):
+    # Cursor pagination on id: ?after=<last id seen>
+    after = _int_param(params, "after", 0, lo=0)
+    limit = _limit(params)
+    rows = q.filter(model.id > after).order_by(model.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [_row(r, fields) for r in rows],
+        "next": rows[-1].id if has_more else None,
+    }
+
+
+# --------- HANDLERS ---------
+
+def list_tasks(db, ws, params):
+    q = scoped(db, Task, ws)
+    status = _param(params, "status")
+    if status:
+        q = q.filter(Task.status.in_(status.split(",")))
+    project_id = _int_param(params, "project_id")
+    if project_id is not None:
+        q = q.filter(Task.project_id == project_id)
+    if _param(params, "milestone") in ("1", "true"):
+        q = q.filter(Task.is_milestone == True)
+    return _keyset_page(q, Task, params, TASK_FIELDS)
+
+def get_task(db, ws, params, task_id):
+    t = scoped(db, Task, ws).filter(Task.id == int(task_id)).first()
+    if not t:
+        raise ApiError(404, "task not found")
+    return _row(t, TASK_FIELDS)
+
+def list_projects(db, ws, params):
+    q = scoped(db, Project, ws)
+    area = _param(params, "area")
+    if area:
+        q = q.filter(Project.area.in_(area.split(",")))
+    page = _keyset_page(q, Project, params, PROJECT_FIELDS)
+    # Open task counts for the page in one grouped query
+    ids = [p["id"] for p in page["items"]]
+    open_counts = dict(
+        scoped(db, Task, ws)
+        .with_entities(Task.project_id, func.count(Task.id))
+        .filter(Task.project_id.in_(ids), Task.status != "done")
+        .group_by(Task.project_id)
+        .all()
+    ) if ids else {}
+    for p in page["items"]:
+        p["open_tasks"] = open_counts.get(p["id"], 0)
+    return page
+
+def get_project(db, ws, params, project_id):
+    p = scoped(db, Project, ws).filter(Project.id == int(project_id)).first()
+    if not p:
+        raise ApiError(404, "project not found")
+    return _row(p, PROJECT_FIELDS)
+
+def list_systems(db, ws, params):
+    return _keyset_page(scoped(db, System, ws), System, params, SYSTEM_FIELDS)
+
+def list_experiments(db, ws, params, system_id):
+    system_id = int(system_id)
+    if not scoped(db, System, ws).filter(System.id == system_id).count():
+        raise ApiError(404, "system not found")
+    q = scoped(db, Experiment, ws).filter(Experiment.system_id == system_id)
+    decision = _param(params, "decision")
+    if decision:
+        q = q.filter(Experiment.decision.in_(decision.split(",")))
+
+    sort = _param(params, "sort", "run_date")
+    if sort not in EXPERIMENT_SORT_COLUMNS:
+        raise ApiError(400, f"'sort' must be one of {', '.join(EXPERIMENT_SORT_COLUMNS)}")
+    # Same order as the dashboard table, so one (system_id, <metric>, id) index scan serves it
+    col = EXPERIMENT_SORT_COLUMNS[sort]
+    if _param(params, "order") == "asc":
+        order = (col.asc().nulls_first(), Experiment.id.asc())
+    else:
+        order = (col.desc().nulls_last(), Experiment.id.desc())
+
+    # Sorted on arbitrary metrics, so offset paging
+    limit = _limit(params)
+    offset = _int_param(params, "offset", 0, lo=0)
+    rows = q.order_by(*order).offset(offset).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    return {
+        "items": [_row(e, EXPERIMENT_FIELDS) for e in rows[:limit]],
+        "next": offset + limit if has_more else None,
+    }
+
+def dashboard_summary(db, ws, params):
+    # Same figures as Mission Control, computed with aggregates instead of loading rows
+    counts = (
+        scoped(db, Task, ws)
+        .with_entities(func.coalesce(Task.area, ""), Task.status == "done", func.count(Task.id))
+        .group_by(func.coalesce(Task.area, ""), Task.status == "done")
+        .all()
+    )
+    archived = archived_done_by_area(db, ws)
+    areas = {}
+    for area, is_done, n in counts:
+        a = areas.setdefault(area, {"done": archived.get(area, 0), "open": 0})
+        a["done" if is_done else "open"] += n
+    for area, n in archived.items():
+        areas.setdefault(area, {"done": n, "open": 0})
+    for a in areas.values():
+        total = a["done"] + a["open"]
+        a["ratio"] = a["done"] / total if total else 0
+
+    today = datetime.now().date()
+    ms = (
+        scoped(db, Task, ws)
+        .filter(Task.is_active_milestone == True, Task.status != "done")
+        .first()
+    )
+    since = datetime.combine(today - timedelta(days=6), datetime.min.time())
+    per_day = (
+        scoped(db, Task, ws)
+        .with_entities(func.date(Task.completed_at), func.count(Task.id))
+        .filter(Task.status == "done", Task.completed_at >= since)
+        .group_by(func.date(Task.completed_at))
+        .all()
+    )
+    per_day = {str(d): n for d, n in per_day}
+    return {
+        "areas": areas,
+        "open_tasks": sum(a["open"] for a in areas.values()),
+        "milestone": {
+            **_row(ms, ("id", "title", "due_date")),
+            "days_remaining": (ms.due_date.date() - today).days if ms.due_date else None,
+        } if ms else None,
+        "last_7_days": [
+            {"date": (today - timedelta(days=i)).isoformat(), "tasks": per_day.get((today - timedelta(days=i)).isoformat(), 0)}
+            for i in range(6, -1, -1)
+        ],
+    }
+
+def list_events(db, ws, params):
+    after = _int_param(params, "after", 0, lo=0)
+    items = read_events(db, after, ws, limit=_limit(params))
+    return {"items": items, "next": items[-1]["id"] if items else after}
+
+
+# (path pattern, handler, tables the response is built from)
+ROUTES = [
+    (re.compile(r"^/api/tasks/?$"), list_tasks, (Task,)),
+    (re.compile(r"^/api/tasks/(\d+)$"), get_task, (Task,)),
+    (re.compile(r"^/api/projects/?$"), list_projects, (Project, Task)),
+    (re.compile(r"^/api/projects/(\d+)$"), get_project, (Project,)),
+    (re.compile(r"^/api/systems/?$"), list_systems, (System,)),
+    (re.compile(r"^/api/systems/(\d+)/experiments/?$"), list_experiments, (System, Experiment)),
+    (re.compile(r"^/api/summary/?$"), dashboard_summary, (Task, ArchivedTaskCount)),
+    (re.compile(r"^/api/events/?$"), list_events, (Event,)),
+]
+
+
+def _table_version(db, ws, model):
+    # Any insert, update or delete in the workspace moves at least one of these
+    cols = [func.count()]
+    if hasattr(model, "id"):
+        cols.append(func.max(model.id))
+    if hasattr(model, "updated_at"):
+        cols.append(func.max(model.updated_at))
+    if model is ArchivedTaskCount:
+        cols.append(func.sum(model.done))
+    return tuple(db.query(*cols).filter(model.workspace_id == ws).one())
+
+
+def _etag(db, ws, path, params, tables):
+    """Weak validator for a response, computed without running its query."""
+    # The date is in the key because the summary's day windows move at midnight
+    key = [path, sorted(params.items()), ws, date.today().isoformat()]
+    key += [_table_version(db, ws, m) for m in tables]
+    return 'W/"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+
+
+def _etag_matches(header, etag):
+    # Weak comparison (RFC 9110): W/ prefixes are ignored on both sides
+    if header is None:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def workspace_for(headers):
+    """The caller's workspace, or None if the request isn't authorised."""
+    if not API_TOKENS:
+        return ANONYMOUS_WORKSPACE
+    auth = headers.get("authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    given = auth[len("Bearer "):].encode()
+    for token, ws in API_TOKENS.items():
+        if hmac.compare_digest(given, token.encode()):
+            return ws
+    return None
+
+
+def handle(path, params, headers):
+    """Route a GET request; returns (status, payload, etag).
+
+    A matching If-None-Match returns (304, None, etag) without running the handler.
+    """
+    ws = workspace_for(headers)
+    if ws is None:
+        return 401, {"error": "unauthorised"}, None
+    for pattern, handler, tables in ROUTES:
+        m = pattern.match(path)
+        if not m:
+            continue
+        db = SessionLocal()
+        try:
+            etag = _etag(db, ws, path, params, tables)
+            if _etag_matches(headers.get("if-none-match"), etag):
+                return 304, None, etag
+            return 200, handler(db, ws, params, *m.groups()), etag
+        except ApiError as e:
+            return e.status, {"error": e.message}, None
+        finally:
+            db.close()
+    return 404, {"error": "not found"}, None
+
+
+# --------- ASGI ---------
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                init_db()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    if scope["method"] not in ("GET", "HEAD"):
+        status, payload, etag = 405, {"error": "method not allowed"}, None
+    else:
+        params = parse_qs(scope.get("query_string", b"").decode())
+        # The ORM is synchronous; keep it off the event loop
+        status, payload, etag = await asyncio.to_thread(handle, scope["path"], params, headers)
+
+    body = b"" if status == 304 else json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+    out_headers = [
+        (b"content-type", b"application/json"),
+        (b"cache-control", b"no-cache"),
+        (b"vary", b"Accept-Encoding, Authorization"),
+    ]
+    if etag:
+        # Weak, so the gzip and identity encodings of one response may share it
+        out_headers.append((b"etag", etag.encode()))
+
+    if status != 304 and len(body) >= GZIP_MIN_BYTES and "gzip" in headers.get("accept-encoding", ""):
+        body = gzip.compress(body, compresslevel=5)
+        out_headers.append((b"content-encoding", b"gzip"))
+
+    out_headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": out_headers})
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
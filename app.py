@@ -1,18 +1,49 @@
 # app.py
+import os
 import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import datetime, timedelta, date
 from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from contextlib import contextmanager
 from db import (
-    init_db, SessionLocal,
-    Project, System, Experiment, Task
+    init_db, SessionLocal, scoped, DEFAULT_WORKSPACE,
+    Project, System, Experiment, Task, RecurrenceRule,
+    PRIORITIES, SYSTEM_STATUSES, DECISIONS, priority_rank
 )
+from archive import (
+    archived_done_by_area, archived_done_for_project,
+    purge_project_archive
+)
+from analytics import data_version, load_cycle_times, format_durations, cycle_time_stats
+from events import record_event, PROJECT_CREATED, PROJECT_DELETED
+from writes import (
+    with_retry, add_task, complete_task, delete_task,
+    activate_milestone, create_milestone, CONFLICT_ERRORS
+)
+from charts import RANGES as CHART_RANGES, activity_series, experiment_series, layered
+from regressions import find_regressions, regression_table
+import sync
+from dependencies import (
+    add_dependency, remove_dependency, set_estimate, detach,
+    prerequisites, critical_path, slack_days
+)
+from recurrence import materialize, add_rule, stop_rule, describe, FREQUENCIES
+
+# Initialize DB: schema checks and migrations run once per process, not on every rerun
+@st.cache_resource(show_spinner=False)
+def init_database():
+    init_db()
+    return True
+
+init_database()
 
-# Initialize DB
-init_db()
+# Background push/pull when running on a local replica (DASHBOARD_REPLICA); else a no-op.
+# Called every rerun: it only starts a thread when none is alive.
+sync.start()
 
 # --------- APP CONFIG ---------
 
@@ -182,6 +213,19 @@ h1, h2, h3 {{
 """
 st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
 
+# --------- WORKSPACE ---------
+
+def current_workspace():
+    # Logged-in users (st.login) get their own workspace; anyone else only sees
+    # DASHBOARD_WORKSPACE. Never taken from the URL, so it can't be picked.
+    user = getattr(st, "user", None)
+    if user is not None and user.get("is_logged_in") and user.get("email"):
+        return user.get("email")
+    return os.environ.get("DASHBOARD_WORKSPACE", DEFAULT_WORKSPACE)
+
+def reset_route():
+    st.query_params.clear()
+
 def render_nav_bar():
     # Detect current page from query params
     # Using st.query_params directly (dict-like)
@@ -191,9 +235,9 @@ def render_nav_bar():
 
     if project_id:
         db = SessionLocal()
-        proj = db.query(Project).filter(Project.id == project_id).first()
+        proj = scoped(db, Project, current_workspace()).filter(Project.id == project_id).first()
         if proj:
-            area = (proj.area or "").lower()
+            area = proj.area
             if area in ["research", "writing", "paper"]:
                 current_page = "research"
             elif area in ["trading", "algo", "patent", "business"]:
@@ -206,7 +250,9 @@ def render_nav_bar():
         {"id": "home", "label": "Mission Control", "icon": "🌊"},
         {"id": "research", "label": "Research Hub", "icon": "🧪"},
         {"id": "business", "label": "Business Hub", "icon": "💼"},
+        {"id": "systems", "label": "Systems", "icon": "⚙️"},
         {"id": "milestones", "label": "Milestones", "icon": "🏁"},
+        {"id": "timeline", "label": "Timeline", "icon": "📅"},
         {"id": "history", "label": "History", "icon": "📜"}
     ]
 
@@ -221,210 +267,247 @@ def render_nav_bar():
     
     st.markdown(nav_html, unsafe_allow_html=True)
 
+def render_sync_status():
+    # Replica mode only: what the background sync last saw
+    if sync.primary_engine is None:
+        return
+    s = sync.status
+    with st.sidebar:
+        st.markdown("**Sync**")
+        if s["online"] is None:
+            st.caption("Connecting to the primary…")
+        elif s["online"] and not s["error"]:
+            st.caption(f"🟢 Online · last sync {s['last_sync']:%H:%M:%S}")
+        elif s["online"] is False:
+            st.caption("🔴 Offline: changes are kept locally")
+        if s["error"]:
+            st.error(f"Sync error: {s['error']}")
+        st.caption(f"{s['queued']} changes queued")
+        if s["conflicts"]:
+            st.warning(f"{s['conflicts']} local changes rejected by the primary")
+        if s["clashes"]:
+            st.caption(f"{s['clashes']} remote rows skipped (clash with unpushed local rows)")
+
 
 # --------- HELPERS (Data Fetching) ---------
 
+def run_write(db, apply):
+    """with_retry() for a UI action: True once committed, else shows why and returns False."""
+    try:
+        with_retry(db, apply)
+        return True
+    except CONFLICT_ERRORS as e:
+        if isinstance(e, IntegrityError):
+            st.error("That change conflicts with existing data and wasn't saved.")
+        else:
+            st.error("This item is busy or was changed in another session. Try again.")
+        return False
+
 @contextmanager
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
 
-def get_data(db):
-    tasks = db.query(Task).all()
-    
-    # Areas
-    by_area = defaultdict(list)
-    for t in tasks: by_area[(t.area or "").lower()].append(t)
-    
-    def calc_stats(tl):
-        if not tl: return 0,0,0
-        d = len([x for x in tl if x.status=='done'])
-        return d/len(tl), d, len(tl)-d
-
-    r_stats = calc_stats(by_area['research'])
-    t_stats = calc_stats(by_area['trading'])
-    
-    # Pending
-    pending = [t for t in tasks if t.status in ['inbox','next','doing']]
-    p_map = {'high':3, 'medium':2, 'low':1}
-    pending.sort(key=lambda x: (-p_map.get((x.priority or '').lower(),1), x.due_date or datetime.max))
-    
-    # Milestone (Explicitly chosen by user)
-    active_m = db.query(Task).filter(Task.is_active_milestone == True, Task.status != 'done').first()
-    if not active_m:
-        # Fallback: Nearest high priority task with due date
-        future = [t for t in pending if t.due_date and t.due_date.date() >= datetime.now().date() and (t.priority or '').lower() == 'high']
-        future.sort(key=lambda x: x.due_date)
-        active_m = future[0] if future else None
-        
-    milestone = (active_m, (active_m.due_date.date() - datetime.now().date()).days if active_m and active_m.due_date else 0) if active_m else (None, 0)
-
-    # Activity (Chart Data - Last 7 Days)
-    completed = [t for t in tasks if t.status=='done' and t.completed_at]
-    today = datetime.now().date()
-    dates = [today - timedelta(days=i) for i in range(6, -1, -1)] # This creates Mon, Tue, ... order ending today
-    
-    daily_counts = {d: 0 for d in dates}
-    for t in completed:
-        d = t.completed_at.date()
-        if d in daily_counts:
-            daily_counts[d] += 1
-            
-    history_df = pd.DataFrame({
-        "Date": dates,
-        "Day": [d.strftime("%a") for d in dates],
-        "Tasks": [daily_counts[d] for d in dates]
-    })
-
-    # Projects
-    projects = db.query(Project).all()
-    
-    # Categorize Projects (not tasks)
-    papers_proj = [p for p in projects if (p.area or '').lower() == 'paper']
-    algos_proj = [p for p in projects if (p.area or '').lower() == 'algo']
-    patents_proj = [p for p in projects if (p.area or '').lower() == 'patent']
-    research_proj = [p for p in projects if (p.area or '').lower() == 'research']
-    trading_proj = [p for p in projects if (p.area or '').lower() == 'trading']
-
-    return {
-        'research': r_stats,
-        'trading': t_stats,
-        'pending': pending[:6],
-        'papers': papers_proj,
-        'algos': algos_proj,
-        'patents': patents_proj,
-        'research_proj': research_proj,
-        'trading_proj': trading_proj,
-        'milestone': milestone,
-        'history_df': history_df
-    }
-
-def add_task_ui(db, area):
+def add_task_ui(db, area, ws):
     with st.form(key=f"add_{area}", clear_on_submit=True):
         c1, c2 = st.columns([3,1])
         title = c1.text_input("Task", label_visibility="collapsed", placeholder=f"New {area} task...")
-        prio = c2.selectbox("Prio", ["low","medium","high"], index=1, label_visibility="collapsed")
+        prio = c2.selectbox("Prio", PRIORITIES, index=1, label_visibility="collapsed")
         if st.form_submit_button("Add"):
             if title:
-                db.add(Task(
+                if run_write(db, lambda db: add_task(
+                    db, ws,
                     title=title, status="inbox", area=area, priority=prio,
                     created_at=datetime.now(), due_date=datetime.now()
-                ))
-                db.commit()
-                st.rerun()
+                )):
+                    st.rerun()
 
-# --------- MAIN LAYOUT ---------
+# --------- HOME WIDGETS ---------
+# Each home panel runs its own query inside st.fragment, so interacting with one
+# panel (e.g. the chart range) reruns only that panel. Writes still call
+# st.rerun(), since they can change what the other panels show.
 
-def page_home():
+HOME_WIDGETS = {}
+
+def home_widget(key, label, column):
+    def register(render):
+        HOME_WIDGETS[key] = {"label": label, "column": column, "render": st.fragment(render)}
+        return render
+    return register
+
+FOCUS_AREAS = ["research", "trading"]
+
+def focus_stats(db, ws):
+    """{area: (done ratio, done, open)}; archived tasks count as done."""
+    area = Task.area
+    is_done = Task.status == 'done'
+    rows = (
+        scoped(db, Task, ws)
+        .with_entities(area, is_done, func.count(Task.id))
+        .filter(area.in_(FOCUS_AREAS))
+        .group_by(area, is_done)
+        .all()
+    )
+    archived = archived_done_by_area(db, ws)
+    stats = {}
+    for a in FOCUS_AREAS:
+        done = sum(n for ar, d, n in rows if ar == a and d) + archived.get(a, 0)
+        total = sum(n for ar, d, n in rows if ar == a) + archived.get(a, 0)
+        stats[a] = (done / total, done, total - done) if total else (0, 0, 0)
+    return stats
+
+def current_milestone(db, ws):
+    """(task, days remaining) for the active milestone, else the nearest high-priority due task."""
+    ms = scoped(db, Task, ws).filter(Task.is_active_milestone == True, Task.status != 'done').first()
+    if not ms:
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        ms = (
+            scoped(db, Task, ws)
+            .filter(Task.status.in_(['inbox', 'next', 'doing']), Task.due_date >= today, Task.priority == 'high')
+            .order_by(Task.due_date)
+            .first()
+        )
+    days = (ms.due_date.date() - datetime.now().date()).days if ms and ms.due_date else 0
+    return ms, days
+
+def project_groups(db, ws):
+    """{area: [project rows with open_tasks]} from one grouped query."""
+    open_counts = (
+        scoped(db, Task, ws)
+        .with_entities(Task.project_id, func.count(Task.id).label("n"))
+        .filter(Task.status != 'done', Task.project_id.isnot(None))
+        .group_by(Task.project_id)
+        .subquery()
+    )
+    rows = (
+        scoped(db, Project, ws)
+        .outerjoin(open_counts, open_counts.c.project_id == Project.id)
+        .with_entities(
+            Project.id, Project.name, Project.description,
+            Project.area,
+            func.coalesce(open_counts.c.n, 0).label("open_tasks")
+        )
+        .order_by(Project.id)
+        .all()
+    )
+    groups = defaultdict(list)
+    for r in rows:
+        groups[r.area or ''].append(r)
+    return groups
+
+@home_widget("milestone", "Big Goal", 0)
+def widget_milestone(ws):
+    st.markdown('<div class="sa-section-head">Big Goal</div>', unsafe_allow_html=True)
     with get_db() as db:
-        data = get_data(db)
+        ms, days = current_milestone(db, ws)
+        if ms:
+            # Stored earliest finish: no graph walk here, only the short critical chain
+            slack = slack_days(ms)
+            path = critical_path(db, ws, ms.id)
+            html_parts = []
+            html_parts.append(f"""<div style="background: {ONYX}; border-radius:24px; padding:2.5rem 2rem; position: relative; overflow: hidden; box-shadow: 0 10px 30px rgba(0,0,0,0.1);">""")
+            html_parts.append(f"""    <div style="position: absolute; top: -50%; left: -50%; width: 200%; height: 200%; background: radial-gradient(circle, rgba(255, 255, 255, 0.05) 0%, rgba(0,0,0,0) 50%);"></div>""")
+            html_parts.append(f"""    <div style="position: relative; z-index: 1;">""")
+            html_parts.append(f"""            <div style="font-size:0.85rem; font-weight:700; color:#94A3B8; text-transform:uppercase; letter-spacing:0.1em; margin-bottom:0.5rem;">Next Milestone</div>""")
+            html_parts.append(f"""            <div style="font-size:3.5rem; font-weight:800; color:#FFFFFF; line-height:1; letter-spacing:-0.03em;">""")
+            html_parts.append(f"""            {days}<span style="font-size:1rem; font-weight:600; color:#94A3B8; margin-left:8px; vertical-align:middle;">DAYS REMAINING</span>""")
+            html_parts.append(f"""        </div>""")
+            html_parts.append(f"""            <div style="margin: 1.5rem 0; height: 6px; width: 100%; background: #1E293B; border-radius: 100px; overflow:hidden;">""")
+            html_parts.append(f"""            <div style="height: 100%; width: {max(0, min(100, 100 - (days*5)))}%; background: #FFFFFF; border-radius: 100px;"></div>""")
+            html_parts.append(f"""        </div>""")
+            html_parts.append(f"""        <div style="font-size:1.5rem; font-weight:700; color:#FFFFFF; line-height:1.3;">""")
+            html_parts.append(f"""            "{ms.title}" """)
+            html_parts.append(f"""        </div>""")
+            html_parts.append(f"""            <div style="margin-top:1.5rem; display:inline-flex; align-items:center; gap:8px; padding: 8px 16px; background:rgba(255,255,255,0.05); border-radius:100px; border:1px solid rgba(255,255,255,0.1);">""")
+            html_parts.append(f"""            <span>🏁</span>""")
+            html_parts.append(f"""            <span style="font-size:0.85rem; font-weight:500; color:#E2E8F0;">Target: {ms.due_date.strftime('%b %d')}</span>""")
+            html_parts.append(f"""        </div>""")
+            if path and slack is not None:
+                slack_txt = f"{slack:+.1f} days slack" if slack >= 0 else f"{-slack:.1f} days behind"
+                slack_color = "#86EFAC" if slack >= 0 else "#FCA5A5"
+                html_parts.append(f"""        <div style="margin-top:1rem; font-size:0.85rem; font-weight:700; color:{slack_color};">{slack_txt}</div>""")
+                html_parts.append(f"""        <div style="margin-top:0.25rem; font-size:0.75rem; color:#94A3B8;">Critical path: {" → ".join(t.title for t in path[:3])}{f" +{len(path) - 3} more" if len(path) > 3 else ""}</div>""")
+            html_parts.append(f"""    </div>""")
+            html_parts.append(f"""</div>""")
+            
+            card_html = "".join(html_parts)
+            st.markdown(card_html, unsafe_allow_html=True)
+        else:
+            st.info("No active milestone.")
+
+@home_widget("activity", "Historical Performance", 0)
+def widget_activity(ws):
+    with get_db() as db:
+        # Historical Performance (Altair Chart)
+        st.markdown('<div class="sa-section-head">Historical Performance</div>', unsafe_allow_html=True)
         
-        # Header
-        c_head, c_date = st.columns([3, 1])
-        c_head.markdown(f"## Mission Control")
-        c_date.markdown(f"<div style='text-align:right; color:{SLATE}; font-weight:600;'>{datetime.now().strftime('%A, %B %d')}</div>", unsafe_allow_html=True)
+        range_label = st.selectbox("Range", list(CHART_RANGES), key="home_range", label_visibility="collapsed")
+        # Pre-aggregated and bucketed server-side; the spec carries at most MAX_POINTS rows
+        hist, unit = activity_series(db, ws, CHART_RANGES[range_label])
+        wk_total = hist['Tasks'].sum()
+        avg = hist['Tasks'].mean()
+        dense = len(hist) <= 31
         
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        # 3-Column Grid for Condensed View
-        col1, col2, col3 = st.columns([1.1, 1.1, 1.4], gap="large")
-
-        # --- COLUMN 1: THE DRIVER (Goal + Historical Perf) ---
-        with col1:
-            # Milestone
-            st.markdown('<div class="sa-section-head">Big Goal</div>', unsafe_allow_html=True)
-            ms, days = data['milestone']
-            if ms:
-                html_parts = []
-                html_parts.append(f"""<div style="background: {ONYX}; border-radius:24px; padding:2.5rem 2rem; position: relative; overflow: hidden; box-shadow: 0 10px 30px rgba(0,0,0,0.1);">""")
-                html_parts.append(f"""    <div style="position: absolute; top: -50%; left: -50%; width: 200%; height: 200%; background: radial-gradient(circle, rgba(255, 255, 255, 0.05) 0%, rgba(0,0,0,0) 50%);"></div>""")
-                html_parts.append(f"""    <div style="position: relative; z-index: 1;">""")
-                html_parts.append(f"""            <div style="font-size:0.85rem; font-weight:700; color:#94A3B8; text-transform:uppercase; letter-spacing:0.1em; margin-bottom:0.5rem;">Next Milestone</div>""")
-                html_parts.append(f"""            <div style="font-size:3.5rem; font-weight:800; color:#FFFFFF; line-height:1; letter-spacing:-0.03em;">""")
-                html_parts.append(f"""            {days}<span style="font-size:1rem; font-weight:600; color:#94A3B8; margin-left:8px; vertical-align:middle;">DAYS REMAINING</span>""")
-                html_parts.append(f"""        </div>""")
-                html_parts.append(f"""            <div style="margin: 1.5rem 0; height: 6px; width: 100%; background: #1E293B; border-radius: 100px; overflow:hidden;">""")
-                html_parts.append(f"""            <div style="height: 100%; width: {max(0, min(100, 100 - (days*5)))}%; background: #FFFFFF; border-radius: 100px;"></div>""")
-                html_parts.append(f"""        </div>""")
-                html_parts.append(f"""        <div style="font-size:1.5rem; font-weight:700; color:#FFFFFF; line-height:1.3;">""")
-                html_parts.append(f"""            "{ms.title}" """)
-                html_parts.append(f"""        </div>""")
-                html_parts.append(f"""            <div style="margin-top:1.5rem; display:inline-flex; align-items:center; gap:8px; padding: 8px 16px; background:rgba(255,255,255,0.05); border-radius:100px; border:1px solid rgba(255,255,255,0.1);">""")
-                html_parts.append(f"""            <span>🏁</span>""")
-                html_parts.append(f"""            <span style="font-size:0.85rem; font-weight:500; color:#E2E8F0;">Target: {ms.due_date.strftime('%b %d')}</span>""")
-                html_parts.append(f"""        </div>""")
-                html_parts.append(f"""    </div>""")
-                html_parts.append(f"""</div>""")
-                
-                card_html = "".join(html_parts)
-                st.markdown(card_html, unsafe_allow_html=True)
-            else:
-                st.info("No active milestone.")
-
-            # Historical Performance (Altair Chart)
-            st.markdown('<div class="sa-section-head">Historical Performance</div>', unsafe_allow_html=True)
-            
-            hist = data['history_df']
-            wk_total = hist['Tasks'].sum()
-            avg = hist['Tasks'].mean()
-            
-            # Stats summary
-            st.markdown(
-                f"""
-                <div style="display:flex; justify-content:space-between; margin-bottom:12px; padding:0 8px;">
-                    <div>
-                        <div style="font-size:1.5rem; font-weight:800; color:{ONYX}; line-height:1;">{wk_total}</div>
-                        <div style="font-size:0.65rem; color:{SLATE}; text-transform:uppercase; font-weight:600; margin-top:4px;">Last 7 Days</div>
-                    </div>
-                    <div style="text-align:right;">
-                        <div style="font-size:1.5rem; font-weight:800; color:{ONYX}; line-height:1;">{avg:.1f}</div>
-                        <div style="font-size:0.65rem; color:{SLATE}; text-transform:uppercase; font-weight:600; margin-top:4px;">Daily Avg</div>
-                    </div>
+        # Stats summary
+        st.markdown(
+            f"""
+            <div style="display:flex; justify-content:space-between; margin-bottom:12px; padding:0 8px;">
+                <div>
+                    <div style="font-size:1.5rem; font-weight:800; color:{ONYX}; line-height:1;">{wk_total}</div>
+                    <div style="font-size:0.65rem; color:{SLATE}; text-transform:uppercase; font-weight:600; margin-top:4px;">{"All Time" if range_label == "All" else f"Last {range_label}"}</div>
                 </div>
-                """, unsafe_allow_html=True
-            )
-            
-            # Chart - "Your Statistics" Style
-            # Ensure chronological order
-            base = alt.Chart(hist).encode(
-                x=alt.X('Day', sort=alt.SortField(field="Date", order="ascending"), 
-                      axis=alt.Axis(labelAngle=0, grid=False, title=None, labelColor=SLATE, tickSize=0, domain=False))
-            )
+                <div style="text-align:right;">
+                    <div style="font-size:1.5rem; font-weight:800; color:{ONYX}; line-height:1;">{avg:.1f}</div>
+                    <div style="font-size:0.65rem; color:{SLATE}; text-transform:uppercase; font-weight:600; margin-top:4px;">Avg / {unit}</div>
+                </div>
+            </div>
+            """, unsafe_allow_html=True
+        )
+        
+        # Chart - "Your Statistics" Style
+        # The layers carry no data of their own; they all read the "activity" dataset
+        x_axis = alt.Axis(
+            labelAngle=0, grid=False, title=None, labelColor=SLATE, tickSize=0, domain=False,
+            format="%a" if range_label == "7D" else "%b %d" if unit == "day" else "%b %y"
+        )
+        base = alt.Chart().encode(x=alt.X('Date:T', axis=x_axis))
 
-            # Layer 1: Smooth Line
-            line = base.mark_line(
-                interpolate='monotone',
-                stroke=ACCENT_PRIMARY,
-                strokeWidth=4
-            ).encode(
-                y=alt.Y('Tasks', axis=alt.Axis(grid=False, title=None, tickMinStep=1, labelColor=SLATE, tickSize=0, domain=False))
-            )
-            
-            # Layer 2: Subtle Area (No gradient)
-            area = base.mark_area(
-                interpolate='monotone',
-                opacity=0.05,
-                color=ACCENT_PRIMARY
-            ).encode(
-                y='Tasks'
-            )
+        # Layer 1: Smooth Line
+        line = base.mark_line(
+            interpolate='monotone',
+            stroke=ACCENT_PRIMARY,
+            strokeWidth=4 if dense else 2
+        ).encode(
+            y=alt.Y('Tasks:Q', axis=alt.Axis(grid=False, title=None, tickMinStep=1, labelColor=SLATE, tickSize=0, domain=False))
+        )
+        
+        # Layer 2: Subtle Area (No gradient)
+        area = base.mark_area(
+            interpolate='monotone',
+            opacity=0.05,
+            color=ACCENT_PRIMARY
+        ).encode(
+            y='Tasks:Q'
+        )
 
-            
-            # Layer 3: Points
-            points = base.mark_circle(
-                size=80,
-                color=PURE_WHITE,
-                opacity=1,
-                stroke=ACCENT_PRIMARY,
-                strokeWidth=3
-            ).encode(
-                y='Tasks',
-                tooltip=['Date', 'Tasks']
-            )
-            
-            # Layer 4: Floating Labels
-            text = base.mark_text(
+        
+        # Layer 3: Points
+        points = base.mark_circle(
+            size=80 if dense else 20,
+            color=PURE_WHITE,
+            opacity=1,
+            stroke=ACCENT_PRIMARY,
+            strokeWidth=3 if dense else 1
+        ).encode(
+            y='Tasks:Q',
+            tooltip=[alt.Tooltip('Date:T', format="%Y-%m-%d"), 'Tasks:Q']
+        )
+        
+        # Layer 4: Floating Labels (only while there is room for them)
+        layers = [area, line, points]
+        if dense:
+            layers.append(base.mark_text(
                 align='center',
                 baseline='bottom',
                 dy=-12,
@@ -432,141 +515,254 @@ def page_home():
                 fontWeight='bold',
                 color=CHARCOAL
             ).encode(
-                y='Tasks',
-                text=alt.Text('Tasks', format='d')
-            )
+                y='Tasks:Q',
+                text=alt.Text('Tasks:Q', format='d')
+            ))
 
-            chart = (area + line + points + text).configure_view(
-                strokeWidth=0
-            ).properties(
-                height=220
-            ).configure(
-                background='transparent'
-            )
-            
-            st.altair_chart(chart, use_container_width=True, theme=None)
+        chart = layered(hist, "activity", *layers).configure_view(
+            strokeWidth=0
+        ).properties(
+            height=220
+        ).configure(
+            background='transparent'
+        )
+        
+        st.altair_chart(chart, use_container_width=True, theme=None)
 
-        # --- COLUMN 2: FOCUS (Pie Charts) ---
-        with col2:
-            st.markdown('<div class="sa-section-head">Focus Areas</div>', unsafe_allow_html=True)
-            
-            # Research
-            rp, rd, ro = data['research']
-            st.markdown(
-                f"""
-                <div style="background:{PURE_WHITE}; padding:1.5rem; border-radius:24px; text-align:center; margin-bottom:1.5rem; border:1px solid #E5E7EB; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);">
-                    <div style="font-weight:700; color:{CHARCOAL}; margin-bottom:1.2rem; font-size:1rem; letter-spacing:0.02em;">Research</div>
-                    <div style="
-                        width:120px; height:120px; margin:0 auto; border-radius:50%;
-                        background: conic-gradient({ACCENT_PRIMARY} 0% {int(rp*100)}%, #F1F5F9 0);
-                        display:flex; align-items:center; justify-content:center;
-                        position: relative;
-                    ">
-                         <div style="background:{PURE_WHITE}; width:90px; height:90px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-weight:800; font-size:1.5rem; color:{CHARCOAL}; box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);">
-                            {int(rp*100)}%
-                        </div>
+@home_widget("focus", "Focus Areas", 1)
+def widget_focus(ws):
+    with get_db() as db:
+        stats = focus_stats(db, ws)
+        st.markdown('<div class="sa-section-head">Focus Areas</div>', unsafe_allow_html=True)
+        
+        # Research
+        rp, rd, ro = stats['research']
+        st.markdown(
+            f"""
+            <div style="background:{PURE_WHITE}; padding:1.5rem; border-radius:24px; text-align:center; margin-bottom:1.5rem; border:1px solid #E5E7EB; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);">
+                <div style="font-weight:700; color:{CHARCOAL}; margin-bottom:1.2rem; font-size:1rem; letter-spacing:0.02em;">Research</div>
+                <div style="
+                    width:120px; height:120px; margin:0 auto; border-radius:50%;
+                    background: conic-gradient({ACCENT_PRIMARY} 0% {int(rp*100)}%, #F1F5F9 0);
+                    display:flex; align-items:center; justify-content:center;
+                    position: relative;
+                ">
+                     <div style="background:{PURE_WHITE}; width:90px; height:90px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-weight:800; font-size:1.5rem; color:{CHARCOAL}; box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);">
+                        {int(rp*100)}%
                     </div>
-                    <div style="font-size:0.8rem; margin-top:1.2rem; color:{SLATE}; font-weight:500;">
-                        <span style="color:{ACCENT_PRIMARY}; font-weight:700;">{rd}</span> done <span style="margin:0 4px; opacity:0.3;">|</span> {ro} open
+                </div>
+                <div style="font-size:0.8rem; margin-top:1.2rem; color:{SLATE}; font-weight:500;">
+                    <span style="color:{ACCENT_PRIMARY}; font-weight:700;">{rd}</span> done <span style="margin:0 4px; opacity:0.3;">|</span> {ro} open
+                </div>
+            </div>
+            """, unsafe_allow_html=True
+        )
+        with st.expander("Add Research Task"):
+            add_task_ui(db, "research", ws)
+            
+        # Trading
+        tp, td, to = stats['trading']
+        st.markdown(
+            f"""
+            <div style="background:{PURE_WHITE}; padding:1.5rem; border-radius:24px; text-align:center; margin-bottom:1.5rem; margin-top:2rem; border:1px solid #E5E7EB; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);">
+                <div style="font-weight:700; color:{CHARCOAL}; margin-bottom:1.2rem; font-size:1rem; letter-spacing:0.02em;">Algo Trading</div>
+                <div style="
+                    width:120px; height:120px; margin:0 auto; border-radius:50%;
+                    background: conic-gradient({ACCENT_SECONDARY} 0% {int(tp*100)}%, #F1F5F9 0);
+                    display:flex; align-items:center; justify-content:center;
+                ">
+                    <div style="background:{PURE_WHITE}; width:90px; height:90px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-weight:800; font-size:1.5rem; color:{CHARCOAL}; box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);">
+                        {int(tp*100)}%
                     </div>
                 </div>
-                """, unsafe_allow_html=True
-            )
-            with st.expander("Add Research Task"):
-                add_task_ui(db, "research")
+                <div style="font-size:0.8rem; margin-top:1.2rem; color:{SLATE}; font-weight:500;">
+                    <span style="color:{ACCENT_SECONDARY}; font-weight:700;">{td}</span> done <span style="margin:0 4px; opacity:0.3;">|</span> {to} open
+                </div>
+            </div>
+            """, unsafe_allow_html=True
+        )
+        with st.expander("Add Trading Task"):
+            add_task_ui(db, "trading", ws)
+
+@home_widget("work", "Current Work", 2)
+def widget_work(ws):
+    with get_db() as db:
+        groups = project_groups(db, ws)
+        st.markdown('<div class="sa-section-head">Current Work</div>', unsafe_allow_html=True)
+        
+        # Helper to render multiple Project cards
+        def render_project_group(title, projects, icon="b"):
+            if not projects: return
+            st.markdown(f'<div class="sa-sub-head"><span>{icon}</span> {title}</div>', unsafe_allow_html=True)
+            for p in projects:
+                # We use a button that acts as a link trigger
+                # Using a workaround with columns to make the row look decent
                 
-            # Trading
-            tp, td, to = data['trading']
-            st.markdown(
-                f"""
-                <div style="background:{PURE_WHITE}; padding:1.5rem; border-radius:24px; text-align:center; margin-bottom:1.5rem; margin-top:2rem; border:1px solid #E5E7EB; box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);">
-                    <div style="font-weight:700; color:{CHARCOAL}; margin-bottom:1.2rem; font-size:1rem; letter-spacing:0.02em;">Algo Trading</div>
-                    <div style="
-                        width:120px; height:120px; margin:0 auto; border-radius:50%;
-                        background: conic-gradient({ACCENT_SECONDARY} 0% {int(tp*100)}%, #F1F5F9 0);
-                        display:flex; align-items:center; justify-content:center;
-                    ">
-                        <div style="background:{PURE_WHITE}; width:90px; height:90px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-weight:800; font-size:1.5rem; color:{CHARCOAL}; box-shadow: inset 0 2px 4px 0 rgba(0, 0, 0, 0.06);">
-                            {int(tp*100)}%
+                # Visual Card
+                st.markdown(
+                   f"""
+                    <div class="sa-task-row" style="cursor: pointer; display:block;">
+                        <div style="font-weight:700; font-size:0.95rem; color:{CHARCOAL};">
+                            {p.name}
+                        </div>
+                        <div style="font-size:0.75rem; color:{SLATE}; margin-top:4px; display:flex; justify-content:space-between;">
+                            <span>{p.description if p.description else ''}</span>
+                            <span style="font-weight:600; color:{CHARCOAL}; background:#E2E6EA; padding:2px 8px; border-radius:10px;">{p.open_tasks} Tasks</span>
                         </div>
                     </div>
-                    <div style="font-size:0.8rem; margin-top:1.2rem; color:{SLATE}; font-weight:500;">
-                        <span style="color:{ACCENT_SECONDARY}; font-weight:700;">{td}</span> done <span style="margin:0 4px; opacity:0.3;">|</span> {ro} open
-                    </div>
-                </div>
-                """, unsafe_allow_html=True
-            )
-            with st.expander("Add Trading Task"):
-                add_task_ui(db, "trading")
+                   """, unsafe_allow_html=True
+                )
+                # Hidden button to trigger navigation
+                if st.button(f"Open {p.name}", key=f"btn_{p.id}"):
+                    reset_route()
+                    st.query_params["project_id"] = str(p.id)
+                    st.rerun()
 
-        # --- COLUMN 3: QUEUE ---
-        with col3:
-            st.markdown('<div class="sa-section-head">Current Work</div>', unsafe_allow_html=True)
-            
-            # Helper to render multiple Project cards
-            def render_project_group(title, projects, icon="b"):
-                if not projects: return
-                st.markdown(f'<div class="sa-sub-head"><span>{icon}</span> {title}</div>', unsafe_allow_html=True)
-                for p in projects:
-                    # Count open tasks
-                    open_tasks = len([t for t in p.tasks if t.status != 'done'])
-                    
-                    # We use a button that acts as a link trigger
-                    # Using a workaround with columns to make the row look decent
-                    
-                    # Visual Card
-                    st.markdown(
-                       f"""
-                        <div class="sa-task-row" style="cursor: pointer; display:block;">
-                            <div style="font-weight:700; font-size:0.95rem; color:{CHARCOAL};">
-                                {p.name}
-                            </div>
-                            <div style="font-size:0.75rem; color:{SLATE}; margin-top:4px; display:flex; justify-content:space-between;">
-                                <span>{p.description if p.description else ''}</span>
-                                <span style="font-weight:600; color:{CHARCOAL}; background:#E2E6EA; padding:2px 8px; border-radius:10px;">{open_tasks} Tasks</span>
-                            </div>
-                        </div>
-                       """, unsafe_allow_html=True
-                    )
-                    # Hidden button to trigger navigation
-                    if st.button(f"Open {p.name}", key=f"btn_{p.id}"):
-                        st.query_params.clear()
-                        st.query_params["project_id"] = str(p.id)
+        render_project_group("Research", groups['research'], "🧪")
+        render_project_group("Papers", groups['paper'], "📚")
+        render_project_group("Services", groups['trading'], "💼")
+        render_project_group("Algorithms", groups['algo'], "⚡")
+        render_project_group("Patents", groups['patent'], "🛡️")
+
+        st.markdown("---")
+        with st.expander("➕ New Project"):
+            with st.form("new_project_form", clear_on_submit=True):
+                p_name = st.text_input("Project Name")
+                p_desc = st.text_area("Description")
+                p_area = st.selectbox("Category", ["paper", "algo", "patent", "research", "trading"])
+                if st.form_submit_button("Create Project"):
+                    if p_name:
+                        try:
+                            new_p = Project(workspace_id=ws, name=p_name, description=p_desc, area=p_area)
+                            db.add(new_p)
+                            db.flush()
+                            record_event(db, ws, PROJECT_CREATED, project_id=new_p.id, name=p_name, area=p_area)
+                            db.commit()
+                            st.success(f"Project '{p_name}' created!")
+                            st.rerun()
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"Error creating project: {str(e)}")
+
+@home_widget("recurring", "Recurring Tasks", 2)
+def widget_recurring(ws):
+    with get_db() as db:
+        with st.expander("🔁 Recurring Tasks"):
+            rules = scoped(db, RecurrenceRule, ws).filter(RecurrenceRule.active == True).order_by(RecurrenceRule.title).all()
+            for r in rules:
+                c1, c2 = st.columns([4, 1])
+                c1.markdown(f"**{r.title}** <span style='color:{SLATE}; font-size:0.8rem;'>{describe(r)}</span>", unsafe_allow_html=True)
+                if c2.button("Stop", key=f"stop_rule_{r.id}"):
+                    if run_write(db, lambda db, rid=r.id: stop_rule(db, ws, rid)):
                         st.rerun()
+            with st.form("new_recurrence_form", clear_on_submit=True):
+                r_title = st.text_input("Recurring Task")
+                c1, c2 = st.columns(2)
+                r_area = c1.selectbox("Area", ["personal", "research", "trading", "writing"])
+                r_prio = c2.selectbox("Priority", PRIORITIES)
+                c1, c2, c3 = st.columns(3)
+                r_freq = c1.selectbox("Repeats", FREQUENCIES, index=1)
+                r_interval = c2.number_input("Every", min_value=1, max_value=52, value=1)
+                r_start = c3.date_input("Starting", value=datetime.now().date())
+                if st.form_submit_button("Add Recurring Task"):
+                    if r_title:
+                        if run_write(db, lambda db: add_rule(
+                            db, ws, title=r_title, area=r_area, priority=r_prio,
+                            freq=r_freq, interval=int(r_interval),
+                            starts_at=datetime.combine(r_start, datetime.min.time())
+                        )):
+                            st.rerun()
+
+# --------- MAIN LAYOUT ---------
+
+def page_home():
+    ws = current_workspace()
+    with get_db() as db:
+        # Bring recurring tasks up to the visible horizon (no-op most reruns)
+        materialize(db, ws)
+
+    # Header
+    c_head, c_date = st.columns([3, 1])
+    c_head.markdown(f"## Mission Control")
+    with c_date:
+        st.markdown(f"<div style='text-align:right; color:{SLATE}; font-weight:600;'>{datetime.now().strftime('%A, %B %d')}</div>", unsafe_allow_html=True)
+        with st.popover("Widgets", use_container_width=True):
+            for key, w in HOME_WIDGETS.items():
+                st.checkbox(w["label"], value=True, key=f"home_show_{key}")
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # 3-Column Grid for Condensed View; hidden widgets never run their query
+    columns = st.columns([1.1, 1.1, 1.4], gap="large")
+    for key, w in HOME_WIDGETS.items():
+        if st.session_state.get(f"home_show_{key}", True):
+            with columns[w["column"]]:
+                w["render"](ws)
+
+def project_version(db, ws, project_id):
+    """Cheap token that changes whenever the project or one of its tasks changes.
+
+    One primary-key lookup: task writes bump Project.version (touch_projects),
+    edits to the project itself move updated_at. None if it is gone.
+    """
+    row = (
+        scoped(db, Project, ws)
+        .with_entities(Project.version, Project.updated_at)
+        .filter(Project.id == project_id)
+        .first()
+    )
+    return tuple(row) if row else None
 
-            render_project_group("Research", data['research_proj'], "🧪")
-            render_project_group("Papers", data['papers'], "📚")
-            render_project_group("Services", data['trading_proj'], "💼")
-            render_project_group("Algorithms", data['algos'], "⚡")
-            render_project_group("Patents", data['patents'], "🛡️")
-
-            st.markdown("---")
-            with st.expander("➕ New Project"):
-                with st.form("new_project_form", clear_on_submit=True):
-                    p_name = st.text_input("Project Name")
-                    p_desc = st.text_area("Description")
-                    p_area = st.selectbox("Category", ["paper", "algo", "patent", "research", "trading"])
-                    if st.form_submit_button("Create Project"):
-                        if p_name:
-                            try:
-                                db.add(Project(name=p_name, description=p_desc, area=p_area))
-                                db.commit()
-                                st.success(f"Project '{p_name}' created!")
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Error creating project: {str(e)}")
+def experiments_version(db, ws, system_id):
+    """Cheap token that changes whenever one of the system's experiments is added, edited or removed."""
+    return tuple(
+        scoped(db, Experiment, ws)
+        .with_entities(func.count(Experiment.id), func.max(Experiment.id), func.max(Experiment.updated_at))
+        .filter(Experiment.system_id == system_id)
+        .one()
+    )
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_regressions(ws, system_id, version):
+    # `version` only keys the cache (see experiments_version)
+    with get_db() as db:
+        return find_regressions(db, ws, system_id)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_project(ws, project_id, version):
+    # Keyed per (project, version): busy projects stay cached side by side and
+    # a write only replaces the entry of the project it touched
+    with get_db() as db:
+        proj = (
+            scoped(db, Project, ws)
+            .with_entities(Project.id, Project.name, Project.description, Project.area)
+            .filter(Project.id == project_id)
+            .first()
+        )
+        if not proj:
+            return None
+        tasks = (
+            scoped(db, Task, ws)
+            .with_entities(Task.id, Task.title, Task.status, Task.priority)
+            .filter(Task.project_id == project_id)
+            .order_by(priority_rank(Task.priority), Task.id)
+            .all()
+        )
+        return proj, tasks, archived_done_for_project(db, ws, project_id)
 
 def page_project_detail(project_id):
     st.markdown("<br><br>", unsafe_allow_html=True)
+    ws = current_workspace()
     with get_db() as db:
-        proj = db.query(Project).filter(Project.id == project_id).first()
+        cached = cached_project(ws, project_id, project_version(db, ws, project_id))
         
-        if not proj:
+        if not cached:
             st.error("Project not found.")
             if st.button("Back to Home"):
-                st.query_params.clear()
+                reset_route()
                 st.rerun()
             return
+        proj, tasks, n_archived = cached
     
         # Header
         st.markdown(
@@ -583,22 +779,22 @@ def page_project_detail(project_id):
             """, unsafe_allow_html=True
         )
         
-        # Task Lists
-        tasks = db.query(Task).filter(Task.project_id == proj.id).all()
-    
         # Action Buttons
         c_back, c_del = st.columns([1, 1])
         if c_back.button("← Back to Mission Control", use_container_width=True):
-            st.query_params.clear()
+            reset_route()
             st.rerun()
             
         if c_del.button("🗑️ Delete Project", use_container_width=True, type="secondary"):
             if st.session_state.get(f"confirm_del_{proj.id}"):
-                # Delete associated tasks first
-                for t in tasks: db.delete(t)
-                db.delete(proj)
+                # Delete associated tasks (and their dependency links) first
+                detach(db, ws, [t.id for t in tasks])
+                scoped(db, Task, ws).filter(Task.project_id == proj.id).delete(synchronize_session=False)
+                purge_project_archive(db, ws, proj.id)
+                record_event(db, ws, PROJECT_DELETED, project_id=proj.id, name=proj.name, tasks=len(tasks))
+                scoped(db, Project, ws).filter(Project.id == proj.id).delete(synchronize_session=False)
                 db.commit()
-                st.query_params.clear()
+                reset_route()
                 st.rerun()
             else:
                 st.session_state[f"confirm_del_{proj.id}"] = True
@@ -611,28 +807,24 @@ def page_project_detail(project_id):
             with st.form("new_task", clear_on_submit=True):
                 c1, c2 = st.columns([4, 1])
                 t_title = c1.text_input("Task Title")
-                t_prio = c2.selectbox("Priority", ["low", "medium", "high"])
+                t_prio = c2.selectbox("Priority", PRIORITIES)
                 if st.form_submit_button("Create Task"):
                     if t_title:
-                        db.add(Task(
+                        if run_write(db, lambda db: add_task(
+                            db, ws,
                             title=t_title, 
                             project_id=proj.id, 
                             priority=t_prio,
                             status="inbox",
                             area=proj.area,
                             created_at=datetime.now()
-                        ))
-                        db.commit()
-                        st.rerun()
+                        )):
+                            st.rerun()
     
         # Task Lists
-        tasks = db.query(Task).filter(Task.project_id == proj.id).all()
+        # Already in priority order (sorted in SQL)
         pending = [t for t in tasks if t.status != 'done']
         done = [t for t in tasks if t.status == 'done']
-        
-        # Sort pending by priority
-        p_map = {'high': 0, 'medium': 1, 'low': 2}
-        pending.sort(key=lambda x: p_map.get(x.priority, 1))
     
         st.markdown("### Pending Tasks")
         if not pending:
@@ -654,15 +846,15 @@ def page_project_detail(project_id):
             c2.markdown(f"**{t.title}**")
             
             if c3.button("Complete", key=f"done_{t.id}"):
-                t.status = "done"
-                t.completed_at = datetime.now()
-                db.commit()
-                st.rerun()
+                if run_write(db, lambda db, tid=t.id: complete_task(db, ws, tid)):
+                    st.rerun()
                 
-        if done:
+        if done or n_archived:
             st.markdown("### Completed", unsafe_allow_html=True)
             for t in done:
                 st.markdown(f"<div style='color:{SLATE}; text-decoration:line-through; font-size:0.9rem; padding: 4px 0;'>{t.title}</div>", unsafe_allow_html=True)
+            if n_archived:
+                st.caption(f"+ {n_archived} archived (see History)")
 
 
 
@@ -671,7 +863,7 @@ def page_research_hub():
     st.markdown("## 🧪 Research Hub")
     with get_db() as db:
         # Unified with 'paper', 'research', and 'writing'
-        projects = db.query(Project).filter(Project.area.in_(["research", "writing", "paper"])).all()
+        projects = scoped(db, Project, current_workspace()).filter(Project.area.in_(["research", "writing", "paper"])).all()
         
         if not projects:
             st.info("No research or paper projects found.")
@@ -695,7 +887,7 @@ def page_research_hub():
                     st.markdown(f"• **{t.title}**")
                 
                 if st.button(f"View Project: {p.name}", key=f"view_{p.id}", use_container_width=True):
-                    st.query_params.clear()
+                    reset_route()
                     st.query_params["project_id"] = str(p.id)
                     st.rerun()
                 st.markdown("<br>", unsafe_allow_html=True)
@@ -705,7 +897,7 @@ def page_business_hub():
     st.markdown("## 💼 Business Hub")
     with get_db() as db:
         # Projects for financial gain (trading, algorithms, etc.)
-        projects = db.query(Project).filter(Project.area.in_(["trading", "algo", "patent"])).all()
+        projects = scoped(db, Project, current_workspace()).filter(Project.area.in_(["trading", "algo", "patent"])).all()
         
         if not projects:
             st.info("No business projects found.")
@@ -724,13 +916,243 @@ def page_business_hub():
                 for t in tasks[:3]:
                     st.checkbox(t.title, key=f"b_t_{t.id}")
                 if st.button(f"Manage {p.name}", key=f"edit_{p.id}"):
-                    st.query_params.clear()
+                    reset_route()
                     st.query_params["project_id"] = str(p.id)
                     st.rerun()
 
+EXPERIMENT_SORT_COLUMNS = {
+    "Sharpe": Experiment.sharpe,
+    "CAGR": Experiment.cagr,
+    "Max Drawdown": Experiment.max_drawdown,
+    "Win Rate": Experiment.win_rate,
+    "R:R": Experiment.rr_ratio,
+    "Trades": Experiment.trades,
+    "Run Date": Experiment.run_date,
+}
+EXPERIMENT_DECISIONS = list(DECISIONS)
+
+def page_systems():
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    st.markdown("## ⚙️ Systems")
+    ws = current_workspace()
+    with get_db() as db:
+
+        with st.expander("➕ New System"):
+            with st.form("new_system_form", clear_on_submit=True):
+                s_name = st.text_input("System Name")
+                s_desc = st.text_area("Description")
+                c1, c2 = st.columns(2)
+                s_status = c1.selectbox("Status", SYSTEM_STATUSES, index=1)
+                s_type = c2.text_input("Type", value="trend")
+                if st.form_submit_button("Create System"):
+                    if s_name:
+                        try:
+                            db.add(System(workspace_id=ws, name=s_name, description=s_desc, status=s_status, system_type=s_type))
+                            db.commit()
+                            st.rerun()
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"Error creating system: {str(e)}")
+
+        # One grouped query for per-system counts instead of loading experiments
+        exp_counts = dict(
+            scoped(db, Experiment, ws)
+            .with_entities(Experiment.system_id, func.count(Experiment.id))
+            .group_by(Experiment.system_id)
+            .all()
+        )
+        systems = scoped(db, System, ws).order_by(System.name).all()
+
+        if not systems:
+            st.info("No systems found.")
+            return
+
+        cols = st.columns(2)
+        for i, s in enumerate(systems):
+            with cols[i % 2]:
+                st.markdown(f"""
+                <div style="background:{PURE_WHITE}; padding:1.5rem; border-radius:24px; border:1px solid #E5E7EB; margin-bottom:1rem;">
+                    <div style="color:{SLATE}; text-transform:uppercase; font-size:0.7rem; font-weight:700; letter-spacing:0.1em; margin-bottom:0.5rem;">{(s.status or '').upper()} · {s.system_type or '-'}</div>
+                    <h3 style="margin:0;">{s.name}</h3>
+                    <p style="color:{SLATE}; font-size:0.9rem;">{s.description or 'No description'}</p>
+                    <span style="font-weight:600; color:{CHARCOAL}; background:#E2E6EA; padding:2px 8px; border-radius:10px; font-size:0.75rem;">{exp_counts.get(s.id, 0)} Experiments</span>
+                </div>
+                """, unsafe_allow_html=True)
+                if st.button(f"View Experiments: {s.name}", key=f"sys_{s.id}", use_container_width=True):
+                    reset_route()
+                    st.query_params["page"] = "systems"
+                    st.query_params["system_id"] = str(s.id)
+                    st.rerun()
+                st.markdown("<br>", unsafe_allow_html=True)
+
+def page_system_detail(system_id):
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    ws = current_workspace()
+    with get_db() as db:
+        system = scoped(db, System, ws).filter(System.id == system_id).first()
+
+        if not system:
+            st.error("System not found.")
+            if st.button("Back to Systems"):
+                reset_route()
+                st.query_params["page"] = "systems"
+                st.rerun()
+            return
+
+        c1, c2 = st.columns([1, 5])
+        if c1.button("← Systems"):
+            reset_route()
+            st.query_params["page"] = "systems"
+            st.rerun()
+        c2.markdown(f"## {system.name}")
+
+        with st.expander("➕ Log Experiment"):
+            with st.form("new_experiment", clear_on_submit=True):
+                c1, c2, c3 = st.columns(3)
+                e_name = c1.text_input("Name")
+                e_period = c2.text_input("Period")
+                e_version = c3.text_input("Code Version")
+                c1, c2, c3 = st.columns(3)
+                e_sharpe = c1.number_input("Sharpe", value=0.0)
+                e_cagr = c2.number_input("CAGR", value=0.0)
+                e_dd = c3.number_input("Max Drawdown", value=0.0)
+                e_decision = st.selectbox("Decision", EXPERIMENT_DECISIONS)
+                if st.form_submit_button("Save Experiment"):
+                    if e_name:
+                        db.add(Experiment(
+                            workspace_id=ws, system_id=system.id, name=e_name,
+                            period=e_period, code_version=e_version,
+                            sharpe=e_sharpe, cagr=e_cagr, max_drawdown=e_dd,
+                            decision=e_decision, run_date=datetime.now()
+                        ))
+                        db.commit()
+                        st.rerun()
+
+        # Sharpe trend, bucketed server-side like the home activity chart
+        trend_range = st.selectbox("Trend range", list(CHART_RANGES), index=len(CHART_RANGES) - 1, key="exp_trend_range")
+        trend, unit = experiment_series(db, ws, system.id, CHART_RANGES[trend_range])
+        if not trend.empty:
+            base = alt.Chart().encode(x=alt.X("Date:T", axis=alt.Axis(title=None, grid=False, labelColor=SLATE)))
+            tooltip = [alt.Tooltip("Date:T", format="%Y-%m-%d"), alt.Tooltip("Sharpe:Q", format=".2f"),
+                       alt.Tooltip("Best:Q", format=".2f"), "Runs:Q"]
+            mean_line = base.mark_line(color=ACCENT_PRIMARY, strokeWidth=2).encode(
+                y=alt.Y("Sharpe:Q", axis=alt.Axis(title=f"Sharpe (mean per {unit})", labelColor=SLATE))
+            )
+            best = base.mark_circle(color=CHARCOAL, size=30).encode(y="Best:Q", tooltip=tooltip)
+            st.altair_chart(
+                layered(trend, "sharpe_trend", mean_line, best).properties(height=180).configure_view(strokeWidth=0),
+                use_container_width=True, theme=None
+            )
+
+        # Metric regressions between code versions of the same configuration
+        regs = cached_regressions(ws, system.id, experiments_version(db, ws, system.id))
+        if len(regs):
+            with st.expander(f"⚠️ {len(regs)} regressions across code versions"):
+                st.dataframe(
+                    regression_table(regs.sort_values("run_date", ascending=False)),
+                    use_container_width=True,
+                    column_config={"Run Date": st.column_config.DatetimeColumn("Run Date", format="YYYY-MM-DD")},
+                    hide_index=True
+                )
+
+        # Controls (sorting/filtering/paging all happen in SQL)
+        c1, c2, c3, c4 = st.columns([2, 1, 3, 1])
+        sort_label = c1.selectbox("Sort by", list(EXPERIMENT_SORT_COLUMNS), key="exp_sort")
+        descending = c2.selectbox("Order", ["desc", "asc"], key="exp_order") == "desc"
+        decisions = c3.multiselect("Decision", EXPERIMENT_DECISIONS, key="exp_decisions")
+        page_size = c4.selectbox("Rows", [25, 50, 100, 250], key="exp_rows")
+
+        q = scoped(db, Experiment, ws).filter(Experiment.system_id == system.id)
+        if decisions:
+            q = q.filter(Experiment.decision.in_(decisions))
+        total = q.with_entities(func.count(Experiment.id)).scalar() or 0
+
+        if not total:
+            st.info("No experiments logged for this system.")
+            return
+
+        n_pages = (total + page_size - 1) // page_size
+        page_no = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key="exp_page")
+
+        # NULL ranks lowest and id follows the sort direction, matching the
+        # (system_id, <metric>, id) indexes so a page is read straight off one
+        col = EXPERIMENT_SORT_COLUMNS[sort_label]
+        if descending:
+            order = (col.desc().nulls_last(), Experiment.id.desc())
+        else:
+            order = (col.asc().nulls_first(), Experiment.id.asc())
+        rows = (
+            q.with_entities(
+                Experiment.name, Experiment.run_date, Experiment.period, Experiment.code_version,
+                Experiment.sharpe, Experiment.cagr, Experiment.max_drawdown, Experiment.win_rate,
+                Experiment.rr_ratio, Experiment.trades, Experiment.decision, Experiment.qc_url
+            )
+            .order_by(*order)
+            .offset((page_no - 1) * page_size)
+            .limit(page_size)
+            .all()
+        )
+
+        df = pd.DataFrame(rows, columns=[
+            "Name", "Run Date", "Period", "Version", "Sharpe", "CAGR",
+            "Max DD", "Win Rate", "R:R", "Trades", "Decision", "Backtest"
+        ])
+        st.caption(f"{total} experiments")
+        st.dataframe(
+            df,
+            use_container_width=True,
+            column_config={
+                "Run Date": st.column_config.DatetimeColumn("Run Date", format="YYYY-MM-DD"),
+                "Backtest": st.column_config.LinkColumn("Backtest"),
+            },
+            hide_index=True
+        )
+
+def milestone_plan(db, ws, m, open_tasks):
+    """Dependencies, critical path and slack for one open milestone."""
+    prereqs = prerequisites(db, ws, m.id)
+    slack = slack_days(m)
+    label = "🔗 Plan"
+    if prereqs and slack is not None:
+        label += f" · {slack:+.1f} days slack" if slack >= 0 else f" · {-slack:.1f} days behind"
+    with st.expander(label):
+        path = critical_path(db, ws, m.id)
+        if path:
+            st.caption(f"Earliest finish in {m.earliest_finish or 0:.1f} days. Critical path:")
+            shown = " → ".join(f"**{t.title}** ({t.estimate_days:g}d)" for t in path[:12])
+            st.markdown(shown + (f" → … {len(path) - 12} more" if len(path) > 12 else ""))
+
+        for p in prereqs:
+            c1, c2 = st.columns([5, 1])
+            c1.markdown(f"{'✅ ' if p.status == 'done' else ''}{p.title} <span style='color:{SLATE}; font-size:0.8rem;'>{p.estimate_days:g}d, done in {(p.earliest_finish or 0):.1f}d</span>", unsafe_allow_html=True)
+            if c2.button("Unlink", key=f"unlink_{m.id}_{p.id}"):
+                if run_write(db, lambda db, pid=p.id: remove_dependency(db, ws, m.id, pid)):
+                    st.rerun()
+
+        titles = {m.id: f"{m.title} (milestone)", **{t.id: t.title for t in open_tasks}}
+        with st.form(f"link_{m.id}", clear_on_submit=True):
+            c1, c2, c3 = st.columns([2, 2, 1])
+            task_id = c1.selectbox("Task", list(titles), format_func=titles.get, key=f"link_task_{m.id}")
+            dep_id = c2.selectbox("waits for", [t.id for t in open_tasks], format_func=titles.get, key=f"link_dep_{m.id}")
+            # Blank keeps the prerequisite's current estimate
+            estimate = c3.number_input("Estimate (days)", min_value=0.0, value=None, step=0.5,
+                                       placeholder="keep", key=f"link_est_{m.id}")
+            if st.form_submit_button("Link") and dep_id is not None:
+                def link(db):
+                    if estimate is not None:
+                        set_estimate(db, ws, dep_id, estimate)
+                    add_dependency(db, ws, task_id, dep_id)
+                try:
+                    if run_write(db, link):
+                        st.rerun()
+                except ValueError as e:
+                    db.rollback()
+                    st.error(str(e))
+
 def page_milestones():
     st.markdown("<br><br>", unsafe_allow_html=True)
     st.markdown("## 🏁 Milestones Management")
+    ws = current_workspace()
     with get_db() as db:
         
         # Add Milestone Form
@@ -742,26 +1164,29 @@ def page_milestones():
                 is_active = st.checkbox("Set as Active (Show in Mission Control)", value=True)
                 if st.form_submit_button("Create Milestone"):
                     if title:
-                        if is_active:
-                            # Deactivate others
-                            db.query(Task).filter(Task.is_active_milestone == True).update({"is_active_milestone": False})
-                        
-                        new_m = Task(
-                            title=title, description=desc, 
-                            due_date=datetime.combine(deadline, datetime.min.time()),
-                            is_milestone=True, is_active_milestone=is_active,
-                            status="next", created_at=datetime.now()
-                        )
-                        db.add(new_m)
-                        db.commit()
-                        st.rerun()
+                        # Activating also deactivates the previous milestone, in the same transaction
+                        if run_write(db, lambda db: create_milestone(
+                            db, ws, title, desc,
+                            datetime.combine(deadline, datetime.min.time()),
+                            is_active
+                        )):
+                            st.rerun()
     
         # List Milestones
-        m_tasks = db.query(Task).filter(Task.is_milestone == True).order_by(Task.status == 'done', Task.due_date).all()
+        m_tasks = scoped(db, Task, ws).filter(Task.is_milestone == True).order_by(Task.status == 'done', Task.due_date).all()
         
         if not m_tasks:
             st.info("No milestones found. Create one above!")
             return
+
+        # Candidates for dependency links (one query for all milestone cards)
+        open_tasks = (
+            scoped(db, Task, ws)
+            .with_entities(Task.id, Task.title)
+            .filter(Task.status != 'done', Task.is_milestone.isnot(True))
+            .order_by(Task.due_date.nulls_last(), Task.id)
+            .all()
+        )
     
         for m in m_tasks:
             is_done = m.status == "done"
@@ -775,77 +1200,184 @@ def page_milestones():
                 
                 c1, c2, c3 = st.columns([1, 1, 3])
                 
+                # Writes go through writes.py: re-read in the transaction, retried on conflict
+                action = None
                 if not is_done:
                     if c1.button("Mark Completed", key=f"comp_{m.id}"):
-                        m.status = "done"
-                        m.completed_at = datetime.now()
-                        m.is_active_milestone = False
-                        db.commit()
-                        st.rerun()
+                        action = lambda db, mid=m.id: complete_task(db, ws, mid)
                     
                     if not m.is_active_milestone:
                         if c2.button("Set Active", key=f"act_{m.id}"):
-                            db.query(Task).filter(Task.is_active_milestone == True).update({"is_active_milestone": False})
-                            m.is_active_milestone = True
-                            db.commit()
-                            st.rerun()
+                            action = lambda db, mid=m.id: activate_milestone(db, ws, mid)
                 
                 if c3.button("🗑️ Delete", key=f"del_m_{m.id}"):
-                    db.delete(m)
-                    db.commit()
+                    action = lambda db, mid=m.id: delete_task(db, ws, mid)
+
+                if action and run_write(db, action):
                     st.rerun()
+
+                if not is_done:
+                    milestone_plan(db, ws, m, open_tasks)
                 
                 st.markdown("---")
 
 
+TIMELINE_SPANS = {"2 Weeks": 14, "Month": 31, "Quarter": 92, "Year": 366}
+
+def page_timeline():
+    st.markdown("<br><br>", unsafe_allow_html=True)
+    st.markdown("## 📅 Timeline")
+    ws = current_workspace()
+
+    c1, c2, c3 = st.columns([1, 1, 2])
+    start = c1.date_input("From", value=datetime.now().date() - timedelta(days=7), key="tl_start")
+    span = c2.selectbox("Span", list(TIMELINE_SPANS), index=1, key="tl_span")
+    include_done = c3.checkbox("Include completed", value=False, key="tl_done")
+    start_dt = datetime.combine(start, datetime.min.time())
+    end_dt = start_dt + timedelta(days=TIMELINE_SPANS[span])
+
+    with get_db() as db:
+        # Only the visible range is read (ix_tasks_ws_due_date / ix_projects_ws_target_date),
+        # and tasks arrive already counted per day
+        day = func.date(Task.due_date)
+        is_done = Task.status == 'done'
+        q = (
+            scoped(db, Task, ws)
+            .with_entities(day, is_done, func.count(Task.id))
+            .filter(Task.due_date >= start_dt, Task.due_date < end_dt)
+        )
+        if not include_done:
+            q = q.filter(Task.status != 'done')
+        per_day = q.group_by(day, is_done).all()
+
+        milestones = (
+            scoped(db, Task, ws)
+            .with_entities(Task.title, Task.due_date, Task.status)
+            .filter(Task.is_milestone == True, Task.due_date >= start_dt, Task.due_date < end_dt)
+            .all()
+        )
+        projects = (
+            scoped(db, Project, ws)
+            .with_entities(Project.name, Project.area, Project.created_at, Project.target_date)
+            .filter(Project.target_date >= start_dt, func.coalesce(Project.created_at, Project.target_date) < end_dt)
+            .order_by(Project.target_date)
+            .all()
+        )
+        upcoming = (
+            scoped(db, Task, ws)
+            .with_entities(Task.title, Task.due_date, Task.priority, Task.area, Task.status)
+            .filter(Task.due_date >= start_dt, Task.due_date < end_dt, Task.status != 'done')
+            .order_by(Task.due_date)
+            .limit(50)
+            .all()
+        )
+
+    x_scale = alt.Scale(domain=[start_dt.isoformat(), end_dt.isoformat()])
+
+    st.markdown('<div class="sa-section-head">Due Dates</div>', unsafe_allow_html=True)
+    if per_day or milestones:
+        counts = pd.DataFrame(per_day, columns=["Date", "Done", "Tasks"])
+        counts["Date"] = pd.to_datetime(counts["Date"])
+        counts["Status"] = counts["Done"].map({True: "Done", False: "Open"})
+        if TIMELINE_SPANS[span] > 92:
+            # Long ranges: weekly buckets keep the bar count (and payload) small
+            counts["Date"] = counts["Date"].dt.to_period("W-SUN").dt.start_time
+        counts = counts.groupby(["Date", "Status"], as_index=False)["Tasks"].sum()
+
+        bars = alt.Chart(counts).mark_bar(color=ACCENT_PRIMARY).encode(
+            x=alt.X("Date:T", scale=x_scale, axis=alt.Axis(title=None, grid=False, labelColor=SLATE)),
+            y=alt.Y("Tasks:Q", axis=alt.Axis(title=None, tickMinStep=1, labelColor=SLATE)),
+            color=alt.Color("Status:N", scale=alt.Scale(domain=["Open", "Done"], range=[ACCENT_PRIMARY, "#CBD5E1"]), legend=None),
+            tooltip=[alt.Tooltip("Date:T", format="%a %b %d"), "Status", "Tasks"]
+        )
+        layers = bars
+        if milestones:
+            ms_df = pd.DataFrame(milestones, columns=["Milestone", "Date", "Status"])
+            rules = alt.Chart(ms_df).mark_rule(color="#DC2626", strokeDash=[4, 4]).encode(
+                x=alt.X("Date:T", scale=x_scale), tooltip=["Milestone", alt.Tooltip("Date:T", format="%b %d")]
+            )
+            labels = alt.Chart(ms_df).mark_text(align="left", dx=4, dy=-90, color="#DC2626", fontWeight="bold").encode(
+                x=alt.X("Date:T", scale=x_scale), text="Milestone"
+            )
+            layers = bars + rules + labels
+        st.altair_chart(layers.properties(height=220).configure_view(strokeWidth=0), use_container_width=True, theme=None)
+    else:
+        st.info("Nothing due in this range.")
+
+    if projects:
+        st.markdown('<div class="sa-section-head">Projects</div>', unsafe_allow_html=True)
+        gantt = pd.DataFrame(projects, columns=["Project", "Area", "Start", "Target"])
+        gantt["Start"] = pd.to_datetime(gantt["Start"].fillna(gantt["Target"])).clip(lower=start_dt)
+        gantt["Target"] = pd.to_datetime(gantt["Target"])
+        chart = alt.Chart(gantt).mark_bar(cornerRadius=6, height=18).encode(
+            x=alt.X("Start:T", scale=x_scale, axis=alt.Axis(title=None, labelColor=SLATE)),
+            x2="Target:T",
+            y=alt.Y("Project:N", sort=None, axis=alt.Axis(title=None, labelColor=CHARCOAL)),
+            color=alt.Color("Area:N", scale=alt.Scale(scheme="greys"), legend=None),
+            tooltip=["Project", "Area", alt.Tooltip("Target:T", format="%Y-%m-%d")]
+        ).properties(height=max(60, 32 * len(gantt)))
+        st.altair_chart(chart.configure_view(strokeWidth=0), use_container_width=True, theme=None)
+
+    if upcoming:
+        st.markdown('<div class="sa-section-head">Open In Range</div>', unsafe_allow_html=True)
+        st.dataframe(
+            pd.DataFrame(upcoming, columns=["Task", "Due", "Priority", "Area", "Status"]),
+            use_container_width=True,
+            column_config={"Due": st.column_config.DatetimeColumn("Due", format="ddd MMM D")},
+            hide_index=True
+        )
+        if len(upcoming) == 50:
+            st.caption("Showing the first 50.")
+
+HISTORY_PAGE_SIZE = 100
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_cycle_stats(ws, version):
+    # `version` only keys the cache; a new version means the completed set changed.
+    # Only the aggregates are cached, so a rerun doesn't copy every completion.
+    with get_db() as db:
+        return cycle_time_stats(load_cycle_times(db, ws))
+
 def page_history():
     st.markdown("<br><br>", unsafe_allow_html=True)
+    ws = current_workspace()
     with get_db() as db:
         
         # Header
         c1, c2 = st.columns([1, 5])
         if c1.button("← Back"):
-            st.query_params.clear()
+            reset_route()
             st.rerun()
             
         c2.markdown("## Completed Tasks History")
         
-        tasks = db.query(Task).filter(Task.status == 'done').order_by(Task.completed_at.desc()).all()
-        
-        if not tasks:
-            st.info("No completed tasks found in history.")
-            return
-    
-        data_rows = []
-        for t in tasks:
-            duration_str = "-"
-            if t.completed_at and t.created_at:
-                # simple duration
-                delta = t.completed_at - t.created_at
-                days = delta.days
-                hours, remainder = divmod(delta.seconds, 3600)
-                minutes, _ = divmod(remainder, 60)
-                
-                if days > 0:
-                    duration_str = f"{days}d {hours}h"
-                elif hours > 0:
-                    duration_str = f"{hours}h {minutes}m"
-                else:
-                    duration_str = f"{minutes}m"
-    
-            project_name = t.project.name if t.project else (t.system.name if t.system else "-")
-            
-            data_rows.append({
-                "Title": t.title,
-                "Project/System": project_name,
-                "Area": t.area,
-                "Completed At": t.completed_at.strftime("%Y-%m-%d %H:%M") if t.completed_at else "-",
-                "Duration": duration_str
-            })
+        # Hot and archived completions; aggregates recomputed only when the data version moves
+        version = data_version(db, ws)
+        stats = cached_cycle_stats(ws, version)
         
-        df = pd.DataFrame(data_rows)
+    if not stats["completed"]:
+        st.info("No completed tasks found in history.")
+        return
+
+    tab_tasks, tab_cycle = st.tabs(["Tasks", "Cycle Time"])
+
+    with tab_tasks:
+        # One page of rows at a time, read straight from the database
+        n_pages = (stats["completed"] + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        c1, c2 = st.columns([1, 4])
+        page_no = c1.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key="history_page")
+        c2.caption(f"{stats['completed']:,} completed tasks")
+        with get_db() as db:
+            df = load_cycle_times(db, ws, HISTORY_PAGE_SIZE, (page_no - 1) * HISTORY_PAGE_SIZE)
+        table = pd.DataFrame({
+            "Title": df["title"],
+            "Project/System": df["context"],
+            "Area": df["area"],
+            "Completed At": df["completed_at"].dt.strftime("%Y-%m-%d %H:%M").fillna("-"),
+            "Duration": format_durations(df["hours"]),
+        })
         st.dataframe(
-            df, 
+            table, 
             use_container_width=True,
             column_config={
                 "Title": st.column_config.TextColumn("Task", width="large"),
@@ -857,9 +1389,55 @@ def page_history():
             hide_index=True
         )
 
+    with tab_cycle:
+        def duration(h):
+            return format_durations(pd.Series([h])).iloc[0] if h is not None else "-"
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Completed", f"{stats['completed']:,}")
+        m2.metric("Median", duration(stats["median"]))
+        m3.metric("P90", duration(stats["p90"]))
+        m4.metric("Avg / Week", f"{stats['weekly']['Tasks'].mean():.1f}" if len(stats["weekly"]) else "-")
+
+        group_label = st.selectbox("Group by", ["Area", "Project", "Priority"], key="ct_group")
+        by = {"Area": "area", "Project": "context", "Priority": "priority"}[group_label]
+        summary = stats["summaries"][by]
+        st.dataframe(
+            summary.rename(columns={by: group_label}),
+            use_container_width=True,
+            column_config={
+                c: st.column_config.NumberColumn(c.upper() if c.startswith("p") else c.title(), format="%.1f h")
+                for c in summary.columns if c not in (by, "tasks")
+            },
+            hide_index=True
+        )
+
+        # Only aggregates go to the browser, never per-task rows
+        c1, c2 = st.columns(2)
+        with c1:
+            st.markdown('<div class="sa-sub-head">Time Taken</div>', unsafe_allow_html=True)
+            st.altair_chart(
+                alt.Chart(stats["histogram"]).mark_bar(color=ACCENT_PRIMARY).encode(
+                    x=alt.X("Bucket", sort=None, axis=alt.Axis(labelAngle=0, title=None)),
+                    y=alt.Y("Tasks", axis=alt.Axis(title=None, tickMinStep=1)),
+                    tooltip=["Bucket", "Tasks"]
+                ).properties(height=220),
+                use_container_width=True, theme=None
+            )
+        with c2:
+            st.markdown('<div class="sa-sub-head">Weekly Throughput</div>', unsafe_allow_html=True)
+            st.altair_chart(
+                alt.Chart(stats["weekly"]).mark_line(point=True, color=ACCENT_PRIMARY).encode(
+                    x=alt.X("Week:T", axis=alt.Axis(title=None, format="%b %d")),
+                    y=alt.Y("Tasks", axis=alt.Axis(title=None, tickMinStep=1)),
+                    tooltip=[alt.Tooltip("Week:T", format="%Y-%m-%d"), "Tasks"]
+                ).properties(height=220),
+                use_container_width=True, theme=None
+            )
+
 
 if __name__ == "__main__":
     render_nav_bar()
+    render_sync_status()
     # Router
     qp = st.query_params
     pid = qp.get("project_id")
@@ -871,8 +1449,15 @@ if __name__ == "__main__":
         page_research_hub()
     elif page == "business":
         page_business_hub()
+    elif page == "systems":
+        if qp.get("system_id"):
+            page_system_detail(qp.get("system_id"))
+        else:
+            page_systems()
     elif page == "milestones":
         page_milestones()
+    elif page == "timeline":
+        page_timeline()
     elif page == "history":
         page_history()
     else:
@@ -0,0 +1,157 @@
+# archive.py
+# Moves old done tasks from the hot `tasks` table into `tasks_archive`.
+#   python archive.py --days 90
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, or_, select, union_all
+
+from db import (
+    init_db, SessionLocal, primary_engine, touch_projects,
+    Project, System, Task, TaskDependency, ArchivedTask, ArchivedTaskCount
+)
+
+DEFAULT_AGE_DAYS = 90
+
+# Columns copied verbatim from tasks -> tasks_archive
+ARCHIVED_COLUMNS = (
+    "id", "workspace_id", "title", "description", "status", "area", "priority",
+    "due_date", "created_at", "completed_at", "project_id", "system_id",
+)
+
+
+def _archivable(cutoff, workspace_id=None):
+    # Milestones stay in the hot table: the milestones page lists completed ones
+    conds = [Task.status == "done", Task.completed_at < cutoff, Task.is_milestone.isnot(True)]
+    if workspace_id is not None:
+        conds.append(Task.workspace_id == workspace_id)
+    return conds
+
+
+def archive_done_tasks(db, older_than_days=DEFAULT_AGE_DAYS, workspace_id=None, batch_size=500):
+    """Move done tasks completed more than `older_than_days` ago to the archive.
+
+    Each batch is one transaction: rows are copied, counters bumped and the
+    originals deleted together, so readers never see a task twice or lose it
+    from the totals. Returns the number of tasks moved.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    moved = 0
+    while True:
+        batch = (
+            db.query(Task.id, Task.workspace_id, Task.area, Task.project_id)
+            .filter(*_archivable(cutoff, workspace_id))
+            .order_by(Task.id)
+            .limit(batch_size)
+            .with_for_update()
+            .all()
+        )
+        if not batch:
+            break
+        ids = [row.id for row in batch]
+
+        src = select(*[getattr(Task, c) for c in ARCHIVED_COLUMNS]).where(Task.id.in_(ids))
+        db.execute(insert(ArchivedTask).from_select(list(ARCHIVED_COLUMNS), src))
+
+        counts = Counter((ws, area or "", pid or 0) for _, ws, area, pid in batch)
+        for (ws, area, pid), n in counts.items():
+            row = db.get(ArchivedTaskCount, (ws, area, pid))
+            if row is None:
+                db.add(ArchivedTaskCount(workspace_id=ws, area=area, project_id=pid, done=n))
+            else:
+                row.done += n
+
+        # Done tasks finish at 0, so dropping their edges reschedules nothing
+        db.query(TaskDependency).filter(
+            or_(TaskDependency.task_id.in_(ids), TaskDependency.depends_on_id.in_(ids))
+        ).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id.in_(ids)).delete(synchronize_session=False)
+        for ws in {ws for ws, _, _ in counts}:
+            touch_projects(db, ws, [pid for w, _, pid in counts if w == ws])
+        db.commit()
+        moved += len(ids)
+    return moved
+
+
+def archived_done_by_area(db, workspace_id):
+    """{area: archived done count} for one workspace, read from the counters."""
+    rows = (
+        db.query(ArchivedTaskCount.area, func.sum(ArchivedTaskCount.done))
+        .filter(ArchivedTaskCount.workspace_id == workspace_id)
+        .group_by(ArchivedTaskCount.area)
+        .all()
+    )
+    return {area: int(n or 0) for area, n in rows}
+
+
+def archived_done_for_project(db, workspace_id, project_id):
+    n = (
+        db.query(func.sum(ArchivedTaskCount.done))
+        .filter(ArchivedTaskCount.workspace_id == workspace_id, ArchivedTaskCount.project_id == project_id)
+        .scalar()
+    )
+    return int(n or 0)
+
+
+def purge_project_archive(db, workspace_id, project_id):
+    # Called when a project is deleted; caller commits
+    db.query(ArchivedTask).filter(
+        ArchivedTask.workspace_id == workspace_id, ArchivedTask.project_id == project_id
+    ).delete(synchronize_session=False)
+    db.query(ArchivedTaskCount).filter(
+        ArchivedTaskCount.workspace_id == workspace_id, ArchivedTaskCount.project_id == project_id
+    ).delete(synchronize_session=False)
+
+
+def completed_tasks_query(workspace_id, since=None, until=None):
+    """Done tasks from the hot table and the archive, newest first.
+
+    Yields (title, context, area, priority, created_at, completed_at) where
+    context is the project name, else the system name. `since`/`until`
+    bound completed_at (until exclusive).
+    """
+    def cols(m):
+        return [m.title, m.area, m.priority, m.created_at, m.completed_at, m.project_id, m.system_id]
+
+    def window(m):
+        conds = []
+        if since is not None:
+            conds.append(m.completed_at >= since)
+        if until is not None:
+            conds.append(m.completed_at < until)
+        return conds
+
+    hot = select(*cols(Task)).where(Task.workspace_id == workspace_id, Task.status == "done", *window(Task))
+    cold = select(*cols(ArchivedTask)).where(ArchivedTask.workspace_id == workspace_id, *window(ArchivedTask))
+    u = union_all(hot, cold).subquery()
+    return (
+        select(
+            u.c.title,
+            func.coalesce(Project.name, System.name).label("context"),
+            u.c.area, u.c.priority, u.c.created_at, u.c.completed_at,
+        )
+        .select_from(u)
+        .outerjoin(Project, Project.id == u.c.project_id)
+        .outerjoin(System, System.id == u.c.system_id)
+        .order_by(u.c.completed_at.desc())
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old completed tasks.")
+    parser.add_argument("--days", type=int, default=DEFAULT_AGE_DAYS, help="archive tasks completed more than this many days ago")
+    parser.add_argument("--workspace", default=None, help="only archive this workspace")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if primary_engine is not None:
+        # Deletes on the replica would be pushed while the archive rows stayed local
+        raise SystemExit("Run archive.py against the primary (unset DASHBOARD_REPLICA).")
+    init_db()
+    db = SessionLocal()
+    try:
+        n = archive_done_tasks(db, args.days, args.workspace, args.batch_size)
+    finally:
+        db.close()
+    print(f"Archived {n} tasks.")
@@ -0,0 +1,348 @@
+# backup.py
+# Online snapshots of the dashboard database, and restore.
+#   python backup.py                 take a snapshot
+#   python backup.py --list
+#   python backup.py --restore 20240101-120000
+#
+# SQLite: pages are copied with the online backup API in small steps, so the
+# app keeps reading (and writing between steps). A write from another
+# connection restarts the copy, so after MAX_RESTARTS it falls back to one
+# step under a single read lock. The copy is cut into fixed chunks stored
+# zlib-compressed under their hash, so a snapshot only writes the chunks that
+# changed since the previous one.
+# PostgreSQL: pg_dump's compressed custom format is streamed to disk, and
+# restored with parallel pg_restore jobs.
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.engine import make_url
+
+from db import engine, primary_engine
+
+BACKUP_DIR = os.environ.get("DASHBOARD_BACKUP_DIR", "backups")
+CHUNK_SIZE = 1 << 20    # bytes per stored chunk
+STEP_PAGES = 4096       # pages copied per backup step
+STEP_SLEEP = 0.005      # pause between steps, lets writers in
+MAX_RESTARTS = 3        # stepped copies restarted by writers before copying in one step
+PARTIAL_STALE = 6 * 3600  # seconds after which an unfinished snapshot is treated as crashed
+COMPRESS_LEVEL = 6
+PARALLEL = min(8, os.cpu_count() or 1)
+RESTORE_JOBS = 4
+DEFAULT_KEEP = 14
+
+
+def _chunk_path(root, digest):
+    return os.path.join(root, "chunks", digest[:2], digest + ".z")
+
+
+def _manifest_path(root, name):
+    return os.path.join(root, name + ".json")
+
+
+def _partial_path(root, name):
+    # Exists while a snapshot is being written; prune leaves chunks alone meanwhile
+    return os.path.join(root, name + ".partial")
+
+
+def _sort_key(name):
+    # "20240101-120000" sorts before "20240101-120000-2"
+    stamp, _, n = name.partition("-")[2].partition("-")
+    return name.partition("-")[0], stamp, int(n or 1)
+
+
+def _sqlite_path():
+    return engine.url.database
+
+
+def _open_readonly(path):
+    """Connect to an existing SQLite file; a missing one is an error, not created empty."""
+    return sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True)
+
+
+def _pg_args(url):
+    """pg_dump/pg_restore connection arguments; the password goes via PGPASSWORD."""
+    url = make_url(url)
+    args = ["--dbname", url.database]
+    if url.host:
+        args += ["--host", url.host]
+    if url.port:
+        args += ["--port", str(url.port)]
+    if url.username:
+        args += ["--username", url.username]
+    env = dict(os.environ)
+    if url.password:
+        env["PGPASSWORD"] = url.password
+    return args, env
+
+
+# --- SNAPSHOT ---
+
+def _store_chunk(root, chunk):
+    """Compress and store one chunk unless it already exists; returns (digest, written)."""
+    digest = hashlib.sha256(chunk).hexdigest()
+    path = _chunk_path(root, digest)
+    if os.path.exists(path):
+        return digest, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique temp name: concurrent snapshots may store the same chunk
+    fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(zlib.compress(chunk, COMPRESS_LEVEL))
+    os.replace(tmp, path)
+    return digest, True
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_sqlite(src, dst):
+    """Online copy of `src` into `dst`; stepped, or one step if writers keep restarting it."""
+    restarts = 0
+    last = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last
+        # A write to the source from another connection starts the copy over
+        if last is not None and remaining > last:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        last = remaining
+
+    try:
+        # Each step holds only a short shared lock on the live file
+        src.backup(dst, pages=STEP_PAGES, sleep=STEP_SLEEP, progress=progress)
+    except _TooManyRestarts:
+        # Writers can't restart a single step; they wait for its read lock instead
+        src.backup(dst)
+
+
+def snapshot_sqlite(root, name):
+    fd, copy_path = tempfile.mkstemp(suffix=".db", dir=root)
+    os.close(fd)
+    try:
+        src = _open_readonly(_sqlite_path())
+        dst = sqlite3.connect(copy_path)
+        try:
+            _copy_sqlite(src, dst)
+        finally:
+            dst.close()
+            src.close()
+
+        whole = hashlib.sha256()
+        digests, written = [], 0
+        with open(copy_path, "rb") as f, ThreadPoolExecutor(PARALLEL) as pool:
+            while True:
+                # zlib releases the GIL, so a batch of chunks compresses in parallel
+                batch = [c for c in (f.read(CHUNK_SIZE) for _ in range(PARALLEL * 2)) if c]
+                if not batch:
+                    break
+                for chunk in batch:
+                    whole.update(chunk)
+                for digest, new in pool.map(lambda c: _store_chunk(root, c), batch):
+                    digests.append(digest)
+                    written += new
+        size = os.path.getsize(copy_path)
+    finally:
+        os.remove(copy_path)
+
+    return {
+        "name": name, "engine": "sqlite", "created_at": datetime.now().isoformat(timespec="seconds"),
+        "size": size, "sha256": whole.hexdigest(), "chunk_size": CHUNK_SIZE,
+        "chunks": digests, "new_chunks": written,
+    }
+
+
+def snapshot_postgres(root, name):
+    args, env = _pg_args(engine.url)
+    dump_file = name + ".dump"
+    path = os.path.join(root, dump_file)
+    with open(path + ".tmp", "wb") as out:
+        # pg_dump runs in one repeatable-read transaction: a consistent view that never blocks readers
+        subprocess.run(
+            ["pg_dump", "--format=custom", f"--compress={COMPRESS_LEVEL}", "--no-owner", *args],
+            stdout=out, env=env, check=True
+        )
+    os.replace(path + ".tmp", path)
+    return {
+        "name": name, "engine": "postgresql", "created_at": datetime.now().isoformat(timespec="seconds"),
+        "size": os.path.getsize(path), "file": dump_file,
+    }
+
+
+def _reserve_name(root):
+    """A new snapshot name, claimed by creating its .partial marker exclusively."""
+    base = datetime.now().strftime("%Y%m%d-%H%M%S")
+    n = 1
+    while True:
+        name = base if n == 1 else f"{base}-{n}"
+        if not os.path.exists(_manifest_path(root, name)):
+            try:
+                os.close(os.open(_partial_path(root, name), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return name
+            except FileExistsError:
+                pass
+        n += 1
+
+
+def snapshot(root=BACKUP_DIR):
+    """Take a snapshot of the app database; returns its manifest."""
+    if primary_engine is not None:
+        raise RuntimeError("Snapshot the primary database, not the local replica (unset DASHBOARD_REPLICA).")
+    os.makedirs(root, exist_ok=True)
+    name = _reserve_name(root)
+    try:
+        if engine.dialect.name == "sqlite":
+            manifest = snapshot_sqlite(root, name)
+        else:
+            manifest = snapshot_postgres(root, name)
+        path = _manifest_path(root, name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(path + ".tmp", path)
+    finally:
+        os.remove(_partial_path(root, name))
+    return manifest
+
+
+def list_snapshots(root=BACKUP_DIR):
+    """Manifests, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    out = []
+    for fn in os.listdir(root):
+        if fn.endswith(".json"):
+            with open(os.path.join(root, fn)) as f:
+                out.append(json.load(f))
+    return sorted(out, key=lambda m: _sort_key(m["name"]))
+
+
+def prune(root=BACKUP_DIR, keep=DEFAULT_KEEP):
+    """Drop all but the newest `keep` snapshots and any chunks no longer referenced.
+
+    Chunks are left alone while another snapshot is still being written (its
+    chunks aren't in any manifest yet). Returns the number of chunks removed.
+    """
+    snaps = list_snapshots(root)
+    for m in snaps[:-keep] if keep > 0 else []:
+        os.remove(_manifest_path(root, m["name"]))
+        if m.get("file"):
+            os.remove(os.path.join(root, m["file"]))
+
+    in_progress = False
+    for fn in os.listdir(root) if os.path.isdir(root) else []:
+        if fn.endswith(".partial"):
+            path = os.path.join(root, fn)
+            if time.time() - os.path.getmtime(path) > PARTIAL_STALE:
+                os.remove(path)  # left behind by a crashed run
+            else:
+                in_progress = True
+    if in_progress:
+        return 0
+    live = {d for m in list_snapshots(root) for d in m.get("chunks", [])}
+    chunk_root = os.path.join(root, "chunks")
+    removed = 0
+    for dirpath, _, files in os.walk(chunk_root):
+        for fn in files:
+            if fn.endswith(".z") and fn[:-2] not in live:
+                os.remove(os.path.join(dirpath, fn))
+                removed += 1
+    return removed
+
+
+# --- RESTORE ---
+
+def _read_chunk(root, digest):
+    with open(_chunk_path(root, digest), "rb") as f:
+        chunk = zlib.decompress(f.read())
+    if hashlib.sha256(chunk).hexdigest() != digest:
+        raise ValueError(f"Chunk {digest} is corrupt.")
+    return chunk
+
+
+def restore_sqlite(root, manifest):
+    fd, copy_path = tempfile.mkstemp(suffix=".db", dir=root)
+    os.close(fd)
+    try:
+        whole = hashlib.sha256()
+        chunks = manifest["chunks"]
+        with open(copy_path, "wb") as out, ThreadPoolExecutor(PARALLEL) as pool:
+            for i in range(0, len(chunks), PARALLEL * 2):
+                for chunk in pool.map(lambda d: _read_chunk(root, d), chunks[i:i + PARALLEL * 2]):
+                    whole.update(chunk)
+                    out.write(chunk)
+        if whole.hexdigest() != manifest["sha256"]:
+            raise ValueError(f"Snapshot {manifest['name']} does not match its checksum.")
+
+        src = sqlite3.connect(copy_path)
+        dst = sqlite3.connect(_sqlite_path(), timeout=30)
+        try:
+            # One step: the live file is swapped under a single write lock,
+            # so open app connections see either the old or the restored data
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        os.remove(copy_path)
+
+
+def restore_postgres(root, manifest):
+    args, env = _pg_args(engine.url)
+    subprocess.run(
+        ["pg_restore", "--clean", "--if-exists", "--no-owner", f"--jobs={RESTORE_JOBS}",
+         *args, os.path.join(root, manifest["file"])],
+        env=env, check=True
+    )
+
+
+def restore(name, root=BACKUP_DIR):
+    """Restore snapshot `name` over the app database."""
+    if primary_engine is not None:
+        raise RuntimeError("Restore the primary database, not the local replica (delete the replica file to re-pull it).")
+    path = _manifest_path(root, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No snapshot named {name} in {root}.")
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["engine"] != engine.dialect.name:
+        raise ValueError(f"Snapshot {name} is a {manifest['engine']} backup; the app database is {engine.dialect.name}.")
+    if manifest["engine"] == "sqlite":
+        restore_sqlite(root, manifest)
+    else:
+        restore_postgres(root, manifest)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot or restore the dashboard database.")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="backup directory")
+    parser.add_argument("--list", action="store_true", help="list snapshots")
+    parser.add_argument("--restore", metavar="NAME", help="restore this snapshot")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="snapshots to keep after a new one (0 keeps all)")
+    args = parser.parse_args()
+
+    if args.list:
+        for m in list_snapshots(args.dir):
+            print(f"{m['name']}  {m['engine']:<10}  {m['size'] / 1e6:8.1f} MB")
+    elif args.restore:
+        started = time.perf_counter()
+        m = restore(args.restore, args.dir)
+        print(f"Restored {m['name']} ({m['size'] / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s.")
+    else:
+        started = time.perf_counter()
+        m = snapshot(args.dir)
+        removed = prune(args.dir, args.keep)
+        detail = f", {m['new_chunks']}/{len(m['chunks'])} chunks new" if m["engine"] == "sqlite" else ""
+        print(f"Snapshot {m['name']} ({m['size'] / 1e6:.1f} MB{detail}) in {time.perf_counter() - started:.1f}s. Pruned {removed} chunks.")
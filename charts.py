@@ -0,0 +1,137 @@
+# charts.py
+# Chart data service for long-range charts.
+# Rows are counted per day in SQL, then rolled up into day/week/month buckets
+# (picked from the requested range) so no chart ships more than MAX_POINTS points.
+import json
+import math
+from datetime import datetime, timedelta
+
+import altair as alt
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, union_all
+
+from db import Task, ArchivedTask, Experiment
+
+MAX_POINTS = 120
+
+# Range label -> days back (None = all history)
+RANGES = {"7D": 7, "30D": 30, "90D": 90, "1Y": 365, "All": None}
+
+# (longest span in days, pandas period freq, unit label); first match wins
+BUCKETS = [
+    (MAX_POINTS, "D", "day"),
+    (MAX_POINTS * 7, "W-SUN", "week"),
+    (None, "M", "month"),
+]
+
+
+def bucket_for(start, end):
+    """(period freq, unit label) for a date range."""
+    span = (end - start).days + 1
+    for limit, freq, unit in BUCKETS:
+        if limit is None or span <= limit:
+            return freq, unit
+
+
+def _window(days, now):
+    """(since, end) dates; since is None for all history."""
+    end = (now or datetime.now()).date()
+    return (end - timedelta(days=days - 1) if days else None), end
+
+
+def _bucketed(daily, start, end, how, max_points):
+    """Roll a per-day frame (DatetimeIndex) up to calendar buckets over [start, end].
+
+    `how` maps column -> re-aggregable function ("sum", "max", "min"), so
+    buckets can be merged again when the range still exceeds max_points.
+    """
+    freq, unit = bucket_for(start, end)
+    periods = pd.period_range(start, end, freq=freq)
+    out = daily.groupby(daily.index.to_period(freq)).agg(how).reindex(periods)
+    starts = periods.start_time
+
+    step = math.ceil(len(out) / max_points)
+    if step > 1:
+        groups = np.arange(len(out)) // step
+        out = out.groupby(groups).agg(how)
+        starts = starts[::step]
+        unit = f"{step} {unit}s"
+
+    out.index = starts
+    out.index.name = "Date"
+    return out, unit
+
+
+def activity_series(db, workspace_id, days=None, now=None, max_points=MAX_POINTS):
+    """Completed tasks (hot + archived) per bucket.
+
+    Returns (DataFrame[Date, Tasks], unit) with empty buckets as 0.
+    """
+    since, end = _window(days, now)
+
+    def completions(m, *where):
+        q = select(m.completed_at.label("completed_at")).where(
+            m.workspace_id == workspace_id, m.completed_at.isnot(None), *where
+        )
+        if since:
+            q = q.where(m.completed_at >= datetime.combine(since, datetime.min.time()))
+        return q
+
+    u = union_all(completions(Task, Task.status == "done"), completions(ArchivedTask)).subquery()
+    day = func.date(u.c.completed_at).label("day")
+    rows = db.execute(select(day, func.count()).group_by(day)).all()
+
+    daily = pd.DataFrame(rows, columns=["day", "Tasks"])
+    daily.index = pd.to_datetime(daily.pop("day"))
+    start = since or (daily.index.min().date() if len(daily) else end)
+
+    out, unit = _bucketed(daily, start, end, {"Tasks": "sum"}, max_points)
+    out["Tasks"] = out["Tasks"].fillna(0).astype(int)
+    return out.reset_index(), unit
+
+
+def experiment_series(db, workspace_id, system_id, days=None, now=None, max_points=MAX_POINTS):
+    """Mean and best Sharpe plus run count per bucket for one system.
+
+    Returns (DataFrame[Date, Sharpe, Best, Runs], unit); buckets without runs are dropped.
+    """
+    since, end = _window(days, now)
+    day = func.date(Experiment.run_date).label("day")
+    q = (
+        select(
+            day,
+            func.sum(Experiment.sharpe),
+            func.count(Experiment.sharpe),
+            func.max(Experiment.sharpe),
+            func.count(Experiment.id),
+        )
+        .where(
+            Experiment.workspace_id == workspace_id,
+            Experiment.system_id == system_id,
+            Experiment.run_date.isnot(None),
+        )
+        .group_by(day)
+    )
+    if since:
+        q = q.where(Experiment.run_date >= datetime.combine(since, datetime.min.time()))
+    rows = db.execute(q).all()
+
+    daily = pd.DataFrame(rows, columns=["day", "sharpe_sum", "sharpe_n", "Best", "Runs"])
+    if daily.empty:
+        return pd.DataFrame(columns=["Date", "Sharpe", "Best", "Runs"]), "day"
+    daily.index = pd.to_datetime(daily.pop("day"))
+    start = since or daily.index.min().date()
+
+    how = {"sharpe_sum": "sum", "sharpe_n": "sum", "Best": "max", "Runs": "sum"}
+    out, unit = _bucketed(daily.astype(float), start, end, how, max_points)
+    out = out[out["Runs"] > 0].copy()
+    out["Sharpe"] = out.pop("sharpe_sum") / out.pop("sharpe_n").replace(0, np.nan)
+    out["Runs"] = out["Runs"].astype(int)
+    return out.reset_index()[["Date", "Sharpe", "Best", "Runs"]], unit
+
+
+def layered(df, name, *layers):
+    """Layer data-less marks over one named dataset so its rows are embedded once."""
+    records = json.loads(df.to_json(orient="records", date_format="iso"))
+    return alt.layer(*layers, data=alt.NamedData(name=name)).properties(datasets={name: records})
@@ -0,0 +1,29 @@
+# conftest.py
+# Tests run against a throwaway SQLite file, never data.db or DATABASE_URL.
+# db.py binds its engine at import, so the URL is set before anything imports it.
+import os
+import tempfile
+import uuid
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='dashboard-tests-'), 'test.db')}"
+os.environ.pop("DASHBOARD_REPLICA", None)
+
+
+@pytest.fixture
+def db():
+    from db import init_db, SessionLocal
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def ws():
+    """A fresh workspace per test, so tests sharing the database don't see each other's rows."""
+    return f"test-{uuid.uuid4().hex[:8]}"
@@ -2,8 +2,10 @@
 from datetime import datetime
 from sqlalchemy import (
     create_engine, Column, Integer, String, DateTime,
-    Float, Text, Boolean, ForeignKey
+    Float, Text, Boolean, ForeignKey, Index, UniqueConstraint, CheckConstraint,
+    case, inspect, text, update
 )
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 
 import os
@@ -11,14 +13,23 @@ import os
 # --- DB CONFIGURATION ---
 # Check for environment variable (e.g. from Railway/Heroku/Streamlit Cloud)
 DATABASE_URL = os.environ.get("DATABASE_URL")
+# Optional local replica file: with DATABASE_URL set, the app reads and writes
+# this SQLite copy and sync.py exchanges changes with the primary in the background
+REPLICA_PATH = os.environ.get("DASHBOARD_REPLICA")
+primary_engine = None  # set only in replica mode
 
 if DATABASE_URL:
     # Fix for some cloud providers that use "postgres://" instead of "postgresql://"
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
     
-    # PRODUCTION (PostgreSQL)
-    engine = create_engine(DATABASE_URL, echo=False, future=True)
+    if REPLICA_PATH:
+        # OFFLINE-CAPABLE (local SQLite replica of PostgreSQL)
+        primary_engine = create_engine(DATABASE_URL, echo=False, future=True, pool_pre_ping=True)
+        engine = create_engine(f"sqlite:///{REPLICA_PATH}", echo=False, future=True, connect_args={"check_same_thread": False})
+    else:
+        # PRODUCTION (PostgreSQL)
+        engine = create_engine(DATABASE_URL, echo=False, future=True)
 else:
     # LOCAL DEVELOPMENT (SQLite)
     DB_URL = "sqlite:///data.db"
@@ -26,17 +37,54 @@ else:
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+# Every row belongs to a workspace (one per user). Single-user installs live in "default".
+DEFAULT_WORKSPACE = "default"
+
+# --- VALUE DOMAINS ---
+# Stored lower-case and enforced by CHECK constraints (see _migrate_domains),
+# so queries compare raw columns and never normalise per row.
+TASK_STATUSES = ("inbox", "next", "doing", "done")
+PRIORITIES = ("low", "medium", "high")
+AREAS = ("trading", "research", "writing", "personal", "paper", "algo", "patent", "business")
+PROJECT_STATUSES = ("active", "on_hold", "done")
+SYSTEM_STATUSES = ("idea", "rd", "paper", "live", "deprecated")
+DECISIONS = ("undecided", "accept", "reject", "investigate")
+
+
+def _check(table, column, values):
+    """CHECK constraint limiting `column` to `values` (NULL allowed)."""
+    allowed = ", ".join(f"'{v}'" for v in values)
+    return CheckConstraint(f"{column} IN ({allowed})", name=f"ck_{table}_{column}")
+
+
+def priority_rank(col):
+    """SQL sort key: high first, unknown/NULL treated as medium."""
+    return case({"high": 0, "medium": 1, "low": 2}, value=col, else_=1)
+
+
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        UniqueConstraint("workspace_id", "name", name="uq_projects_ws_name"),
+        Index("ix_projects_ws_area", "workspace_id", "area"),
+        Index("ix_projects_ws_target_date", "workspace_id", "target_date"),
+        _check("projects", "status", PROJECT_STATUSES),
+        _check("projects", "area", AREAS),
+        Index("ix_projects_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, nullable=False)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
+    name = Column(String, nullable=False)
     description = Column(Text)
-    status = Column(String, default="active")  # active / on_hold / done
-    area = Column(String, default="trading")   # trading / research / writing / personal
+    status = Column(String, default="active")  # PROJECT_STATUSES
+    area = Column(String, default="trading")   # AREAS
     created_at = Column(DateTime, default=datetime.utcnow)
     target_date = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every write to the project's tasks (touch_projects); keys the project page cache
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     systems = relationship("System", back_populates="project")
     tasks = relationship("Task", back_populates="project")
@@ -44,15 +92,22 @@ class Project(Base):
 
 class System(Base):
     __tablename__ = "systems"
+    __table_args__ = (
+        UniqueConstraint("workspace_id", "name", name="uq_systems_ws_name"),
+        _check("systems", "status", SYSTEM_STATUSES),
+        Index("ix_systems_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, nullable=False)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
+    name = Column(String, nullable=False)
     description = Column(Text)
-    status = Column(String, default="rd")  # idea / rd / paper / live / deprecated
-    system_type = Column(String, default="trend")  # trend / mean_rev / etc.
+    status = Column(String, default="rd")  # SYSTEM_STATUSES
+    system_type = Column(String, default="trend")  # free-form tag: trend / mean_rev / etc.
     repo_url = Column(String)
     platform = Column(String, default="QuantConnect")
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     project = relationship("Project", back_populates="systems")
@@ -60,10 +115,30 @@ class System(Base):
     experiments = relationship("Experiment", back_populates="system")
 
 
+# Columns the experiments table can be sorted by (each has a per-system index)
+EXPERIMENT_SORT_KEYS = ("sharpe", "cagr", "max_drawdown", "win_rate", "rr_ratio", "trades", "run_date")
+
+
 class Experiment(Base):
     __tablename__ = "experiments"
+    __table_args__ = (
+        Index("ix_experiments_ws_system", "workspace_id", "system_id"),
+        # Per-system sort keys for the server-side sorted experiments table. NULL
+        # ranks lowest (SQLite's order; declared on PostgreSQL) and id breaks ties
+        # in the same direction, so either direction is one index scan.
+        *(
+            Index(f"ix_experiments_system_{m}_id", "system_id", m, "id", postgresql_ops={m: "NULLS FIRST"})
+            for m in EXPERIMENT_SORT_KEYS
+        ),
+        Index("ix_experiments_system_decision", "system_id", "decision"),
+        # Runs of one configuration in time order, for regression checks
+        Index("ix_experiments_config_run", "system_id", "name", "period", "run_date"),
+        _check("experiments", "decision", DECISIONS),
+        Index("ix_experiments_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
     name = Column(String, nullable=False)  # e.g. "RSI14_SL2_TP4"
     system_id = Column(Integer, ForeignKey("systems.id"), nullable=False)
 
@@ -80,24 +155,75 @@ class Experiment(Base):
     trades = Column(Integer, nullable=True)
 
     notes = Column(Text)
-    decision = Column(String, default="undecided")  # accept / reject / investigate
+    decision = Column(String, default="undecided")  # DECISIONS
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     system = relationship("System", back_populates="experiments")
 
 
+class RecurrenceRule(Base):
+    # Template for a repeating task; recurrence.py materialises its occurrences as Task rows
+    __tablename__ = "recurrence_rules"
+    __table_args__ = (
+        Index("ix_recurrence_rules_ws_active", "workspace_id", "active", "materialized_until"),
+        _check("recurrence_rules", "area", AREAS),
+        _check("recurrence_rules", "priority", PRIORITIES),
+        Index("ix_recurrence_rules_updated_at", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    area = Column(String, default="personal")
+    priority = Column(String, default="low")
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+
+    freq = Column(String, default="weekly")  # daily / weekly / monthly
+    interval = Column(Integer, default=1)    # every N freq units
+    starts_at = Column(DateTime, nullable=False)
+    until = Column(DateTime, nullable=True)
+    materialized_until = Column(DateTime, nullable=True)  # occurrences before this exist as tasks
+    active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_ws_status", "workspace_id", "status"),
+        Index("ix_tasks_ws_project", "workspace_id", "project_id"),
+        Index("ix_tasks_ws_due_date", "workspace_id", "due_date"),
+        Index("ix_tasks_ws_milestone", "workspace_id", "is_milestone", "is_active_milestone"),
+        # At most one active milestone per workspace, enforced by the database
+        Index(
+            "uq_tasks_ws_active_milestone", "workspace_id", unique=True,
+            sqlite_where=text("is_active_milestone"), postgresql_where=text("is_active_milestone"),
+        ),
+        # One occurrence per rule per due date; also makes materialisation idempotent
+        Index("uq_tasks_recurrence_due", "recurrence_id", "due_date", unique=True),
+        _check("tasks", "status", TASK_STATUSES),
+        _check("tasks", "area", AREAS),
+        _check("tasks", "priority", PRIORITIES),
+        Index("ix_tasks_updated_at", "updated_at"),
+        # Archived tasks and events keep their task id, so SQLite must never hand
+        # a freed id out again (see _migrate_task_ids)
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
     title = Column(String, nullable=False)
     description = Column(Text)
-    status = Column(String, default="next")   # inbox / next / doing / done
-    area = Column(String, default="trading") # trading / research / writing / personal
-    priority = Column(String, default="medium")  # low / medium / high
+    status = Column(String, default="next")   # TASK_STATUSES
+    area = Column(String, default="trading") # AREAS
+    priority = Column(String, default="medium")  # PRIORITIES
 
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     project = relationship("Project", back_populates="tasks")
@@ -109,6 +235,287 @@ class Task(Base):
     is_milestone = Column(Boolean, default=False)
     is_active_milestone = Column(Boolean, default=False)
 
+    recurrence_id = Column(Integer, ForeignKey("recurrence_rules.id"), nullable=True)
+
+    # Scheduling (dependencies.py): remaining work in days, and the days until this
+    # task can finish along its longest chain of open prerequisites
+    estimate_days = Column(Float, nullable=False, default=1.0)
+    earliest_finish = Column(Float, nullable=True)
+
+    # Optimistic locking: ORM updates/deletes check and bump this (StaleDataError on conflict)
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": version}
+
+
+class TaskDependency(Base):
+    # Edge: `task_id` cannot finish before `depends_on_id`. The unique index is the
+    # forward adjacency list, ix_task_dependencies_depends_on the reverse one.
+    __tablename__ = "task_dependencies"
+    __table_args__ = (
+        UniqueConstraint("task_id", "depends_on_id", name="uq_task_dependencies_edge"),
+        Index("ix_task_dependencies_depends_on", "depends_on_id", "task_id"),
+        Index("ix_task_dependencies_ws", "workspace_id"),
+        Index("ix_task_dependencies_updated_at", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    depends_on_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ArchivedTask(Base):
+    # Cold copy of a done task moved out of `tasks` by archive.py (keeps the original id)
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        Index("ix_tasks_archive_ws_completed", "workspace_id", "completed_at"),
+        _check("tasks_archive", "status", TASK_STATUSES),
+        _check("tasks_archive", "area", AREAS),
+        _check("tasks_archive", "priority", PRIORITIES),
+        Index("ix_tasks_archive_ws_project", "workspace_id", "project_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    status = Column(String, default="done")
+    area = Column(String)
+    priority = Column(String)
+
+    due_date = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    system_id = Column(Integer, ForeignKey("systems.id"), nullable=True)
+
+
+class ArchivedTaskCount(Base):
+    # Running totals of archived tasks so stats don't have to rescan the archive
+    __tablename__ = "tasks_archive_counts"
+
+    workspace_id = Column(String, primary_key=True)
+    area = Column(String, primary_key=True)  # lower-cased, "" when unset
+    project_id = Column(Integer, primary_key=True, default=0)  # 0 = no project
+    done = Column(Integer, nullable=False, default=0)
+
+
+class Event(Base):
+    # Append-only change feed; `id` is the consumer cursor (see events.py)
+    __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_ws_id", "workspace_id", "id"),
+        Index("ix_events_ws_kind_id", "workspace_id", "kind", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    workspace_id = Column(String, nullable=False, default=DEFAULT_WORKSPACE)
+    kind = Column(String, nullable=False)  # task_created / task_status_changed / task_completed / ...
+    task_id = Column(Integer, nullable=True)  # no FK: events outlive deleted rows
+    project_id = Column(Integer, nullable=True)
+    payload = Column(Text)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def scoped(db, model, workspace_id):
+    """Query `model` restricted to a single workspace."""
+    return db.query(model).filter(model.workspace_id == workspace_id)
+
+
+def touch_projects(db, workspace_id, project_ids):
+    """Bump Project.version after adding, removing or changing tasks of these projects.
+
+    updated_at is left alone: the project itself wasn't edited, and sync
+    decides which side of an edit wins on it.
+    """
+    ids = {p for p in project_ids if p is not None}
+    if ids:
+        db.execute(
+            update(Project)
+            .where(Project.workspace_id == workspace_id, Project.id.in_(ids))
+            .values(version=Project.version + 1, updated_at=Project.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _sql_default(value):
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _add_missing_columns(bind):
+    # create_all() never alters existing tables, so columns added to the models
+    # after a database was created are appended here (with their scalar default).
+    insp = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=bind.dialect)}"
+                if col.default is not None and col.default.is_scalar:
+                    ddl += f" DEFAULT {_sql_default(col.default.arg)}"
+                conn.execute(text(ddl))
+
+
+def _repair_active_milestones(bind):
+    # Databases from before uq_tasks_ws_active_milestone may hold several active
+    # milestones per workspace; keep the newest so the unique index can be built.
+    if inspect(bind).has_index("tasks", "uq_tasks_ws_active_milestone"):
+        return
+    with bind.begin() as conn:
+        conn.execute(text(
+            "UPDATE tasks SET is_active_milestone = FALSE "
+            "WHERE is_active_milestone AND id NOT IN ("
+            "SELECT MAX(id) FROM tasks WHERE is_active_milestone GROUP BY workspace_id)"
+        ))
+
+
+# Indexes replaced by differently defined ones under a new name
+_RETIRED_INDEXES = [
+    "ix_experiments_system_sharpe", "ix_experiments_system_cagr", "ix_experiments_system_max_drawdown",
+    "ix_experiments_system_win_rate", "ix_experiments_system_run_date",
+]
+
+
+def _create_missing_indexes(bind):
+    with bind.begin() as conn:
+        for name in _RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for table in Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            idx.create(bind=bind, checkfirst=True)
+
+
+# column -> (domain, replacement for values outside it)
+_DOMAIN_FIXES = {
+    "projects": {"status": (PROJECT_STATUSES, "'active'"), "area": (AREAS, "NULL")},
+    "systems": {"status": (SYSTEM_STATUSES, "'rd'")},
+    "experiments": {"decision": (DECISIONS, "'undecided'")},
+    "recurrence_rules": {"area": (AREAS, "NULL"), "priority": (PRIORITIES, "'medium'")},
+    "tasks": {"status": (TASK_STATUSES, "'next'"), "area": (AREAS, "NULL"), "priority": (PRIORITIES, "'medium'")},
+    "tasks_archive": {"status": (TASK_STATUSES, "'done'"), "area": (AREAS, "NULL"), "priority": (PRIORITIES, "'medium'")},
+}
+
+
+def _migrate_domains(bind):
+    # Tables created before the CHECK constraints hold free-form values: lower-case
+    # and trim them, map anything still outside the domain to the column default
+    # (areas to NULL, "unset"), then add the constraints. PostgreSQL can ALTER them
+    # in; SQLite cannot, so the table is rebuilt under the new definition.
+    insp = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        fixes = _DOMAIN_FIXES.get(table.name)
+        if not fixes or not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_check_constraints(table.name)}
+        missing = [c for c in table.constraints if isinstance(c, CheckConstraint) and c.name not in existing]
+        if not missing:
+            continue
+        with bind.begin() as conn:
+            for col, (domain, fallback) in fixes.items():
+                allowed = ", ".join(f"'{v}'" for v in domain)
+                conn.execute(text(f"UPDATE {table.name} SET {col} = LOWER(TRIM({col})) WHERE {col} <> LOWER(TRIM({col}))"))
+                conn.execute(text(f"UPDATE {table.name} SET {col} = {fallback} WHERE {col} NOT IN ({allowed})"))
+            if bind.dialect.name == "sqlite":
+                _rebuild_sqlite_table(conn, table)
+            else:
+                for ck in missing:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD CONSTRAINT {ck.name} CHECK ({ck.sqltext})"))
+
+
+def _migrate_unique_names(bind):
+    # Before workspaces, project and system names were unique across the whole
+    # database (projects_name_key / systems_name_key on PostgreSQL). create_all()
+    # leaves existing tables alone, so swap those for the per-workspace constraints.
+    insp = inspect(bind)
+    for table in (Project.__table__, System.__table__):
+        if not insp.has_table(table.name):
+            continue
+        uniques = insp.get_unique_constraints(table.name)
+        stale = [u for u in uniques if u["column_names"] == ["name"]]
+        wanted = f"uq_{table.name}_ws_name"
+        has_new = any(u["name"] == wanted for u in uniques)
+        if not stale and has_new:
+            continue
+        with bind.begin() as conn:
+            if bind.dialect.name == "sqlite":
+                _rebuild_sqlite_table(conn, table)
+                continue
+            for u in stale:
+                conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{u["name"]}"'))
+            if not has_new:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD CONSTRAINT {wanted} UNIQUE (workspace_id, name)"))
+
+
+def _migrate_task_ids(bind):
+    # Without AUTOINCREMENT, SQLite reuses the highest ids once they are deleted,
+    # e.g. after archive.py moves the newest done tasks out; the next archive run
+    # then collides in tasks_archive. Rebuild the table as AUTOINCREMENT, move live
+    # tasks off ids the archive already holds, and start the sequence above every
+    # task id used so far (events included).
+    if bind.dialect.name != "sqlite" or not inspect(bind).has_table("tasks"):
+        return
+    with bind.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")).scalar()
+        autoincrement = "AUTOINCREMENT" in ddl.upper()
+        if autoincrement:
+            seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'")).scalar() or 0
+            if seq >= (conn.execute(text("SELECT MAX(id) FROM tasks_archive")).scalar() or 0):
+                return
+        else:
+            _rebuild_sqlite_table(conn, Task.__table__)
+
+        top = conn.execute(text(
+            "SELECT MAX(n) FROM (SELECT MAX(id) AS n FROM tasks UNION ALL SELECT MAX(id) FROM tasks_archive "
+            "UNION ALL SELECT MAX(task_id) FROM events)"
+        )).scalar() or 0
+        reused = [i for (i,) in conn.execute(text("SELECT id FROM tasks WHERE id IN (SELECT id FROM tasks_archive) ORDER BY id"))]
+        for old in reused:
+            top += 1
+            params = {"old": old, "new": top}
+            conn.execute(text("UPDATE tasks SET id = :new WHERE id = :old"), params)
+            conn.execute(text("UPDATE task_dependencies SET task_id = :new WHERE task_id = :old"), params)
+            conn.execute(text("UPDATE task_dependencies SET depends_on_id = :new WHERE depends_on_id = :old"), params)
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'tasks'"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', :top)"), {"top": top})
+
+
+def _rebuild_sqlite_table(conn, table):
+    # SQLite's documented ALTER recipe: create, copy, drop, rename. Indexes are
+    # recreated by _create_missing_indexes, sync triggers by sync.install().
+    old_cols = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table.name})"))}
+    cols = ", ".join(c.name for c in table.columns if c.name in old_cols)
+    tmp = f"{table.name}__new"
+    ddl = str(CreateTable(table).compile(dialect=conn.dialect))
+    conn.execute(text("PRAGMA legacy_alter_table = ON"))
+    conn.execute(text(ddl.replace(f"CREATE TABLE {table.name} (", f"CREATE TABLE {tmp} (", 1)))
+    conn.execute(text(f"INSERT INTO {tmp} ({cols}) SELECT {cols} FROM {table.name}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {tmp} RENAME TO {table.name}"))
+    conn.execute(text("PRAGMA legacy_alter_table = OFF"))
+
+
+def init_schema(bind):
+    Base.metadata.create_all(bind=bind)
+    _add_missing_columns(bind)
+    _migrate_domains(bind)
+    _migrate_unique_names(bind)
+    _migrate_task_ids(bind)
+    _repair_active_milestones(bind)
+    _create_missing_indexes(bind)
+
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # In replica mode the primary's schema is brought up by sync.py once it is reachable
+    init_schema(engine)
@@ -0,0 +1,258 @@
+# dependencies.py
+# Task-to-task dependencies and the milestone schedule built on them.
+#
+# Every linked task stores earliest_finish: the days of open work before it
+# can be done, i.e. its own estimate plus the largest earliest_finish among its
+# prerequisites. Done tasks finish at 0; milestones take no time themselves.
+# A change only recomputes the tasks downstream of it, found through the
+# reverse adjacency index, and only rows whose value actually moved are written.
+#   python dependencies.py --rebuild
+import argparse
+from collections import defaultdict, deque
+from datetime import datetime
+
+from sqlalchemy import bindparam, or_, select
+
+from db import init_db, SessionLocal, scoped, Task, TaskDependency
+
+_SCHEDULE_COLUMNS = (Task.id, Task.status, Task.is_milestone, Task.estimate_days, Task.earliest_finish)
+
+
+def _own(row):
+    """Days of work the task itself still needs."""
+    if row.status == "done" or row.is_milestone:
+        return 0.0
+    return max(row.estimate_days or 0.0, 0.0)
+
+
+def _finish(row):
+    # A task that was never linked has no stored value yet
+    return row.earliest_finish if row.earliest_finish is not None else _own(row)
+
+
+def _descendants(db, ws, seeds):
+    """`seeds` plus every task that (transitively) depends on one of them."""
+    found, frontier = set(seeds), list(seeds)
+    while frontier:
+        nxt = [
+            t for (t,) in db.query(TaskDependency.task_id).filter(
+                TaskDependency.workspace_id == ws, TaskDependency.depends_on_id.in_(frontier)
+            )
+            if t not in found
+        ]
+        found.update(nxt)
+        frontier = list(set(nxt))
+    return found
+
+
+def propagate(db, ws, task_ids):
+    """Recompute earliest_finish for `task_ids` and whatever downstream changes.
+
+    Returns the number of rows updated. Callers commit.
+    """
+    db.flush()
+    affected = _descendants(db, ws, task_ids)
+    rows = {r.id: r for r in db.query(*_SCHEDULE_COLUMNS).filter(Task.id.in_(affected))}
+    edges = (
+        db.query(TaskDependency.task_id, TaskDependency.depends_on_id)
+        .filter(TaskDependency.workspace_id == ws, TaskDependency.task_id.in_(list(rows)))
+        .all()
+    )
+    preds, succs, indeg = defaultdict(list), defaultdict(list), dict.fromkeys(rows, 0)
+    for t, d in edges:
+        preds[t].append(d)
+        if d in rows:
+            succs[d].append(t)
+            indeg[t] += 1
+    outside = {d for _, d in edges if d not in rows}
+    finish = {r.id: _finish(r) for r in db.query(*_SCHEDULE_COLUMNS).filter(Task.id.in_(outside))} if outside else {}
+
+    # Topological pass over the affected subgraph; a task is only recomputed
+    # if it was changed itself, was never computed, or a prerequisite moved
+    dirty = set(task_ids) | {i for i, r in rows.items() if r.earliest_finish is None}
+    changed = {}
+    queue = deque(i for i, n in indeg.items() if n == 0)
+    while queue:
+        i = queue.popleft()
+        r = rows[i]
+        if i in dirty:
+            value = 0.0 if r.status == "done" else _own(r) + max((finish[d] for d in preds[i]), default=0.0)
+            if value != r.earliest_finish:
+                changed[i] = value
+                dirty.update(succs[i])
+            finish[i] = value
+        else:
+            finish[i] = _finish(r)
+        for s in succs[i]:
+            indeg[s] -= 1
+            if indeg[s] == 0:
+                queue.append(s)
+
+    if changed:
+        t = Task.__table__
+        db.execute(
+            t.update().where(t.c.id == bindparam("_id")).values(earliest_finish=bindparam("_ef")),
+            [{"_id": i, "_ef": v} for i, v in changed.items()],
+        )
+    return len(changed)
+
+
+def _depends_on(db, ws, start, target):
+    """True if `start` (transitively) waits for `target`; walks the forward index."""
+    seen, frontier = {start}, [start]
+    while frontier:
+        nxt = [
+            d for (d,) in db.query(TaskDependency.depends_on_id).filter(
+                TaskDependency.workspace_id == ws, TaskDependency.task_id.in_(frontier)
+            )
+        ]
+        if target in nxt:
+            return True
+        frontier = [d for d in set(nxt) if d not in seen]
+        seen.update(frontier)
+    return False
+
+
+def add_dependency(db, ws, task_id, depends_on_id):
+    """Make `task_id` wait for `depends_on_id`. Raises ValueError on a cycle."""
+    if task_id == depends_on_id:
+        raise ValueError("A task cannot depend on itself.")
+    found = scoped(db, Task, ws).filter(Task.id.in_([task_id, depends_on_id])).count()
+    if found != 2:
+        raise ValueError("Task not found.")
+    exists = db.query(TaskDependency.id).filter(
+        TaskDependency.task_id == task_id, TaskDependency.depends_on_id == depends_on_id
+    ).first()
+    if exists:
+        return False
+    if _depends_on(db, ws, depends_on_id, task_id):
+        raise ValueError("That link would create a cycle.")
+    db.add(TaskDependency(workspace_id=ws, task_id=task_id, depends_on_id=depends_on_id))
+    propagate(db, ws, [depends_on_id, task_id])
+    return True
+
+
+def remove_dependency(db, ws, task_id, depends_on_id):
+    n = db.query(TaskDependency).filter(
+        TaskDependency.workspace_id == ws,
+        TaskDependency.task_id == task_id, TaskDependency.depends_on_id == depends_on_id,
+    ).delete(synchronize_session=False)
+    if n:
+        propagate(db, ws, [task_id])
+    return bool(n)
+
+
+def set_estimate(db, ws, task_id, days):
+    t = scoped(db, Task, ws).filter(Task.id == task_id).first()
+    if t is None:
+        return False
+    t.estimate_days = max(float(days), 0.0)
+    propagate(db, ws, [task_id])
+    return True
+
+
+def detach(db, ws, task_ids):
+    """Drop every edge touching `task_ids` (before deleting them) and reschedule their dependents."""
+    task_ids = list(task_ids)
+    dependents = {
+        t for (t,) in db.query(TaskDependency.task_id).filter(
+            TaskDependency.workspace_id == ws, TaskDependency.depends_on_id.in_(task_ids)
+        )
+    } - set(task_ids)
+    db.query(TaskDependency).filter(
+        TaskDependency.workspace_id == ws,
+        or_(TaskDependency.task_id.in_(task_ids), TaskDependency.depends_on_id.in_(task_ids)),
+    ).delete(synchronize_session=False)
+    if dependents:
+        propagate(db, ws, dependents)
+
+
+def prerequisites(db, ws, task_id):
+    """Direct prerequisites of `task_id`, longest chain first."""
+    rows = (
+        scoped(db, Task, ws)
+        .join(TaskDependency, TaskDependency.depends_on_id == Task.id)
+        .filter(TaskDependency.task_id == task_id)
+        .all()
+    )
+    return sorted(rows, key=lambda t: (-_finish(t), t.id))
+
+
+def critical_path(db, ws, task_id):
+    """Open tasks on the longest chain leading to `task_id`, first to do first.
+
+    The upstream edges come back from one recursive query; the chain is then
+    followed in memory along the prerequisite with the largest earliest finish.
+    """
+    edge = TaskDependency
+    up = (
+        select(edge.task_id, edge.depends_on_id)
+        .where(edge.workspace_id == ws, edge.task_id == task_id)
+        .cte("upstream", recursive=True)
+    )
+    up = up.union(
+        select(edge.task_id, edge.depends_on_id)
+        .join(up, edge.task_id == up.c.depends_on_id)
+        .where(edge.workspace_id == ws)
+    )
+    rows = db.execute(
+        select(up.c.task_id, Task.id, Task.title, Task.status, Task.is_milestone, Task.estimate_days, Task.earliest_finish)
+        .join(Task, Task.id == up.c.depends_on_id)
+    ).all()
+    preds = defaultdict(list)
+    for r in rows:
+        preds[r[0]].append(r)
+
+    path, seen, current = [], {task_id}, task_id
+    while True:
+        options = [p for p in preds[current] if p.id not in seen]
+        nxt = max(options, key=lambda t: (_finish(t), -t.id), default=None)
+        if nxt is None or _finish(nxt) <= 0:
+            break
+        path.append(nxt)
+        seen.add(nxt.id)
+        current = nxt.id
+    return path[::-1]
+
+
+def slack_days(task, now=None):
+    """Calendar days between the earliest finish and the due date (negative = late)."""
+    if task.due_date is None:
+        return None
+    days_left = (task.due_date.date() - (now or datetime.now()).date()).days
+    return days_left - (task.earliest_finish or 0.0)
+
+
+def rebuild(db, ws=None):
+    """Recompute every linked task from scratch (e.g. after rows were edited outside the app)."""
+    q = db.query(TaskDependency.workspace_id, TaskDependency.task_id, TaskDependency.depends_on_id)
+    if ws is not None:
+        q = q.filter(TaskDependency.workspace_id == ws)
+    # Both ends: a prerequisite with no prerequisites of its own is linked too
+    by_ws = defaultdict(set)
+    for w, t, d in q:
+        by_ws[w].update((t, d))
+    n = 0
+    for w, ids in by_ws.items():
+        scoped(db, Task, w).filter(Task.id.in_(ids)).update({Task.earliest_finish: None}, synchronize_session=False)
+        n += propagate(db, w, ids)
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task dependency schedule maintenance.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute earliest finishes for all linked tasks")
+    parser.add_argument("--workspace", default=None)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            n = rebuild(db, args.workspace)
+            db.commit()
+            print(f"Recomputed {n} tasks.")
+        else:
+            parser.print_help()
+    finally:
+        db.close()
@@ -0,0 +1,96 @@
+# events.py
+# Append-only change feed written by the commit paths in app.py.
+# Events are added to the caller's session, so they commit (or roll back)
+# together with the change they describe. Consumers keep the id of the last
+# event they processed and ask for everything after it. Ids are assigned at
+# insert time, so with concurrent writers a consumer should re-read a short
+# tail behind its cursor rather than assume strict commit order.
+import json
+from datetime import datetime
+
+from db import Event
+
+TASK_CREATED = "task_created"
+TASK_STATUS_CHANGED = "task_status_changed"
+TASK_COMPLETED = "task_completed"
+TASK_DELETED = "task_deleted"
+MILESTONE_ACTIVATED = "milestone_activated"
+PROJECT_CREATED = "project_created"
+PROJECT_DELETED = "project_deleted"
+RECURRENCE_MATERIALIZED = "recurrence_materialized"
+
+
+def record_event(db, workspace_id, kind, task_id=None, project_id=None, **payload):
+    ev = Event(
+        workspace_id=workspace_id, kind=kind,
+        task_id=task_id, project_id=project_id,
+        payload=json.dumps(payload, default=str) if payload else None,
+    )
+    db.add(ev)
+    return ev
+
+
+def record_task_created(db, task):
+    # Needs task.id, so flush the pending insert first
+    db.flush()
+    return record_event(
+        db, task.workspace_id, TASK_CREATED, task.id, task.project_id,
+        title=task.title, status=task.status, area=task.area, is_milestone=bool(task.is_milestone),
+    )
+
+
+def set_task_status(db, task, status):
+    """Change a task's status and log it; completing also stamps completed_at."""
+    old = task.status
+    task.status = status
+    if status == "done":
+        task.completed_at = datetime.now()
+    record_event(db, task.workspace_id, TASK_STATUS_CHANGED, task.id, task.project_id, old=old, new=status)
+    if status == "done" and old != "done":
+        record_event(db, task.workspace_id, TASK_COMPLETED, task.id, task.project_id, completed_at=task.completed_at)
+
+
+def read_events(db, after=0, workspace_id=None, kinds=None, limit=500):
+    """Events with id > `after`, oldest first, as plain dicts.
+
+    The next cursor is the last returned event's "id" (or `after` if empty).
+    """
+    q = db.query(Event).filter(Event.id > after)
+    if workspace_id is not None:
+        q = q.filter(Event.workspace_id == workspace_id)
+    if kinds:
+        q = q.filter(Event.kind.in_(list(kinds)))
+    return [
+        {
+            "id": e.id,
+            "workspace_id": e.workspace_id,
+            "kind": e.kind,
+            "task_id": e.task_id,
+            "project_id": e.project_id,
+            "payload": json.loads(e.payload) if e.payload else {},
+            "created_at": e.created_at,
+        }
+        for e in q.order_by(Event.id).limit(limit)
+    ]
+
+
+def iter_events(db, after=0, workspace_id=None, kinds=None, batch_size=500):
+    # Streams every event after the cursor, one page at a time
+    while True:
+        batch = read_events(db, after, workspace_id, kinds, batch_size)
+        if not batch:
+            return
+        yield from batch
+        after = batch[-1]["id"]
+
+
+def latest_event_id(db, workspace_id=None, kinds=None):
+    q = db.query(Event.id)
+    if workspace_id is not None:
+        q = q.filter(Event.workspace_id == workspace_id)
+    if kinds:
+        # One index seek per kind (ix_events_ws_kind_id) rather than walking back through other kinds
+        rows = [q.filter(Event.kind == k).order_by(Event.id.desc()).first() for k in kinds]
+        return max((r[0] for r in rows if r), default=0)
+    row = q.order_by(Event.id.desc()).first()
+    return row[0] if row else 0
@@ -0,0 +1,246 @@
+# loadtest.py
+# Simulates concurrent dashboard sessions and reports latency percentiles,
+# pool checkout times and lock errors.
+#   python loadtest.py --workers 8 --duration 30 --seed 50000
+#   python loadtest.py --database-url postgresql://... --use-existing --workers 16 --no-seed
+#
+# Each worker process renders pages through Streamlit's AppTest (the same
+# code path as a browser rerun) against a shared database. A fraction of
+# iterations also performs a write, like a user completing or adding a task.
+# By default everything runs against a fresh temporary SQLite file; an existing
+# database is only used when named with --database-url and --use-existing, and
+# even then the harness only ever completes tasks it created itself.
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "app.py")
+
+PAGES = {
+    "home": {},
+    "research": {"page": "research"},
+    "business": {"page": "business"},
+    "systems": {"page": "systems"},
+    "milestones": {"page": "milestones"},
+    "history": {"page": "history"},
+    "project": {"project_id": "1"},
+}
+
+
+# Title prefix of every task and project the harness creates
+TAG = "[loadtest]"
+
+
+def _is_lock_error(exc):
+    text = str(exc).lower()
+    return "database is locked" in text or "deadlock" in text or "could not obtain lock" in text
+
+
+def seed_database(n_tasks, n_projects=20):
+    """Bulk-insert projects and `n_tasks` tasks spread over the last year, all tagged."""
+    from db import init_db, SessionLocal, Project, Task
+    init_db()
+    db = SessionLocal()
+    try:
+        areas = ["paper", "algo", "patent", "research", "trading"]
+        run = datetime.now().strftime("%Y%m%d-%H%M%S")
+        projects = [
+            Project(name=f"{TAG} {run} Project {i}", area=areas[i % len(areas)], status="active")
+            for i in range(n_projects)
+        ]
+        db.add_all(projects)
+        db.commit()
+        pids = [p.id for p in projects] + [None]
+
+        now = datetime.now()
+        rows = []
+        for i in range(n_tasks):
+            created = now - timedelta(minutes=random.randint(0, 525600))
+            done = random.random() < 0.7
+            rows.append({
+                "title": f"{TAG} Task {i}",
+                "status": "done" if done else random.choice(["inbox", "next", "doing"]),
+                "area": random.choice(["research", "trading", "writing", "personal"]),
+                "priority": random.choice(["low", "medium", "high"]),
+                "created_at": created,
+                "completed_at": created + timedelta(hours=random.randint(1, 400)) if done else None,
+                "due_date": None if done else now + timedelta(days=random.randint(-5, 60)),
+                "project_id": random.choice(pids),
+            })
+            if len(rows) == 5000:
+                db.bulk_insert_mappings(Task, rows)
+                rows = []
+        if rows:
+            db.bulk_insert_mappings(Task, rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _do_write(db):
+    from db import DEFAULT_WORKSPACE, Task
+    from writes import with_retry, add_task, complete_task
+    ws = DEFAULT_WORKSPACE
+    if random.random() < 0.5:
+        row = (
+            db.query(Task.id)
+            .filter(Task.workspace_id == ws, Task.status != "done", Task.title.startswith(TAG, autoescape=True))
+            .order_by(Task.id.desc())
+            .first()
+        )
+        if row:
+            with_retry(db, lambda db: complete_task(db, ws, row.id))
+    else:
+        with_retry(db, lambda db: add_task(
+            db, ws, title=f"{TAG} task", status="inbox", area="research",
+            priority="medium", created_at=datetime.now()
+        ))
+
+
+def worker(worker_id, pages, duration, write_ratio, queue):
+    import warnings
+    warnings.filterwarnings("ignore")
+    from streamlit.testing.v1 import AppTest
+    from db import engine, SessionLocal
+
+    # Time every pool checkout (includes waiting for a free connection)
+    checkout_waits = []
+    pool_connect = engine.pool.connect
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            checkout_waits.append(time.perf_counter() - start)
+    engine.pool.connect = timed_connect
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock_errors = 0
+    writes = 0
+    rng = random.Random(worker_id)
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        if write_ratio and rng.random() < write_ratio:
+            db = SessionLocal()
+            start = time.perf_counter()
+            try:
+                _do_write(db)
+                writes += 1
+                latencies["(write)"].append(time.perf_counter() - start)
+            except Exception as e:
+                db.rollback()
+                errors["(write)"] += 1
+                lock_errors += _is_lock_error(e)
+            finally:
+                db.close()
+            continue
+
+        name = rng.choice(pages)
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        for k, v in PAGES[name].items():
+            at.query_params[k] = v
+        start = time.perf_counter()
+        try:
+            at.run()
+            failed = [e.value for e in at.exception]
+        except Exception as e:
+            failed = [str(e)]
+        latencies[name].append(time.perf_counter() - start)
+        if failed:
+            errors[name] += 1
+            lock_errors += any(_is_lock_error(f) for f in failed)
+
+    queue.put({
+        "latencies": dict(latencies),
+        "errors": dict(errors),
+        "lock_errors": lock_errors,
+        "writes": writes,
+        "checkout_waits": checkout_waits,
+    })
+
+
+def _pct(values):
+    a = np.asarray(values) * 1000
+    return np.percentile(a, 50), np.percentile(a, 95), np.percentile(a, 99), a.max()
+
+
+def report(results, elapsed, workers):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    for r in results:
+        for k, v in r["latencies"].items():
+            latencies[k].extend(v)
+        for k, v in r["errors"].items():
+            errors[k] += v
+    total = sum(len(v) for v in latencies.values())
+    waits = [w for r in results for w in r["checkout_waits"]]
+
+    print(f"\n{workers} sessions, {elapsed:.1f}s, {total} requests, {total / elapsed:.1f} req/s")
+    print(f"{'page':<12}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in sorted(latencies):
+        p50, p95, p99, mx = _pct(latencies[name])
+        print(f"{name:<12}{len(latencies[name]):>7}{errors[name]:>6}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{mx:>10.1f}")
+    if waits:
+        p50, p95, p99, mx = _pct(waits)
+        print(f"pool checkout: n={len(waits)} p50={p50:.2f}ms p95={p95:.2f}ms p99={p99:.2f}ms max={mx:.1f}ms")
+    print(f"lock errors: {sum(r['lock_errors'] for r in results)}   writes: {sum(r['writes'] for r in results)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent sessions.")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent sessions (processes)")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    parser.add_argument("--pages", default=",".join(PAGES), help=f"comma list from: {', '.join(PAGES)}")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="fraction of iterations that write")
+    parser.add_argument("--seed", type=int, default=10000, help="tasks to generate before the run")
+    parser.add_argument("--no-seed", action="store_true", help="use the database as-is")
+    parser.add_argument("--database-url", default=None, help="defaults to a fresh temporary SQLite file")
+    parser.add_argument("--use-existing", action="store_true", help="confirm that --database-url may be written to")
+    args = parser.parse_args()
+
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()]
+    unknown = [p for p in pages if p not in PAGES]
+    if unknown:
+        sys.exit(f"Unknown pages: {', '.join(unknown)}")
+
+    # Workers are spawned, so they import db.py with this URL already set.
+    # An inherited DATABASE_URL is never used: it is probably the real database.
+    if args.database_url:
+        if not args.use_existing:
+            sys.exit("--database-url writes tagged tasks and projects into that database; add --use-existing to confirm.")
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "load.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.pop("DASHBOARD_REPLICA", None)
+    print(f"Database: {os.environ['DATABASE_URL']}")
+
+    if not args.no_seed:
+        t0 = time.perf_counter()
+        seed_database(args.seed)
+        print(f"Seeded {args.seed} tasks in {time.perf_counter() - t0:.1f}s.")
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(i, pages, args.duration, args.write_ratio, queue))
+        for i in range(args.workers)
+    ]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    report(results, time.perf_counter() - start, args.workers)
@@ -0,0 +1,146 @@
+# recurrence.py
+# Recurring tasks. A RecurrenceRule stores the pattern; its occurrences are
+# inserted as ordinary Task rows only once they come within HORIZON_DAYS,
+# one batched INSERT per rule per window. Missed occurrences before today are
+# not back-filled, so an idle dashboard doesn't return to a pile of chores.
+import calendar
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_
+
+from db import scoped, touch_projects, RecurrenceRule, Task
+from dependencies import detach
+from events import record_event, RECURRENCE_MATERIALIZED, TASK_CREATED, TASK_DELETED
+from writes import with_retry
+
+HORIZON_DAYS = 7
+FREQUENCIES = ["daily", "weekly", "monthly"]
+
+
+def _add_months(dt, months):
+    y, m = divmod(dt.month - 1 + months, 12)
+    y, m = dt.year + y, m + 1
+    return dt.replace(year=y, month=m, day=min(dt.day, calendar.monthrange(y, m)[1]))
+
+
+def _step(rule):
+    return max(rule.interval or 1, 1)
+
+
+def _nth(rule, k):
+    if rule.freq == "monthly":
+        return _add_months(rule.starts_at, k * _step(rule))
+    days = _step(rule) * (7 if rule.freq == "weekly" else 1)
+    return rule.starts_at + timedelta(days=days * k)
+
+
+def occurrences(rule, start, end):
+    """Due dates of `rule` with start <= d < end."""
+    if rule.until is not None:
+        end = min(end, rule.until + timedelta(microseconds=1))
+    # Jump close to `start` instead of walking from starts_at
+    k = 0
+    if start > rule.starts_at:
+        if rule.freq == "monthly":
+            months = (start.year - rule.starts_at.year) * 12 + start.month - rule.starts_at.month
+            k = max(months // _step(rule) - 1, 0)
+        else:
+            days = _step(rule) * (7 if rule.freq == "weekly" else 1)
+            k = (start - rule.starts_at) // timedelta(days=days)
+    while True:
+        d = _nth(rule, k)
+        if d >= end:
+            return
+        if d >= start:
+            yield d
+        k += 1
+
+
+def describe(rule):
+    unit = {"daily": "day", "weekly": "week", "monthly": "month"}.get(rule.freq, rule.freq)
+    n = _step(rule)
+    return f"every {unit}" if n == 1 else f"every {n} {unit}s"
+
+
+def _materialize_rule(db, ws, rule_id, now, horizon):
+    rule = scoped(db, RecurrenceRule, ws).filter(RecurrenceRule.id == rule_id).first()
+    if rule is None or not rule.active:
+        return 0
+    today = datetime.combine(now.date(), datetime.min.time())
+    start = max(rule.materialized_until or rule.starts_at, today)
+
+    rows = [
+        {
+            "workspace_id": ws, "title": rule.title, "description": rule.description,
+            "area": rule.area, "priority": rule.priority, "project_id": rule.project_id,
+            "status": "next", "due_date": due, "created_at": now, "recurrence_id": rule.id,
+        }
+        for due in occurrences(rule, start, horizon)
+    ]
+    if rows:
+        # Still one INSERT; RETURNING gives each occurrence its own task_created
+        # event, so change-feed consumers see these tasks like any other
+        created = db.execute(insert(Task).returning(Task.id, Task.due_date), rows).all()
+        for task_id, due in sorted(created, key=lambda r: r.due_date):
+            record_event(
+                db, ws, TASK_CREATED, task_id, rule.project_id,
+                title=rule.title, status="next", area=rule.area, is_milestone=False,
+                recurrence_id=rule.id, due_date=due,
+            )
+        record_event(
+            db, ws, RECURRENCE_MATERIALIZED, project_id=rule.project_id,
+            rule_id=rule.id, count=len(rows), first=rows[0]["due_date"], last=rows[-1]["due_date"],
+        )
+        touch_projects(db, ws, [rule.project_id])
+    rule.materialized_until = horizon
+    if rule.until is not None and rule.until < horizon:
+        rule.active = False
+    return len(rows)
+
+
+def materialize(db, ws, horizon_days=HORIZON_DAYS, now=None):
+    """Insert occurrences due before now + horizon_days; returns how many."""
+    now = now or datetime.now()
+    horizon = datetime.combine((now + timedelta(days=horizon_days)).date(), datetime.min.time())
+    # Usually empty: a rule is only revisited once the horizon has moved past it
+    rule_ids = [
+        rid for (rid,) in scoped(db, RecurrenceRule, ws)
+        .with_entities(RecurrenceRule.id)
+        .filter(
+            RecurrenceRule.active == True,
+            or_(RecurrenceRule.materialized_until.is_(None), RecurrenceRule.materialized_until < horizon),
+        )
+    ]
+    return sum(
+        with_retry(db, lambda db, rid=rid: _materialize_rule(db, ws, rid, now, horizon))
+        for rid in rule_ids
+    )
+
+
+def add_rule(db, ws, **fields):
+    rule = RecurrenceRule(workspace_id=ws, **fields)
+    db.add(rule)
+    return rule
+
+
+def stop_rule(db, ws, rule_id):
+    """Deactivate a rule and drop its open occurrences from today on."""
+    rule = scoped(db, RecurrenceRule, ws).filter(RecurrenceRule.id == rule_id).first()
+    if rule is None:
+        return False
+    rule.active = False
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    dropped = scoped(db, Task, ws).filter(
+        Task.recurrence_id == rule.id, Task.status != "done", Task.due_date >= today
+    )
+    rows = dropped.with_entities(Task.id, Task.project_id, Task.title).all()
+    ids = [r.id for r in rows]
+    if ids:
+        # Like delete_task: log each deletion, and unlink first so dependents
+        # are rescheduled and no edge dangles
+        for r in rows:
+            record_event(db, ws, TASK_DELETED, r.id, r.project_id, title=r.title, recurrence_id=rule.id)
+        detach(db, ws, ids)
+        scoped(db, Task, ws).filter(Task.id.in_(ids)).delete(synchronize_session=False)
+        touch_projects(db, ws, {r.project_id for r in rows})
+    return True
@@ -0,0 +1,130 @@
+# regressions.py
+# Metric regressions between code versions of the same experiment configuration.
+# A configuration is (system, name, period); its code versions are ordered by
+# their first run, the latest run of each version stands for it, and every
+# version is compared with the one before. All comparisons are column-wise.
+#   python regressions.py
+#   python regressions.py --system 3
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from db import init_db, SessionLocal, DEFAULT_WORKSPACE, Experiment, System
+
+# metric -> (direction, threshold): a change of more than `threshold` in the
+# bad direction is a regression. Drawdown is compared by magnitude.
+METRICS = {
+    "sharpe": (1, 0.10),
+    "cagr": (1, 0.01),
+    "max_drawdown": (-1, 0.02),
+}
+
+CONFIG = ["system_id", "name", "period"]
+
+
+def load_runs(db, workspace_id, system_id=None):
+    """Versioned runs, read in (system, name, period, run_date) index order."""
+    q = (
+        select(
+            Experiment.id, Experiment.system_id, Experiment.name, Experiment.period,
+            Experiment.code_version, Experiment.run_date, *(getattr(Experiment, m) for m in METRICS),
+        )
+        .where(Experiment.code_version.isnot(None))
+        .order_by(Experiment.system_id, Experiment.name, Experiment.period, Experiment.run_date, Experiment.id)
+    )
+    if system_id is not None:
+        q = q.where(Experiment.workspace_id == workspace_id, Experiment.system_id == system_id)
+    else:
+        # Scoped through the workspace's systems so the scan walks ix_experiments_config_run
+        # per system, already in order, instead of sorting the workspace's rows
+        q = q.where(Experiment.system_id.in_(select(System.id).where(System.workspace_id == workspace_id)))
+    df = pd.read_sql(q, db.connection())
+    df["period"] = df["period"].fillna("")
+    df["max_drawdown"] = df["max_drawdown"].abs()
+    return df
+
+
+def version_steps(runs):
+    """One row per (configuration, version) with the previous version's metrics beside it.
+
+    Adds from_version plus <metric>_prev / <metric>_delta columns; the first
+    version of each configuration has no predecessor and is dropped.
+    """
+    if runs.empty:
+        return runs
+    keys = CONFIG + ["code_version"]
+    # Rows arrive in run order: a version is dated by its first run and stands
+    # for its latest run, taken whole (GroupBy.last would fill NULL metrics from
+    # older runs)
+    runs = runs.assign(first_run=runs.groupby(keys, sort=False)["run_date"].transform("first"))
+    versions = runs.groupby(keys, sort=False).tail(1)
+    versions = versions.sort_values(CONFIG + ["first_run"], kind="stable").drop(columns="first_run")
+
+    prev = versions.groupby(CONFIG, sort=False)[["code_version"] + list(METRICS)].shift()
+    versions["from_version"] = prev["code_version"]
+    for m in METRICS:
+        versions[f"{m}_prev"] = prev[m]
+        versions[f"{m}_delta"] = versions[m] - prev[m]
+    return versions[versions["from_version"].notna()].reset_index(drop=True)
+
+
+def flag_regressions(steps, metrics=METRICS):
+    """Boolean frame (one column per metric) of steps that got worse beyond the threshold."""
+    flags = pd.DataFrame(index=steps.index)
+    for m, (direction, threshold) in metrics.items():
+        flags[m] = (steps[f"{m}_delta"].to_numpy() * direction) < -threshold
+    return flags
+
+
+def find_regressions(db, workspace_id, system_id=None, metrics=METRICS):
+    """Version steps with at least one regressed metric, listed in a `regressed` column."""
+    steps = version_steps(load_runs(db, workspace_id, system_id))
+    if steps.empty:
+        return steps.assign(regressed=pd.Series(dtype=str))
+    flags = flag_regressions(steps, metrics)
+    hit = flags.to_numpy().any(axis=1)
+    steps, flags = steps[hit], flags[hit]
+    # "sharpe, cagr" style labels without a per-row loop
+    names = np.where(flags.to_numpy(), np.array([m + ", " for m in flags.columns], dtype=object), "")
+    steps = steps.assign(regressed=pd.Series(names.sum(axis=1), index=steps.index).str.rstrip(", "))
+    return steps.reset_index(drop=True)
+
+
+def regression_table(df, system_names=None):
+    """Display frame for find_regressions() output."""
+    out = pd.DataFrame({
+        "Name": df["name"],
+        "Period": df["period"],
+        "From": df["from_version"],
+        "To": df["code_version"],
+        "Run Date": df["run_date"],
+        "Regressed": df["regressed"],
+    })
+    if system_names is not None:
+        out.insert(0, "System", df["system_id"].map(system_names))
+    for m, label in (("sharpe", "Sharpe"), ("cagr", "CAGR"), ("max_drawdown", "Max DD")):
+        out[f"{label} Δ"] = df[f"{m}_delta"]
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find metric regressions between code versions.")
+    parser.add_argument("--workspace", default=DEFAULT_WORKSPACE)
+    parser.add_argument("--system", type=int, default=None, help="only check this system id")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        found = find_regressions(db, args.workspace, args.system)
+        names = dict(db.execute(select(System.id, System.name).where(System.workspace_id == args.workspace)).all())
+    finally:
+        db.close()
+    if len(found):
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print(regression_table(found, names).to_string(index=False, float_format="{:.3f}".format))
+    print(f"Found {len(found)} regressions in {time.perf_counter() - started:.1f}s.")
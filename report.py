@@ -0,0 +1,238 @@
+# report.py
+# Periodic review report (completions, experiment decisions, milestone progress).
+# Rows are streamed from the database (server-side cursors on PostgreSQL) and
+# rendered chunk by chunk, so memory stays flat however large the tables are.
+#   python report.py                              last full week, Markdown to stdout
+#   python report.py --format html --out review.html
+#   python report.py --start 2024-01-01 --days 31 --format csv
+import argparse
+import csv
+import html
+import io
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, union_all, or_
+
+from db import (
+    init_db, SessionLocal, DEFAULT_WORKSPACE,
+    Task, ArchivedTask, Experiment, System
+)
+from archive import completed_tasks_query
+from dependencies import slack_days
+
+YIELD_PER = 1000
+FORMATS = ["md", "html", "csv"]
+
+
+def _stream(db, q):
+    """Rows of `q` fetched YIELD_PER at a time (a server-side cursor where supported)."""
+    return db.execute(q.execution_options(yield_per=YIELD_PER))
+
+
+def _fmt(v):
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M")
+    if isinstance(v, float):
+        return f"{v:.2f}"
+    return str(v)
+
+
+# --------- REPORT BLOCKS ---------
+# A report is a generator of blocks:
+#   ("heading", text)   ("summary", [(label, value), ...])   ("table", columns, rows)
+# where `rows` is itself an iterator, consumed once by the renderer.
+
+def _completed_count(db, ws, since, until):
+    def n(m, *extra):
+        return select(func.count()).select_from(m).where(
+            m.workspace_id == ws, m.completed_at >= since, m.completed_at < until, *extra
+        )
+    return db.execute(select(n(Task, Task.status == "done").scalar_subquery() + n(ArchivedTask).scalar_subquery())).scalar() or 0
+
+
+def _completions_by_area(db, ws, since, until):
+    def by_area(m, *extra):
+        return select(m.area.label("area")).where(
+            m.workspace_id == ws, m.completed_at >= since, m.completed_at < until, *extra
+        )
+    u = union_all(by_area(Task, Task.status == "done"), by_area(ArchivedTask)).subquery()
+    area = func.coalesce(u.c.area, "-")
+    return db.execute(select(area, func.count()).group_by(area).order_by(func.count().desc())).all()
+
+
+def weekly_review(db, ws, since, until):
+    period = f"{since:%Y-%m-%d} – {(until - timedelta(days=1)):%Y-%m-%d}"
+    yield ("heading", f"Review {period}")
+
+    # Completions: totals from aggregates, then the rows themselves streamed
+    done = _completed_count(db, ws, since, until)
+    prev = _completed_count(db, ws, since - (until - since), since)
+    yield ("summary", [("Tasks completed", done), ("Previous period", prev)] + [
+        (f"  {area}", n) for area, n in _completions_by_area(db, ws, since, until)
+    ])
+    q = completed_tasks_query(ws, since, until)
+    q = q.order_by(None).order_by(q.selected_columns.completed_at)
+    yield ("heading", "Completed")
+    yield ("table", ["Completed", "Task", "Context", "Area", "Priority"], (
+        (r.completed_at, r.title, r.context, r.area, r.priority) for r in _stream(db, q)
+    ))
+
+    # Experiment decisions made in the period
+    exp_window = (Experiment.workspace_id == ws, Experiment.run_date >= since, Experiment.run_date < until)
+    decisions = db.execute(
+        select(Experiment.decision, func.count()).where(*exp_window).group_by(Experiment.decision)
+    ).all()
+    yield ("heading", "Experiments")
+    yield ("summary", [(d or "-", n) for d, n in decisions] or [("Experiments run", 0)])
+    q = (
+        select(Experiment.run_date, System.name, Experiment.name, Experiment.sharpe,
+               Experiment.cagr, Experiment.max_drawdown, Experiment.decision)
+        .join(System, System.id == Experiment.system_id)
+        .where(*exp_window)
+        .order_by(Experiment.run_date)
+    )
+    yield ("table", ["Run", "System", "Experiment", "Sharpe", "CAGR", "Max DD", "Decision"], iter(_stream(db, q)))
+
+    # Milestones: open ones, plus those completed in the period
+    q = (
+        select(Task)
+        .where(
+            Task.workspace_id == ws, Task.is_milestone == True,
+            or_(Task.status != "done", (Task.completed_at >= since) & (Task.completed_at < until)),
+        )
+        .order_by(Task.due_date.nulls_last())
+    )
+    yield ("heading", "Milestones")
+    yield ("table", ["Milestone", "Due", "Status", "Earliest finish (days)", "Slack (days)"], (
+        (m.title, m.due_date, m.status, m.earliest_finish, None if m.status == "done" else slack_days(m, until))
+        for m in db.execute(q.execution_options(yield_per=YIELD_PER)).scalars()
+    ))
+
+
+# --------- RENDERERS ---------
+# Each takes the block generator and yields text chunks.
+
+def render_markdown(blocks):
+    for block in blocks:
+        kind = block[0]
+        if kind == "heading":
+            yield f"\n## {block[1]}\n\n"
+        elif kind == "summary":
+            for label, value in block[1]:
+                yield f"- **{label.strip()}**: {value}\n" if not label.startswith(" ") else f"  - {label.strip()}: {value}\n"
+            yield "\n"
+        elif kind == "table":
+            _, columns, rows = block
+            yield "| " + " | ".join(columns) + " |\n"
+            yield "|" + "---|" * len(columns) + "\n"
+            empty = True
+            for r in rows:
+                empty = False
+                yield "| " + " | ".join(_fmt(v).replace("|", "\\|") for v in r) + " |\n"
+            if empty:
+                yield "| " + " | ".join(["—"] + [""] * (len(columns) - 1)) + " |\n"
+
+
+def render_html(blocks):
+    yield "<!doctype html><html><head><meta charset='utf-8'><title>Review</title>"
+    yield "<style>body{font-family:sans-serif;max-width:960px;margin:2rem auto;color:#1F2937}"
+    yield "table{border-collapse:collapse;width:100%}td,th{border-bottom:1px solid #E5E7EB;padding:4px 8px;text-align:left}</style>"
+    yield "</head><body>\n"
+    for block in blocks:
+        kind = block[0]
+        if kind == "heading":
+            yield f"<h2>{html.escape(block[1])}</h2>\n"
+        elif kind == "summary":
+            yield "<ul>" + "".join(
+                f"<li><b>{html.escape(label.strip())}</b>: {html.escape(str(value))}</li>" for label, value in block[1]
+            ) + "</ul>\n"
+        elif kind == "table":
+            _, columns, rows = block
+            yield "<table><tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in columns) + "</tr>\n"
+            for r in rows:
+                yield "<tr>" + "".join(f"<td>{html.escape(_fmt(v))}</td>" for v in r) + "</tr>\n"
+            yield "</table>\n"
+    yield "</body></html>\n"
+
+
+def render_csv(blocks):
+    # One stream, one section per table or summary: a "# heading" row, the
+    # header, then rows (summaries as Metric,Value pairs)
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    heading = ""
+
+    def flush():
+        out = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return out
+
+    for block in blocks:
+        kind = block[0]
+        if kind == "heading":
+            heading = block[1]
+        elif kind == "summary":
+            w.writerow([f"# {heading} (summary)"])
+            w.writerow(["Metric", "Value"])
+            for label, value in block[1]:
+                w.writerow([label.strip() if not label.startswith(" ") else f"- {label.strip()}", value])
+            w.writerow([])
+            yield flush()
+        elif kind == "table":
+            _, columns, rows = block
+            w.writerow([f"# {heading}"])
+            w.writerow(columns)
+            for r in rows:
+                w.writerow([_fmt(v) for v in r])
+                if buf.tell() > 64 * 1024:
+                    yield flush()
+            w.writerow([])
+            yield flush()
+
+
+RENDERERS = {"md": render_markdown, "html": render_html, "csv": render_csv}
+
+
+def last_week(now=None):
+    """(Monday, next Monday) of the last full week."""
+    today = (now or datetime.now()).date()
+    monday = today - timedelta(days=today.weekday() + 7)
+    since = datetime.combine(monday, datetime.min.time())
+    return since, since + timedelta(days=7)
+
+
+def write_report(db, ws, since, until, fmt, out):
+    for chunk in RENDERERS[fmt](weekly_review(db, ws, since, until)):
+        out.write(chunk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the periodic review report.")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD); default: Monday of last week")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--format", choices=FORMATS, default="md")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    parser.add_argument("--workspace", default=DEFAULT_WORKSPACE)
+    args = parser.parse_args()
+
+    if args.start:
+        since = datetime.strptime(args.start, "%Y-%m-%d")
+    else:
+        since = last_week()[0]
+    until = since + timedelta(days=args.days)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.out:
+            with open(args.out, "w", encoding="utf-8", newline="") as out:
+                write_report(db, args.workspace, since, until, args.format, out)
+            print(f"Wrote {args.out}.")
+        else:
+            write_report(db, args.workspace, since, until, args.format, sys.stdout)
+    finally:
+        db.close()
@@ -1,14 +1,18 @@
 
 import random
 from datetime import datetime, timedelta
-from db import init_db, SessionLocal, Task, Project
+from db import init_db, SessionLocal, Task, TaskDependency, Project, ArchivedTask, ArchivedTaskCount, RecurrenceRule
 
 def seed():
     init_db()
     db = SessionLocal()
 
     # Clear existing
+    db.query(ArchivedTaskCount).delete()
+    db.query(ArchivedTask).delete()
+    db.query(TaskDependency).delete()
     db.query(Task).delete()
+    db.query(RecurrenceRule).delete()
     db.query(Project).delete()
     db.commit()
 
@@ -90,6 +94,13 @@ def seed():
             completed_at=done_date
         ))
 
+    # --- 4. RECURRING CHORES ---
+    # Occurrences are materialised by the app as they come within range
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    db.add(RecurrenceRule(title="Weekly review", area="personal", freq="weekly", starts_at=today))
+    db.add(RecurrenceRule(title="Gym session", area="personal", freq="daily", interval=2, starts_at=today))
+    db.add(RecurrenceRule(title="Server maintenance", area="trading", freq="monthly", starts_at=today))
+
     db.commit()
     db.close()
     print("Database seeded with Projects & Tasks.")
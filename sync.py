@@ -0,0 +1,522 @@
+# sync.py
+# Keeps the local SQLite replica (DASHBOARD_REPLICA) in step with the primary
+# database (DATABASE_URL). The app only talks to the replica, so page reruns
+# never wait on the network; this module exchanges changes in the background.
+#
+#   push       SQLite triggers queue every local insert/update/delete in
+#              sync_outbox. New rows take their id from the primary and are
+#              renumbered locally, foreign keys included.
+#   pull       Rows whose updated_at passed the last watermark are upserted;
+#              remote deletions are found by comparing id sets every few cycles.
+#   conflicts  Last writer wins on updated_at, and a delete beats an edit.
+#              Rows the primary rejects (e.g. a duplicate name) stay local and
+#              are marked with an error in sync_outbox.
+#
+# Archive tables are maintained on the primary (archive.py) and only pulled;
+# events are pushed but not pulled.
+#
+# A replica belongs to one person: only rows of DASHBOARD_WORKSPACE are pulled
+# or pushed, so other users' data on a shared primary never reaches the disk.
+#   python sync.py --once
+import argparse
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from db import Base, engine, primary_engine, init_db, init_schema, touch_projects, DEFAULT_WORKSPACE
+
+# Parents before children
+REPLICATED = ["projects", "systems", "recurrence_rules", "experiments", "tasks", "task_dependencies"]
+PUSH_ONLY = ["events"]
+PULL_ONLY = ["tasks_archive", "tasks_archive_counts"]
+
+# Id references without a ForeignKey constraint
+EXTRA_REFERENCES = {
+    "tasks": [("events", "task_id")],
+    "projects": [("events", "project_id")],
+}
+
+# The replica owner's workspace, the only one replicated
+WORKSPACE = os.environ.get("DASHBOARD_WORKSPACE", DEFAULT_WORKSPACE)
+
+SYNC_INTERVAL = 30        # seconds between cycles
+RECONCILE_EVERY = 10      # cycles between id-set comparisons (remote deletes)
+PULL_OVERLAP = timedelta(minutes=5)  # re-read window for clock skew between writers
+UPSERT_BATCH = 500
+
+# queued: changes waiting to be pushed; conflicts: local changes the primary rejected
+# (kept in sync_outbox with an error); clashes: pulled rows skipped in the last cycle
+status = {"online": None, "last_sync": None, "queued": 0, "conflicts": 0, "clashes": 0, "error": None}
+
+_thread = None
+_primary_ready = False
+
+
+# --------- LOCAL BOOKKEEPING ---------
+
+def install():
+    """Create the outbox/watermark tables and change-capture triggers on the replica."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS sync_outbox ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, "
+            "row_id INTEGER NOT NULL, op TEXT NOT NULL, error TEXT)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sync_outbox_row ON sync_outbox (table_name, row_id)"))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS sync_flags ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), applying INTEGER NOT NULL DEFAULT 0)"
+        ))
+        conn.execute(text("INSERT OR IGNORE INTO sync_flags (id, applying) VALUES (1, 0)"))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS sync_state (table_name TEXT PRIMARY KEY, pulled_until TEXT)"))
+
+        for t in REPLICATED + PUSH_ONLY:
+            ops = [("insert", "NEW")] if t in PUSH_ONLY else [("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")]
+            for op, ref in ops:
+                # Writes made by sync itself run with applying = 1 and are not queued
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS sync_{t}_{op} AFTER {op.upper()} ON {t} "
+                    f"WHEN (SELECT applying FROM sync_flags) = 0 BEGIN "
+                    f"INSERT INTO sync_outbox (table_name, row_id, op) VALUES ('{t}', {ref}.id, '{op}'); END"
+                ))
+
+
+@contextmanager
+def _applying():
+    # A replica transaction whose writes bypass the outbox triggers
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE sync_flags SET applying = 1"))
+        yield conn
+        conn.execute(text("UPDATE sync_flags SET applying = 0"))
+
+
+def _references(table_name):
+    refs = [
+        (t.name, fk.parent.name)
+        for t in Base.metadata.sorted_tables
+        for fk in t.foreign_keys
+        if fk.column.table.name == table_name
+    ]
+    return refs + EXTRA_REFERENCES.get(table_name, [])
+
+
+def _renumber(conn, table_name, old, new):
+    conn.execute(text(f"UPDATE {table_name} SET id = :new WHERE id = :old"), {"new": new, "old": old})
+    for t, col in _references(table_name):
+        conn.execute(text(f"UPDATE {t} SET {col} = :new WHERE {col} = :old"), {"new": new, "old": old})
+    conn.execute(
+        text("UPDATE sync_outbox SET row_id = :new WHERE table_name = :t AND row_id = :old"),
+        {"new": new, "old": old, "t": table_name},
+    )
+
+
+def _pending_changes(conn):
+    """Collapse the outbox into one action per row.
+
+    Returns ({(table, id): change}, last_seq) where change has
+    insert (row was created locally and still exists), update,
+    remote_delete (a row with this id existed before and was deleted),
+    and first_seq.
+    """
+    rows = conn.execute(text(
+        "SELECT seq, table_name, row_id, op FROM sync_outbox WHERE error IS NULL ORDER BY seq"
+    )).all()
+    ops = {}
+    for seq, t, rid, op in rows:
+        ops.setdefault((t, rid), []).append((seq, op))
+
+    changes = {}
+    for key, seq_ops in ops.items():
+        names = [op for _, op in seq_ops]
+        first_insert = names.index("insert") if "insert" in names else len(names)
+        exists_now = names[-1] != "delete"
+        changes[key] = {
+            "insert": exists_now and first_insert < len(names),
+            "update": exists_now and first_insert == len(names),
+            "remote_delete": "delete" in names[:first_insert],
+            "first_seq": seq_ops[0][0],
+        }
+    return changes, (rows[-1][0] if rows else 0)
+
+
+# --------- PUSH ---------
+
+def _map_refs(table, values, id_map):
+    # Point references at temporarily-numbered parents to their primary ids
+    for fk in table.foreign_keys:
+        v = values.get(fk.parent.name)
+        if v is not None and v < 0:
+            values[fk.parent.name] = id_map[(fk.column.table.name, v)]
+    for parent, refs in EXTRA_REFERENCES.items():
+        for t, col in refs:
+            v = values.get(col)
+            if t == table.name and v is not None and v < 0:
+                values[col] = id_map.get((parent, v))
+
+
+def push():
+    """Send queued local changes to the primary. Returns rows pushed."""
+    with _applying() as lc:
+        changes, last_seq = _pending_changes(lc)
+        if not changes:
+            return 0
+        # New local rows move to negative ids first, so ids handed out by the
+        # primary can never collide with another not-yet-pushed local row
+        for (t, rid), c in list(changes.items()):
+            if c["insert"] and rid > 0:
+                temp = -c["first_seq"]
+                _renumber(lc, t, rid, temp)
+                changes[(t, temp)] = dict(changes.pop((t, rid)), orig=rid)
+
+    tables = Base.metadata.tables
+    id_map, drop_local, errors, deletes = {}, [], [], []
+    pushed = 0
+    with engine.connect() as lc, primary_engine.begin() as pc:
+        for t in REPLICATED + PUSH_ONLY:
+            table = tables[t]
+            keys = [rid for (tt, rid), c in changes.items() if tt == t]
+            local_rows = {
+                r["id"]: dict(r)
+                for r in lc.execute(select(table).where(table.c.id.in_(keys))).mappings()
+            } if keys else {}
+            for rid in [rid for rid, r in local_rows.items() if r["workspace_id"] != WORKSPACE]:
+                del local_rows[rid]
+                errors.append((t, rid, f"workspace {WORKSPACE!r} is the only one this replica syncs"))
+
+            deletes += [
+                (t, c.get("orig", rid)) for rid in keys
+                for c in [changes[(t, rid)]] if c["remote_delete"] and c.get("orig", rid) > 0
+            ]
+
+            # Deactivations before activations keep the one-active-milestone index happy
+            updates = sorted(
+                (rid for rid in keys if changes[(t, rid)]["update"] and rid in local_rows),
+                key=lambda rid: bool(local_rows[rid].get("is_active_milestone")),
+            )
+            inserts = [rid for rid in keys if changes[(t, rid)]["insert"] and rid in local_rows]
+
+            for rid in inserts:
+                values = {k: v for k, v in local_rows[rid].items() if k != "id"}
+                try:
+                    with pc.begin_nested():
+                        _map_refs(table, values, id_map)
+                        new_id = pc.execute(table.insert().values(**values)).inserted_primary_key[0]
+                    id_map[(t, rid)] = new_id
+                    pushed += 1
+                except (IntegrityError, KeyError) as e:
+                    errors.append((t, rid, str(e)[:500]))
+
+            for rid in updates:
+                values = {k: v for k, v in local_rows[rid].items() if k != "id"}
+                remote = pc.execute(
+                    select(table).where(table.c.id == rid, table.c.workspace_id == WORKSPACE)
+                ).mappings().first()
+                if remote is None:
+                    drop_local.append((t, rid))  # deleted on the primary: delete wins
+                    continue
+                if remote["updated_at"] and values.get("updated_at") and remote["updated_at"] > values["updated_at"]:
+                    continue  # primary is newer; the pull will bring it down
+                if "version" in values:
+                    values["version"] = (remote["version"] or 0) + 1
+                try:
+                    with pc.begin_nested():
+                        _map_refs(table, values, id_map)
+                        pc.execute(table.update().where(table.c.id == rid).values(**values))
+                    pushed += 1
+                except (IntegrityError, KeyError) as e:
+                    errors.append((t, rid, str(e)[:500]))
+
+        # Children before parents, so foreign keys on the primary stay satisfied
+        for t, rid in sorted(deletes, key=lambda d: -REPLICATED.index(d[0])):
+            table = tables[t]
+            try:
+                with pc.begin_nested():
+                    if t == "projects":
+                        # The app purged the project's archive locally (purge_project_archive)
+                        for a in PULL_ONLY:
+                            pc.execute(tables[a].delete().where(
+                                tables[a].c.project_id == rid, tables[a].c.workspace_id == WORKSPACE
+                            ))
+                    pc.execute(table.delete().where(table.c.id == rid, table.c.workspace_id == WORKSPACE))
+                pushed += 1
+            except IntegrityError as e:
+                errors.append((t, rid, str(e)[:500]))
+
+    with _applying() as lc:
+        for t, rid, msg in errors:
+            lc.execute(
+                text("UPDATE sync_outbox SET error = :msg WHERE table_name = :t AND row_id = :id AND seq <= :seq"),
+                {"msg": msg, "t": t, "id": rid, "seq": last_seq},
+            )
+        lc.execute(text("DELETE FROM sync_outbox WHERE seq <= :seq AND error IS NULL"), {"seq": last_seq})
+        # What is still queued was written locally while we talked to the primary
+        queued, _ = _pending_changes(lc)
+        for (t, temp), new_id in id_map.items():
+            c = queued.get((t, new_id))
+            if c is not None and c["insert"]:
+                # A row created during the round trip took this id locally; move it
+                # aside like pull() does, it is pushed as a new row next cycle
+                _renumber(lc, t, new_id, -c["first_seq"])
+            else:
+                # A stale local row still holding the id was deleted on the primary
+                lc.execute(text(f"DELETE FROM {t} WHERE id = :id"), {"id": new_id})
+            _renumber(lc, t, temp, new_id)
+        for t, rid in drop_local:
+            lc.execute(text(f"DELETE FROM {t} WHERE id = :id"), {"id": rid})
+    return pushed
+
+
+# --------- PULL ---------
+
+def _watermark(conn, t):
+    row = conn.execute(text("SELECT pulled_until FROM sync_state WHERE table_name = :t"), {"t": t}).first()
+    return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+
+def _merged(table, excluded):
+    set_ = {c.name: excluded[c.name] for c in table.columns if c.name != "id"}
+    if table.name == "projects":
+        # The replica bumps Project.version itself for pulled task changes, so a
+        # pulled project must never take it back to a value a cached page used
+        set_["version"] = case(
+            (table.c.updated_at == excluded.updated_at, table.c.version),
+            else_=func.max(table.c.version, excluded.version) + 1,
+        )
+    return set_
+
+
+def _upsert(conn, table, rows):
+    for i in range(0, len(rows), UPSERT_BATCH):
+        batch = rows[i:i + UPSERT_BATCH]
+        stmt = sqlite_insert(table).values(batch)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_=_merged(table, stmt.excluded))
+        try:
+            with conn.begin_nested():
+                conn.execute(stmt)
+        except IntegrityError:
+            # Fall back to row by row so one clash (e.g. an unpushed local
+            # row with the same name) doesn't block the rest
+            for row in batch:
+                one = sqlite_insert(table).values(row)
+                try:
+                    with conn.begin_nested():
+                        conn.execute(one.on_conflict_do_update(
+                            index_elements=[table.c.id], set_=_merged(table, one.excluded),
+                        ))
+                except IntegrityError:
+                    status["clashes"] += 1
+
+
+def _changed_projects(conn, table, rows, stamp):
+    """Projects (old and new) of pulled task rows that differ from the local copy.
+
+    Rows re-read in the overlap window are unchanged and bump nothing.
+    """
+    out = set()
+    for i in range(0, len(rows), UPSERT_BATCH):
+        batch = rows[i:i + UPSERT_BATCH]
+        local = {
+            r.id: r for r in conn.execute(
+                select(table.c.id, table.c.project_id, table.c[stamp])
+                .where(table.c.id.in_([r["id"] for r in batch]))
+            )
+        }
+        for r in batch:
+            old = local.get(r["id"])
+            if old is None or getattr(old, stamp) != r[stamp]:
+                out.add(r["project_id"])
+                if old is not None:
+                    out.add(old.project_id)
+    return out
+
+
+def _pull_archive(pc):
+    """Copy archive rows added on the primary since the last pull, and replace the counters."""
+    archive, counts = (Base.metadata.tables[t] for t in PULL_ONLY)
+    with engine.connect() as lc:
+        since = _watermark(lc, archive.name)
+    q = select(archive).where(archive.c.workspace_id == WORKSPACE)
+    if since is not None:
+        q = q.where(archive.c.archived_at > since - PULL_OVERLAP)
+    rows = [dict(r) for r in pc.execute(q).mappings()]
+    totals = [dict(r) for r in pc.execute(select(counts).where(counts.c.workspace_id == WORKSPACE)).mappings()]
+    with _applying() as lc:
+        # Archived tasks leave their project's list and join its archived count
+        touched = _changed_projects(lc, archive, rows, "archived_at")
+        _upsert(lc, archive, rows)
+        touch_projects(lc, WORKSPACE, touched)
+        # One row per (workspace, area, project): small enough to copy whole
+        lc.execute(counts.delete())
+        if totals:
+            lc.execute(counts.insert(), totals)
+        stamps = [r["archived_at"] for r in rows if r["archived_at"]]
+        if stamps:
+            lc.execute(
+                text("INSERT INTO sync_state (table_name, pulled_until) VALUES (:t, :w) "
+                     "ON CONFLICT(table_name) DO UPDATE SET pulled_until = excluded.pulled_until"),
+                {"t": archive.name, "w": max(stamps).isoformat()},
+            )
+    return len(rows)
+
+
+def pull(reconcile=False):
+    """Bring remote changes into the replica. Returns rows applied."""
+    tables = Base.metadata.tables
+    applied = 0
+    with primary_engine.connect() as pc:
+        for t in REPLICATED:
+            table = tables[t]
+            with engine.connect() as lc:
+                since = _watermark(lc, t)
+            q = select(table).where(table.c.workspace_id == WORKSPACE)
+            if since is not None:
+                q = q.where(table.c.updated_at > since - PULL_OVERLAP)
+            rows = [dict(r) for r in pc.execute(q.order_by(table.c.updated_at)).mappings()]
+
+            with _applying() as lc:
+                changes, _ = _pending_changes(lc)
+                pending = {rid: c for (tt, rid), c in changes.items() if tt == t}
+                local_stamp = dict(lc.execute(
+                    select(table.c.id, table.c.updated_at).where(table.c.id.in_(list(pending)))
+                ).all()) if pending else {}
+
+                keep = []
+                for r in rows:
+                    c = pending.get(r["id"])
+                    if c is not None and c["insert"]:
+                        # A local row created since the last push holds this id; move it aside
+                        _renumber(lc, t, r["id"], -c["first_seq"])
+                        c = None
+                    if c is not None:
+                        mine = local_stamp.get(r["id"])
+                        if c["remote_delete"] or (mine and r["updated_at"] and mine >= r["updated_at"]):
+                            continue  # local change wins and will be pushed
+                        lc.execute(
+                            text("DELETE FROM sync_outbox WHERE table_name = :t AND row_id = :id"),
+                            {"t": t, "id": r["id"]},
+                        )
+                    if t == "tasks" and r.get("is_active_milestone"):
+                        # The primary's active milestone replaces ours
+                        lc.execute(
+                            text("UPDATE tasks SET is_active_milestone = 0 "
+                                 "WHERE workspace_id = :ws AND is_active_milestone AND id != :id"),
+                            {"ws": r["workspace_id"], "id": r["id"]},
+                        )
+                    keep.append(r)
+
+                if t == "tasks":
+                    keep.sort(key=lambda r: bool(r.get("is_active_milestone")))
+                    touched = _changed_projects(lc, table, keep, "updated_at")
+                _upsert(lc, table, keep)
+                if t == "tasks":
+                    # Writes made on the primary bumped its copy, not ours
+                    touch_projects(lc, WORKSPACE, touched)
+                applied += len(keep)
+
+                stamps = [r["updated_at"] for r in rows if r["updated_at"]]
+                if stamps:
+                    lc.execute(
+                        text("INSERT INTO sync_state (table_name, pulled_until) VALUES (:t, :w) "
+                             "ON CONFLICT(table_name) DO UPDATE SET pulled_until = excluded.pulled_until"),
+                        {"t": t, "w": max(stamps).isoformat()},
+                    )
+
+        # Before reconcile drops the hot rows that were moved into the archive
+        applied += _pull_archive(pc)
+
+        if reconcile:
+            # Children first, so parents are never left referenced. Local rows of
+            # other workspaces (e.g. pulled before replication was scoped) go too.
+            for t in ["tasks_archive"] + list(reversed(REPLICATED)):
+                table = tables[t]
+                remote_ids = set(pc.execute(select(table.c.id).where(table.c.workspace_id == WORKSPACE)).scalars())
+                with _applying() as lc:
+                    changes, _ = _pending_changes(lc)
+                    pending = {rid for (tt, rid) in changes if tt == t}
+                    local_ids = set(lc.execute(select(table.c.id).where(table.c.id > 0)).scalars())
+                    gone = list(local_ids - remote_ids - pending)
+                    for i in range(0, len(gone), UPSERT_BATCH):
+                        ids = gone[i:i + UPSERT_BATCH]
+                        if t in ("tasks", "tasks_archive"):
+                            touch_projects(lc, WORKSPACE, lc.execute(
+                                select(table.c.project_id).where(table.c.id.in_(ids)).distinct()
+                            ).scalars())
+                        lc.execute(table.delete().where(table.c.id.in_(ids)))
+                    applied += len(gone)
+    return applied
+
+
+# --------- DRIVER ---------
+
+def sync_once(reconcile=False):
+    """One push + pull cycle. Failures are recorded in `status` and never raised.
+
+    Network errors mark the replica offline; anything else is reported as an
+    error too, so the next cycle simply tries again.
+    """
+    global _primary_ready
+    status["clashes"] = 0
+    try:
+        if not _primary_ready:
+            init_schema(primary_engine)
+            _primary_ready = True
+        pushed = push()
+        pulled = pull(reconcile)
+        status.update(online=True, last_sync=datetime.now(), error=None)
+    except DBAPIError as e:
+        pushed = pulled = 0
+        status.update(online=False, error=str(e.orig or e)[:200])
+    except Exception as e:
+        pushed = pulled = 0
+        status.update(error=f"{type(e).__name__}: {e}"[:200])
+    try:
+        with engine.connect() as lc:
+            status["queued"] = lc.execute(text("SELECT COUNT(*) FROM sync_outbox WHERE error IS NULL")).scalar()
+            status["conflicts"] = lc.execute(text("SELECT COUNT(*) FROM sync_outbox WHERE error IS NOT NULL")).scalar()
+    except DBAPIError:
+        pass
+    return pushed, pulled
+
+
+def _loop(interval):
+    cycle = 0
+    while True:
+        # sync_once records its own failures, so the thread outlives any one cycle
+        sync_once(reconcile=cycle % RECONCILE_EVERY == 0)
+        cycle += 1
+        time.sleep(interval)
+
+
+def start(interval=SYNC_INTERVAL):
+    """Start the background sync thread (once per process); no-op without a replica."""
+    global _thread
+    if primary_engine is None:
+        return None
+    if _thread is None or not _thread.is_alive():
+        install()
+        _thread = threading.Thread(target=_loop, args=(interval,), daemon=True, name="replica-sync")
+        _thread.start()
+    return _thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the local replica with the primary database.")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--interval", type=int, default=SYNC_INTERVAL)
+    args = parser.parse_args()
+
+    if primary_engine is None:
+        raise SystemExit("Set DATABASE_URL and DASHBOARD_REPLICA to use a local replica.")
+    init_db()
+    install()
+    if args.once:
+        pushed, pulled = sync_once(reconcile=True)
+        print(f"Pushed {pushed}, pulled {pulled}. Queued: {status['queued']}. Error: {status['error'] or '-'}")
+    else:
+        _loop(args.interval)
@@ -0,0 +1,75 @@
+# test_analytics.py
+import numpy as np
+import pandas as pd
+
+from analytics import cycle_time_summary, cycle_time_stats, format_durations, data_version, GROUPS
+from writes import add_task, complete_task, activate_milestone
+
+
+def _cycle_times(hours, areas):
+    completed = pd.Timestamp("2024-03-01") + pd.to_timedelta(np.arange(len(hours)), unit="D")
+    return pd.DataFrame({
+        "created_at": completed - pd.to_timedelta(hours, unit="h"),
+        "completed_at": completed,
+        "hours": np.asarray(hours, dtype=float),
+        "area": areas,
+        "context": "-",
+        "priority": "medium",
+    })
+
+
+def test_summary_per_group():
+    df = _cycle_times([1, 2, 3, 4, 10, np.nan], ["research"] * 4 + ["trading", "trading"])
+    out = cycle_time_summary(df, "area")
+    assert list(out.columns) == ["area", "tasks", "mean", "p50", "p75", "p90", "p95"]
+    assert list(out["area"]) == ["research", "trading"]
+    research = out.iloc[0]
+    assert research["tasks"] == 4 and research["mean"] == 2.5 and research["p50"] == 2.5
+    # Tasks without a cycle time are left out, not counted as zero
+    assert out.iloc[1]["tasks"] == 1 and out.iloc[1]["p95"] == 10
+
+
+def test_summary_without_valid_rows_is_empty():
+    for df in (_cycle_times([], []), _cycle_times([np.nan, np.nan], ["research", "trading"])):
+        out = cycle_time_summary(df, "area")
+        assert out.empty
+        assert list(out.columns) == ["area", "tasks", "mean", "p50", "p75", "p90", "p95"]
+
+
+def test_stats_aggregate_everything():
+    df = _cycle_times([0.5, 30, 200, np.nan], ["research", "research", "trading", "trading"])
+    stats = cycle_time_stats(df)
+    assert stats["completed"] == 4
+    assert stats["median"] == 30
+    assert set(stats["summaries"]) == set(GROUPS)
+    assert stats["histogram"].set_index("Bucket")["Tasks"].to_dict() == {
+        "<1h": 1, "1-4h": 0, "4-24h": 0, "1-3d": 1, "3-7d": 0, "1-4w": 1, "4w+": 0,
+    }
+    assert stats["weekly"]["Tasks"].sum() == 4
+
+
+def test_stats_of_nothing():
+    stats = cycle_time_stats(_cycle_times([], []))
+    assert stats["completed"] == 0 and stats["median"] is None and stats["p90"] is None
+    assert all(s.empty for s in stats["summaries"].values())
+    assert stats["weekly"].empty
+
+
+def test_format_durations():
+    hours = pd.Series([0.25, 4.2, 51, np.nan])
+    assert list(format_durations(hours)) == ["15m", "4h 12m", "2d 3h", "-"]
+
+
+def test_data_version_ignores_unrelated_events(db, ws):
+    t = add_task(db, ws, title="write up", status="next")
+    db.commit()
+    before = data_version(db, ws)
+    add_task(db, ws, title="inbox idea", status="inbox")
+    m = add_task(db, ws, title="ship", status="next", is_milestone=True)
+    db.flush()
+    activate_milestone(db, ws, m.id)
+    db.commit()
+    assert data_version(db, ws) == before
+    complete_task(db, ws, t.id)
+    db.commit()
+    assert data_version(db, ws) != before
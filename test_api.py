@@ -0,0 +1,103 @@
+# test_api.py
+import asyncio
+import json
+
+import pytest
+
+import api
+from writes import add_task
+
+
+@pytest.fixture
+def tokens(monkeypatch, ws):
+    monkeypatch.setattr(api, "API_TOKENS", {"tok-a": ws, "tok-b": ws + "-other"})
+    return {"authorization": "Bearer tok-a"}
+
+
+def _get(path, headers, query=""):
+    """Drive the ASGI app for one GET; returns (status, headers, body)."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+        "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+    }
+    asyncio.run(api.app(scope, receive, send))
+    start, body = sent
+    return start["status"], dict(start["headers"]), body["body"]
+
+
+def test_load_tokens(monkeypatch):
+    monkeypatch.setenv("DASHBOARD_API_TOKENS", "abc=alice@x.com, d=ef=bob@y.com,broken,=nobody")
+    monkeypatch.setenv("DASHBOARD_API_TOKEN", "single")
+    assert api._load_tokens() == {"abc": "alice@x.com", "d=ef": "bob@y.com", "single": api.ANONYMOUS_WORKSPACE}
+
+
+def test_workspace_comes_from_the_token(tokens, ws):
+    assert api.workspace_for(tokens) == ws
+    assert api.workspace_for({"authorization": "Bearer tok-b"}) == ws + "-other"
+    assert api.workspace_for({"authorization": "Bearer nope"}) is None
+    assert api.workspace_for({"authorization": "tok-a"}) is None
+    assert api.workspace_for({}) is None
+
+
+def test_anonymous_without_tokens(monkeypatch):
+    monkeypatch.setattr(api, "API_TOKENS", {})
+    assert api.workspace_for({}) == api.ANONYMOUS_WORKSPACE
+
+
+def test_tasks_are_scoped_to_the_callers_workspace(db, ws, tokens):
+    add_task(db, ws, title="mine", status="next")
+    add_task(db, ws + "-other", title="theirs", status="next")
+    db.commit()
+    status, payload, _ = api.handle("/api/tasks", {}, tokens)
+    assert status == 200 and [t["title"] for t in payload["items"]] == ["mine"]
+    assert api.handle("/api/tasks", {}, {})[0] == 401
+
+
+def test_matching_etag_skips_the_query(db, ws, tokens, monkeypatch):
+    add_task(db, ws, title="a", status="next")
+    db.commit()
+    status, _, etag = api.handle("/api/tasks", {}, tokens)
+    assert status == 200 and etag.startswith('W/"')
+
+    calls = []
+    routes = [(p, lambda *a, h=h: calls.append(1) or h(*a), t) for p, h, t in api.ROUTES]
+    monkeypatch.setattr(api, "ROUTES", routes)
+    # Weak comparison: a strong form of the same tag also matches
+    for given in (etag, etag.removeprefix("W/"), f'"x", {etag}', "*"):
+        assert api.handle("/api/tasks", {}, {**tokens, "if-none-match": given}) == (304, None, etag)
+    assert calls == []
+
+    # Other parameters, another workspace's writes and a write here
+    assert api.handle("/api/tasks", {"status": ["next"]}, tokens)[2] != etag
+    add_task(db, ws + "-other", title="elsewhere", status="next")
+    db.commit()
+    assert api.handle("/api/tasks", {}, {**tokens, "if-none-match": etag})[0] == 304
+    add_task(db, ws, title="b", status="next")
+    db.commit()
+    status, payload, new = api.handle("/api/tasks", {}, {**tokens, "if-none-match": etag})
+    assert status == 200 and new != etag and len(payload["items"]) == 2
+
+
+def test_asgi_headers_and_gzip(db, ws, tokens):
+    for i in range(40):
+        add_task(db, ws, title=f"task {i} " + "x" * 40, status="next")
+    db.commit()
+    status, headers, body = _get("/api/tasks", {**tokens, "accept-encoding": "gzip"})
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding, Authorization"
+    etag = headers[b"etag"].decode()
+
+    status, headers, body = _get("/api/tasks", {**tokens, "if-none-match": etag})
+    assert status == 304 and body == b"" and headers[b"etag"].decode() == etag
+
+    status, _, body = _get("/api/tasks", tokens, "limit=abc")
+    assert status == 400 and "limit" in json.loads(body)["error"]
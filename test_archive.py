@@ -0,0 +1,46 @@
+# test_archive.py
+from datetime import datetime, timedelta
+
+from db import Task, ArchivedTask
+from archive import archive_done_tasks, archived_done_by_area, archived_done_for_project, completed_tasks_query
+
+
+def _done(db, ws, n, area="research", days_ago=200):
+    done = datetime.now() - timedelta(days=days_ago)
+    tasks = [
+        Task(workspace_id=ws, title=f"t{i}", status="done", area=area, created_at=done - timedelta(days=1), completed_at=done)
+        for i in range(n)
+    ]
+    db.add_all(tasks)
+    db.commit()
+    return [t.id for t in tasks]
+
+
+def test_moves_old_done_tasks_and_counts_them(db, ws):
+    old = _done(db, ws, 3)
+    recent = _done(db, ws, 2, area="trading", days_ago=5)
+    assert archive_done_tasks(db, 90, ws, batch_size=2) == 3
+    assert db.query(Task.id).filter(Task.workspace_id == ws).count() == len(recent)
+    assert sorted(i for (i,) in db.query(ArchivedTask.id).filter(ArchivedTask.workspace_id == ws)) == old
+    assert archived_done_by_area(db, ws) == {"research": 3}
+    assert archived_done_for_project(db, ws, 0) == 3
+    # Hot and cold completions read as one list
+    assert len(db.execute(completed_tasks_query(ws)).all()) == 5
+
+
+def test_archived_ids_are_never_reused(db, ws):
+    # The archived tasks are the newest rows, the ones SQLite would hand out again
+    first = _done(db, ws, 3)
+    archive_done_tasks(db, 90, ws)
+    second = _done(db, ws, 3)
+    assert min(second) > max(first)
+    assert archive_done_tasks(db, 90, ws) == 3
+    assert archived_done_by_area(db, ws) == {"research": 6}
+
+
+def test_leaves_milestones_and_other_workspaces(db, ws):
+    done = datetime.now() - timedelta(days=200)
+    db.add(Task(workspace_id=ws, title="m", status="done", is_milestone=True, completed_at=done))
+    db.add(Task(workspace_id=ws + "-other", title="x", status="done", completed_at=done))
+    db.commit()
+    assert archive_done_tasks(db, 90, ws) == 0
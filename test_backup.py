@@ -0,0 +1,88 @@
+# test_backup.py
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import backup
+
+
+@pytest.fixture
+def live(tmp_path, monkeypatch):
+    """backup.py pointed at its own SQLite file, so a restore never touches the test database."""
+    e = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    with e.begin() as c:
+        c.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)"))
+    monkeypatch.setattr(backup, "engine", e)
+    monkeypatch.setattr(backup, "primary_engine", None)
+    monkeypatch.setattr(backup, "CHUNK_SIZE", 4096)
+    yield e
+    e.dispose()
+
+
+def _write(e, *bodies):
+    with e.begin() as c:
+        for b in bodies:
+            c.execute(text("INSERT INTO notes (body) VALUES (:b)"), {"b": b})
+
+
+def _bodies(e):
+    with e.connect() as c:
+        return [b for (b,) in c.execute(text("SELECT body FROM notes ORDER BY id"))]
+
+
+def test_snapshot_and_restore(live, tmp_path):
+    root = str(tmp_path / "backups")
+    _write(live, *(f"note {i} " * 50 for i in range(200)))
+    first = backup.snapshot(root)
+    assert first["new_chunks"] == len(first["chunks"]) > 1
+
+    _write(live, "after")
+    second = backup.snapshot(root)
+    # Same-second snapshots get their own names; unchanged chunks are shared
+    assert second["name"] != first["name"]
+    assert second["new_chunks"] < len(second["chunks"])
+    assert not [fn for fn in os.listdir(root) if fn.endswith(".partial")]
+
+    backup.restore(first["name"], root)
+    assert len(_bodies(live)) == 200 and "after" not in _bodies(live)
+    assert [m["name"] for m in backup.list_snapshots(root)] == [first["name"], second["name"]]
+
+
+def test_prune_keeps_chunks_of_remaining_snapshots(live, tmp_path):
+    root = str(tmp_path / "backups")
+    _write(live, "a" * 10000)
+    old = backup.snapshot(root)
+    _write(live, "b" * 10000)
+    new = backup.snapshot(root)
+
+    # An unfinished snapshot holds off chunk removal
+    open(backup._partial_path(root, "in-progress"), "w").close()
+    assert backup.prune(root, keep=1) == 0
+    os.remove(backup._partial_path(root, "in-progress"))
+
+    assert backup.prune(root, keep=1) > 0
+    assert [m["name"] for m in backup.list_snapshots(root)] == [new["name"]]
+    assert all(os.path.exists(backup._chunk_path(root, d)) for d in new["chunks"])
+    gone = set(old["chunks"]) - set(new["chunks"])
+    assert gone and not any(os.path.exists(backup._chunk_path(root, d)) for d in gone)
+
+
+def test_missing_source_is_not_created(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(backup, "engine", create_engine("sqlite:///data.db"))
+    monkeypatch.setattr(backup, "primary_engine", None)
+    with pytest.raises(sqlite3.OperationalError):
+        backup.snapshot("backups")
+    assert not os.path.exists("data.db")
+    assert backup.list_snapshots("backups") == []
+
+
+def test_replica_is_neither_snapshotted_nor_restored(live, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "primary_engine", create_engine("sqlite://"))
+    with pytest.raises(RuntimeError):
+        backup.snapshot(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        backup.restore("any", str(tmp_path))
+    assert os.listdir(tmp_path) == ["live.db"]
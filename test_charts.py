@@ -0,0 +1,56 @@
+# test_charts.py
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from charts import _bucketed, bucket_for
+
+
+def _daily(start, end, every=1):
+    idx = pd.date_range(start, end, freq=f"{every}D")
+    return pd.DataFrame({"Tasks": np.arange(1, len(idx) + 1), "Best": np.arange(len(idx))[::-1]}, index=idx)
+
+
+def test_bucket_for_range():
+    assert bucket_for(date(2024, 1, 1), date(2024, 1, 30)) == ("D", "day")
+    assert bucket_for(date(2024, 1, 1), date(2024, 12, 31)) == ("W-SUN", "week")
+    assert bucket_for(date(2015, 1, 1), date(2024, 12, 31)) == ("M", "month")
+
+
+def test_days_are_kept_and_gaps_filled():
+    daily = _daily("2024-01-01", "2024-01-30", every=2)
+    out, unit = _bucketed(daily, date(2024, 1, 1), date(2024, 1, 30), {"Tasks": "sum"}, 120)
+    assert unit == "day"
+    assert len(out) == 30
+    assert out.index[0] == pd.Timestamp("2024-01-01") and out.index.name == "Date"
+    assert out["Tasks"].sum() == daily["Tasks"].sum()
+    assert out["Tasks"].isna().sum() == 15
+
+
+def test_weeks_start_on_monday():
+    daily = _daily("2024-01-01", "2024-12-31")
+    out, unit = _bucketed(daily, date(2024, 1, 1), date(2024, 12, 31), {"Tasks": "sum", "Best": "max"}, 120)
+    assert unit == "week"
+    assert (out.index.dayofweek == 0).all()
+    assert out["Tasks"].sum() == daily["Tasks"].sum()
+    assert out["Best"].max() == daily["Best"].max()
+
+
+def test_merges_buckets_down_to_max_points():
+    daily = _daily("2024-01-01", "2024-01-30")
+    out, unit = _bucketed(daily, date(2024, 1, 1), date(2024, 1, 30), {"Tasks": "sum", "Best": "max"}, 10)
+    assert unit == "3 days"
+    assert len(out) == 10
+    assert list(out.index[:2]) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-04")]
+    assert out["Tasks"].iloc[0] == 1 + 2 + 3
+    assert out["Best"].iloc[0] == daily["Best"].iloc[0]
+    assert out["Tasks"].sum() == daily["Tasks"].sum()
+
+
+def test_long_ranges_stay_under_max_points():
+    daily = _daily("2000-01-01", "2024-12-31", every=5)
+    out, unit = _bucketed(daily, date(2000, 1, 1), date(2024, 12, 31), {"Tasks": "sum"}, 120)
+    assert len(out) <= 120
+    assert unit.endswith("months")
+    assert out["Tasks"].sum() == daily["Tasks"].sum()
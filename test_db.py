@@ -0,0 +1,109 @@
+# test_db.py
+# Schema migrations, run against a database laid out like the original single-user schema.
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from db import init_schema
+
+BASELINE = [
+    "CREATE TABLE projects (id INTEGER NOT NULL, name VARCHAR NOT NULL, description TEXT, status VARCHAR, "
+    "area VARCHAR, created_at DATETIME, target_date DATETIME, PRIMARY KEY (id), UNIQUE (name))",
+    "CREATE TABLE systems (id INTEGER NOT NULL, name VARCHAR NOT NULL, description TEXT, status VARCHAR, "
+    "system_type VARCHAR, repo_url VARCHAR, platform VARCHAR, created_at DATETIME, project_id INTEGER, "
+    "PRIMARY KEY (id), UNIQUE (name), FOREIGN KEY(project_id) REFERENCES projects (id))",
+    "CREATE TABLE experiments (id INTEGER NOT NULL, name VARCHAR NOT NULL, system_id INTEGER NOT NULL, "
+    "run_date DATETIME, period VARCHAR, qc_url VARCHAR, code_version VARCHAR, sharpe FLOAT, max_drawdown FLOAT, "
+    "cagr FLOAT, win_rate FLOAT, rr_ratio FLOAT, trades INTEGER, notes TEXT, decision VARCHAR, "
+    "PRIMARY KEY (id), FOREIGN KEY(system_id) REFERENCES systems (id))",
+    "CREATE TABLE tasks (id INTEGER NOT NULL, title VARCHAR NOT NULL, description TEXT, status VARCHAR, "
+    "area VARCHAR, priority VARCHAR, due_date DATETIME, created_at DATETIME, completed_at DATETIME, "
+    "project_id INTEGER, system_id INTEGER, is_today_focus BOOLEAN, is_milestone BOOLEAN, "
+    "is_active_milestone BOOLEAN, PRIMARY KEY (id), FOREIGN KEY(project_id) REFERENCES projects (id), "
+    "FOREIGN KEY(system_id) REFERENCES systems (id))",
+]
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO projects (id, name, status, area) VALUES (1, 'Thesis', 'active', 'research')"))
+        conn.execute(text("INSERT INTO systems (id, name, status) VALUES (1, 'Trend', 'rd')"))
+    yield engine
+    engine.dispose()
+
+
+def test_names_become_unique_per_workspace(legacy):
+    init_schema(legacy)
+    uniques = {u["name"]: u["column_names"] for u in inspect(legacy).get_unique_constraints("projects")}
+    assert ["name"] not in uniques.values()
+    with legacy.begin() as conn:
+        conn.execute(text("INSERT INTO projects (workspace_id, name) VALUES ('someone@example.com', 'Thesis')"))
+        conn.execute(text("INSERT INTO systems (workspace_id, name) VALUES ('someone@example.com', 'Trend')"))
+    with pytest.raises(IntegrityError), legacy.begin() as conn:
+        conn.execute(text("INSERT INTO projects (workspace_id, name) VALUES ('default', 'Thesis')"))
+    # Running again is a no-op
+    init_schema(legacy)
+
+
+def test_free_form_values_are_normalised_and_then_checked(legacy):
+    with legacy.begin() as conn:
+        conn.execute(text("INSERT INTO projects (id, name, status, area) VALUES "
+                          "(2, 'Side', ' Active ', 'Trading'), (3, 'Odd', 'paused', 'misc')"))
+        conn.execute(text("INSERT INTO systems (id, name, status) VALUES (2, 'Mean', 'LIVE'), (3, 'Old', 'retired')"))
+        conn.execute(text("INSERT INTO experiments (id, name, system_id, decision) VALUES "
+                          "(1, 'a', 1, 'Accept'), (2, 'b', 1, 'maybe'), (3, 'c', 1, NULL)"))
+        conn.execute(text("INSERT INTO tasks (id, title, status, priority, area) VALUES "
+                          "(1, 'a', 'Done ', 'HIGH', 'Research'), (2, 'b', 'waiting', 'urgent', 'work'), "
+                          "(3, 'c', NULL, NULL, NULL)"))
+    init_schema(legacy)
+
+    def rows(sql):
+        with legacy.connect() as conn:
+            return conn.execute(text(sql)).all()
+
+    assert rows("SELECT status, area FROM projects ORDER BY id") == [
+        ("active", "research"), ("active", "trading"), ("active", None),
+    ]
+    assert rows("SELECT status FROM systems ORDER BY id") == [("rd",), ("live",), ("rd",)]
+    assert rows("SELECT decision FROM experiments ORDER BY id") == [("accept",), ("undecided",), (None,)]
+    assert rows("SELECT status, priority, area FROM tasks ORDER BY id") == [
+        ("done", "high", "research"), ("next", "medium", None), (None, None, None),
+    ]
+    for sql in (
+        "UPDATE tasks SET status = 'Done' WHERE id = 3",
+        "UPDATE tasks SET priority = 'urgent' WHERE id = 3",
+        "UPDATE projects SET area = 'Misc' WHERE id = 3",
+        "UPDATE systems SET status = 'retired' WHERE id = 3",
+        "UPDATE experiments SET decision = 'maybe' WHERE id = 3",
+    ):
+        with pytest.raises(IntegrityError), legacy.begin() as conn:
+            conn.execute(text(sql))
+
+
+def test_reused_task_ids_are_moved_off_archived_ones(legacy):
+    # A database from before tasks was AUTOINCREMENT, where task 2 reused an archived id
+    init_schema(legacy)
+    with legacy.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'tasks'")).scalar()
+        conn.execute(text("ALTER TABLE tasks RENAME TO tasks_old"))
+        conn.execute(text(ddl.replace(" AUTOINCREMENT", "")))
+        conn.execute(text("DROP TABLE tasks_old"))
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'tasks'"))
+        conn.execute(text("INSERT INTO tasks_archive (id, workspace_id, title) VALUES (2, 'default', 'archived'), (3, 'default', 'archived')"))
+        conn.execute(text("INSERT INTO tasks (id, workspace_id, title, version, estimate_days) VALUES (1, 'default', 'a', 1, 1), (2, 'default', 'b', 1, 1)"))
+        conn.execute(text("INSERT INTO task_dependencies (workspace_id, task_id, depends_on_id) VALUES ('default', 2, 1)"))
+        conn.execute(text("INSERT INTO events (workspace_id, kind, task_id) VALUES ('default', 'task_created', 7)"))
+
+    init_schema(legacy)
+    with legacy.begin() as conn:
+        assert conn.execute(text("SELECT id, title FROM tasks ORDER BY id")).all() == [(1, "a"), (8, "b")]
+        assert conn.execute(text("SELECT task_id, depends_on_id FROM task_dependencies")).all() == [(8, 1)]
+        conn.execute(text("INSERT INTO tasks (workspace_id, title, version, estimate_days) VALUES ('default', 'c', 1, 1)"))
+        assert conn.execute(text("SELECT MAX(id) FROM tasks")).scalar() == 9
+        conn.execute(text("DELETE FROM tasks WHERE id = 9"))
+        conn.execute(text("INSERT INTO tasks (workspace_id, title, version, estimate_days) VALUES ('default', 'd', 1, 1)"))
+        assert conn.execute(text("SELECT MAX(id) FROM tasks")).scalar() == 10
@@ -0,0 +1,112 @@
+# test_dependencies.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import Task, TaskDependency, RecurrenceRule
+from dependencies import add_dependency, remove_dependency, set_estimate, propagate, critical_path, rebuild
+from recurrence import stop_rule
+from writes import complete_task
+
+
+def _task(db, ws, title, days=1.0, **fields):
+    t = Task(workspace_id=ws, title=title, status="next", area="research", estimate_days=days, **fields)
+    db.add(t)
+    db.flush()
+    return t.id
+
+
+def _finish(db, *ids):
+    # propagate() writes with Core UPDATEs, so read the column rather than stale ORM objects
+    rows = dict(db.query(Task.id, Task.earliest_finish).filter(Task.id.in_(ids)))
+    return [rows[i] for i in ids]
+
+
+@pytest.fixture
+def plan(db, ws):
+    """a(2) <- b(3) <- m (milestone) -> c(5): m finishes after max(2 + 3, 5) days."""
+    a, b, c = _task(db, ws, "a", 2), _task(db, ws, "b", 3), _task(db, ws, "c", 5)
+    m = _task(db, ws, "m", 4, is_milestone=True)
+    add_dependency(db, ws, b, a)
+    add_dependency(db, ws, m, b)
+    add_dependency(db, ws, m, c)
+    return a, b, c, m
+
+
+def test_earliest_finish_follows_longest_chain(db, ws, plan):
+    a, b, c, m = plan
+    assert _finish(db, a, b, c, m) == [2.0, 5.0, 5.0, 5.0]
+
+
+def test_estimate_change_propagates_downstream(db, ws, plan):
+    a, b, c, m = plan
+    set_estimate(db, ws, a, 4)
+    assert _finish(db, a, b, c, m) == [4.0, 7.0, 5.0, 7.0]
+    # Only rows whose value moved are written
+    assert propagate(db, ws, [a]) == 0
+
+
+def test_done_tasks_take_no_time(db, ws, plan):
+    a, b, c, m = plan
+    complete_task(db, ws, a)
+    assert _finish(db, a, b, m) == [0.0, 3.0, 5.0]
+    complete_task(db, ws, c)
+    assert _finish(db, m) == [3.0]
+
+
+def test_remove_dependency_reschedules(db, ws, plan):
+    a, b, c, m = plan
+    assert remove_dependency(db, ws, m, c)
+    set_estimate(db, ws, c, 10)
+    assert _finish(db, m) == [5.0]
+
+
+def test_cycles_are_rejected(db, ws, plan):
+    a, b, c, m = plan
+    with pytest.raises(ValueError):
+        add_dependency(db, ws, a, m)
+    with pytest.raises(ValueError):
+        add_dependency(db, ws, a, a)
+    assert not add_dependency(db, ws, b, a)  # already linked
+
+
+def test_rebuild_matches_incremental(db, ws, plan):
+    a, b, c, m = plan
+    before = _finish(db, a, b, c, m)
+    db.query(Task).filter(Task.id.in_(plan)).update({Task.earliest_finish: 99.0}, synchronize_session=False)
+    rebuild(db, ws)
+    assert _finish(db, a, b, c, m) == before
+
+
+def test_critical_path_first_to_do_first(db, ws, plan):
+    a, b, c, m = plan
+    assert [t.id for t in critical_path(db, ws, m)] == [a, b]
+    set_estimate(db, ws, c, 8)
+    assert [t.id for t in critical_path(db, ws, m)] == [c]
+    # Done prerequisites are not on the path
+    complete_task(db, ws, c)
+    assert [t.id for t in critical_path(db, ws, m)] == [a, b]
+    complete_task(db, ws, a)
+    complete_task(db, ws, b)
+    assert critical_path(db, ws, m) == []
+
+
+def test_critical_path_is_workspace_scoped(db, ws, plan):
+    assert critical_path(db, ws + "-other", plan[3]) == []
+
+
+def test_stop_rule_unlinks_dropped_occurrences(db, ws):
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    rule = RecurrenceRule(workspace_id=ws, title="review", freq="daily", starts_at=today)
+    db.add(rule)
+    db.flush()
+    occurrence = _task(db, ws, "review", 2, recurrence_id=rule.id, due_date=today + timedelta(days=1))
+    later = _task(db, ws, "later", 1)
+    add_dependency(db, ws, later, occurrence)
+    assert _finish(db, later) == [3.0]
+
+    assert stop_rule(db, ws, rule.id)
+    db.flush()
+    assert db.query(Task).filter(Task.id == occurrence).count() == 0
+    assert db.query(TaskDependency).filter(TaskDependency.depends_on_id == occurrence).count() == 0
+    assert _finish(db, later) == [1.0]
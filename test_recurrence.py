@@ -0,0 +1,83 @@
+# test_recurrence.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from db import Task
+from events import read_events, TASK_CREATED, TASK_DELETED
+from recurrence import occurrences, describe, materialize, add_rule, stop_rule, _nth
+
+
+def _rule(freq, starts_at, interval=1, until=None):
+    return SimpleNamespace(freq=freq, interval=interval, starts_at=starts_at, until=until)
+
+
+def _walk(rule, start, end):
+    # Reference: every occurrence from starts_at on, no jumping ahead
+    out, k = [], 0
+    while (d := _nth(rule, k)) < end:
+        if d >= start and (rule.until is None or d <= rule.until):
+            out.append(d)
+        k += 1
+    return out
+
+
+def test_weekly_window():
+    rule = _rule("weekly", datetime(2024, 1, 1, 9))
+    assert list(occurrences(rule, datetime(2024, 1, 1), datetime(2024, 1, 22))) == [
+        datetime(2024, 1, 1, 9), datetime(2024, 1, 8, 9), datetime(2024, 1, 15, 9),
+    ]
+
+
+def test_monthly_clamps_to_month_end():
+    rule = _rule("monthly", datetime(2024, 1, 31))
+    assert list(occurrences(rule, datetime(2024, 1, 1), datetime(2024, 5, 1))) == [
+        datetime(2024, 1, 31), datetime(2024, 2, 29), datetime(2024, 3, 31), datetime(2024, 4, 30),
+    ]
+
+
+def test_until_is_inclusive():
+    rule = _rule("daily", datetime(2024, 3, 1), until=datetime(2024, 3, 3))
+    assert list(occurrences(rule, datetime(2024, 3, 1), datetime(2024, 4, 1))) == [
+        datetime(2024, 3, 1), datetime(2024, 3, 2), datetime(2024, 3, 3),
+    ]
+
+
+def test_window_before_start_is_empty():
+    rule = _rule("daily", datetime(2024, 3, 10))
+    assert list(occurrences(rule, datetime(2024, 3, 1), datetime(2024, 3, 10))) == []
+
+
+@pytest.mark.parametrize("freq,interval", [
+    ("daily", 1), ("daily", 3), ("weekly", 1), ("weekly", 2), ("monthly", 1), ("monthly", 5), ("weekly", None),
+])
+def test_jump_ahead_matches_walk(freq, interval):
+    rule = _rule(freq, datetime(2021, 1, 31, 8, 30), interval)
+    for offset in (0, 1, 29, 30, 31, 45, 400, 1000):
+        start = rule.starts_at + timedelta(days=offset, hours=-12)
+        end = start + timedelta(days=70)
+        assert list(occurrences(rule, start, end)) == _walk(rule, start, end), (offset, start)
+
+
+def test_describe():
+    assert describe(_rule("weekly", datetime(2024, 1, 1))) == "every week"
+    assert describe(_rule("monthly", datetime(2024, 1, 1), interval=3)) == "every 3 months"
+
+
+def test_materialized_and_dropped_occurrences_are_in_the_change_feed(db, ws):
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    rule = add_rule(db, ws, title="standup", freq="daily", starts_at=today, area="research")
+    db.commit()
+    n = materialize(db, ws, horizon_days=3)
+    tasks = dict(db.query(Task.id, Task.due_date).filter(Task.workspace_id == ws, Task.recurrence_id == rule.id))
+    assert n == len(tasks) == 3
+
+    created = read_events(db, workspace_id=ws, kinds=[TASK_CREATED])
+    assert sorted(e["task_id"] for e in created) == sorted(tasks)
+    assert all(e["payload"]["title"] == "standup" and e["payload"]["recurrence_id"] == rule.id for e in created)
+
+    assert stop_rule(db, ws, rule.id)
+    db.commit()
+    deleted = read_events(db, workspace_id=ws, kinds=[TASK_DELETED])
+    assert sorted(e["task_id"] for e in deleted) == sorted(tasks)
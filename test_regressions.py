@@ -0,0 +1,71 @@
+# test_regressions.py
+import numpy as np
+import pandas as pd
+
+from regressions import version_steps, flag_regressions, METRICS
+
+
+def _runs(rows):
+    """Rows of (system, name, version, day, sharpe, cagr, max_drawdown), already in run order."""
+    df = pd.DataFrame(rows, columns=["system_id", "name", "code_version", "day", "sharpe", "cagr", "max_drawdown"])
+    df.insert(0, "id", np.arange(1, len(df) + 1))
+    df.insert(3, "period", "")
+    df["run_date"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(df.pop("day"), unit="D")
+    return df.sort_values(["system_id", "name", "period", "run_date", "id"], kind="stable").reset_index(drop=True)
+
+
+def test_each_version_compared_with_the_previous():
+    steps = version_steps(_runs([
+        (1, "mom", "v1", 0, 1.0, 0.10, 0.20),
+        (1, "mom", "v2", 1, 1.2, 0.12, 0.18),
+        (1, "mom", "v3", 2, 0.9, 0.12, 0.25),
+        (1, "rev", "v1", 0, 0.5, 0.05, 0.10),
+    ]))
+    assert list(zip(steps["from_version"], steps["code_version"])) == [("v1", "v2"), ("v2", "v3")]
+    assert np.allclose(steps["sharpe_delta"], [0.2, -0.3])
+    assert np.allclose(steps["sharpe_prev"], [1.0, 1.2])
+
+
+def test_latest_run_stands_for_its_version():
+    steps = version_steps(_runs([
+        (1, "mom", "v1", 0, 1.0, 0.10, 0.20),
+        (1, "mom", "v1", 1, 1.1, 0.11, 0.20),
+        (1, "mom", "v2", 2, 1.5, 0.15, 0.20),
+        (1, "mom", "v2", 3, np.nan, 0.09, 0.20),
+    ]))
+    (step,) = steps.itertuples()
+    assert step.id == 4 and step.sharpe_prev == 1.1
+    # A NULL metric on the latest run stays NULL; it is not filled from an older run
+    assert np.isnan(step.sharpe) and np.isnan(step.sharpe_delta)
+    assert np.isclose(step.cagr_delta, -0.02)
+
+
+def test_versions_ordered_by_first_run():
+    # v1 is rerun after v2 first appeared: v1 still comes first
+    steps = version_steps(_runs([
+        (1, "mom", "v1", 0, 1.0, 0.1, 0.2),
+        (1, "mom", "v2", 1, 2.0, 0.1, 0.2),
+        (1, "mom", "v1", 2, 1.5, 0.1, 0.2),
+    ]))
+    assert list(zip(steps["from_version"], steps["code_version"])) == [("v1", "v2")]
+    assert steps["sharpe_delta"].iloc[0] == 0.5
+
+
+def test_single_versions_and_empty_input():
+    assert version_steps(_runs([(1, "mom", "v1", 0, 1.0, 0.1, 0.2), (2, "mom", "v2", 0, 1.0, 0.1, 0.2)])).empty
+    assert version_steps(_runs([])).empty
+
+
+def test_flags_respect_direction_and_threshold():
+    steps = version_steps(_runs([
+        (1, "mom", "v1", 0, 1.00, 0.100, 0.20),
+        (1, "mom", "v2", 1, 0.95, 0.080, 0.21),
+        (1, "mom", "v3", 2, 0.80, 0.085, 0.25),
+    ]))
+    flags = flag_regressions(steps)
+    assert list(flags.columns) == list(METRICS)
+    assert flags.to_dict("list") == {
+        "sharpe": [False, True],
+        "cagr": [True, False],
+        "max_drawdown": [False, True],
+    }
@@ -0,0 +1,193 @@
+# test_sync.py
+import pytest
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import Session
+
+import sync
+from db import init_schema, Project, Task
+from sync import _pending_changes
+
+
+def _outbox(entries):
+    """In-memory connection with sync_outbox holding (table, row_id, op[, error]) entries in order."""
+    conn = create_engine("sqlite://").connect()
+    conn.execute(text(
+        "CREATE TABLE sync_outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, "
+        "row_id INTEGER NOT NULL, op TEXT NOT NULL, error TEXT)"
+    ))
+    for t, rid, op, *error in entries:
+        conn.execute(
+            text("INSERT INTO sync_outbox (table_name, row_id, op, error) VALUES (:t, :rid, :op, :e)"),
+            {"t": t, "rid": rid, "op": op, "e": error[0] if error else None},
+        )
+    return conn
+
+
+def _actions(changes):
+    return {key: {k for k in ("insert", "update", "remote_delete") if c[k]} for key, c in changes.items()}
+
+
+def test_empty_outbox():
+    assert _pending_changes(_outbox([])) == ({}, 0)
+
+
+def test_ops_collapse_to_one_action_per_row():
+    changes, last_seq = _pending_changes(_outbox([
+        ("tasks", 1, "insert"), ("tasks", 1, "update"), ("tasks", 1, "update"),  # new row, edited
+        ("tasks", 2, "update"), ("tasks", 2, "update"),                          # existing row, edited
+        ("tasks", 3, "update"), ("tasks", 3, "delete"),                          # existing row, deleted
+        ("tasks", 4, "insert"), ("tasks", 4, "delete"),                          # never left the replica
+        ("projects", 1, "update"),                                               # same id, other table
+    ]))
+    assert last_seq == 10
+    assert _actions(changes) == {
+        ("tasks", 1): {"insert"},
+        ("tasks", 2): {"update"},
+        ("tasks", 3): {"remote_delete"},
+        ("tasks", 4): set(),
+        ("projects", 1): {"update"},
+    }
+    assert changes[("tasks", 2)]["first_seq"] == 4
+
+
+def test_delete_then_reinsert_replaces_remote_row():
+    changes, _ = _pending_changes(_outbox([
+        ("tasks", 5, "delete"), ("tasks", 5, "insert"), ("tasks", 5, "update"),
+    ]))
+    assert _actions(changes) == {("tasks", 5): {"remote_delete", "insert"}}
+
+
+def test_rejected_rows_are_skipped():
+    changes, last_seq = _pending_changes(_outbox([
+        ("projects", 7, "insert", "IntegrityError: duplicate name"),
+        ("tasks", 8, "update"),
+    ]))
+    assert set(changes) == {("tasks", 8)}
+    assert last_seq == 2
+
+
+# --------- PUSH / PULL ---------
+# Two SQLite files stand in for the primary and the replica.
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch, ws):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    local = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for e in (primary, local):
+        init_schema(e)
+    monkeypatch.setattr(sync, "engine", local)
+    monkeypatch.setattr(sync, "primary_engine", primary)
+    monkeypatch.setattr(sync, "_primary_ready", False)
+    monkeypatch.setattr(sync, "status", dict(sync.status))
+    monkeypatch.setattr(sync, "WORKSPACE", ws)
+    sync.install()
+    yield primary, local
+    primary.dispose()
+    local.dispose()
+
+
+def _add(engine, ws, title):
+    with Session(engine) as s:
+        t = Task(workspace_id=ws, title=title, status="next")
+        s.add(t)
+        s.commit()
+        return t.id
+
+
+def _titles(engine, ws):
+    with engine.connect() as c:
+        return dict(c.execute(select(Task.id, Task.title).where(Task.workspace_id == ws).order_by(Task.id)).all())
+
+
+def test_local_and_remote_changes_meet(replica, ws):
+    primary, local = replica
+    _add(primary, ws, "remote")
+    sync.sync_once(reconcile=True)
+    assert sync.status["error"] is None
+    _add(local, ws, "local")
+    sync.sync_once()
+    assert sorted(_titles(primary, ws).values()) == sorted(_titles(local, ws).values()) == ["local", "remote"]
+    assert _titles(primary, ws) == _titles(local, ws)
+    assert sync.status["queued"] == 0
+
+
+def test_row_added_during_push_keeps_its_data(replica, ws):
+    primary, local = replica
+    _add(primary, ws, "p1")
+    sync.sync_once(reconcile=True)
+    _add(primary, ws, "p2")           # another device; the primary's next id moves ahead
+    _add(local, ws, "local-A")        # queued, moved to a temporary id when the push starts
+
+    def add_during_round_trip(conn):
+        # The user adds a task while the push talks to the primary; it takes
+        # the id the primary is about to hand local-A
+        if not added:
+            added.append(_add(local, ws, "local-B"))
+
+    added = []
+    event.listen(primary, "begin", add_during_round_trip)
+    sync.sync_once()
+    event.remove(primary, "begin", add_during_round_trip)
+    assert added == [3] and _titles(primary, ws)[3] == "local-A"
+    assert sorted(_titles(local, ws).values()) == ["local-A", "local-B", "p1", "p2"]
+
+    sync.sync_once(reconcile=True)
+    assert sorted(_titles(primary, ws).values()) == ["local-A", "local-B", "p1", "p2"]
+    assert _titles(primary, ws) == _titles(local, ws)
+    assert sync.status["queued"] == 0 and sync.status["error"] is None
+
+
+def test_only_the_owners_workspace_is_replicated(replica, ws):
+    primary, local = replica
+    _add(primary, ws, "mine")
+    _add(primary, ws + "-other", "theirs")
+    stale = _add(local, ws + "-other", "pulled before scoping")
+    with local.begin() as c:
+        c.execute(text("DELETE FROM sync_outbox"))
+    sync.sync_once(reconcile=True)
+    assert list(_titles(local, ws).values()) == ["mine"]
+    assert _titles(local, ws + "-other") == {}
+
+    # A row written locally for someone else is rejected, not pushed
+    _add(local, ws + "-other", "stray")
+    sync.sync_once()
+    assert sorted(_titles(primary, ws + "-other").values()) == ["theirs"]
+    assert "stray" in _titles(local, ws + "-other").values()
+    assert stale not in _titles(local, ws + "-other")
+
+
+def test_pulled_task_changes_bump_the_local_project_version(replica, ws):
+    primary, local = replica
+    with Session(primary) as s:
+        p = Project(workspace_id=ws, name="p")
+        s.add(p)
+        s.commit()
+        pid = p.id
+
+    def version():
+        with local.connect() as c:
+            return c.execute(select(Project.version).where(Project.id == pid)).scalar()
+
+    sync.sync_once(reconcile=True)
+    first = version()
+    with Session(primary) as s:
+        s.add(Task(workspace_id=ws, title="remote", status="next", project_id=pid))
+        s.commit()
+    sync.sync_once()
+    assert version() > first
+    # Rows re-read in the overlap window bump nothing
+    seen = version()
+    sync.sync_once()
+    assert version() == seen
+    # Nor does the primary's lower version come back with the project row
+    with Session(primary) as s:
+        s.get(Project, pid).name = "renamed"
+        s.commit()
+    sync.sync_once()
+    assert version() > seen
+    # A deletion found by reconcile counts too
+    seen = version()
+    with primary.begin() as c:
+        c.execute(text("DELETE FROM tasks WHERE project_id = :id"), {"id": pid})
+    sync.sync_once(reconcile=True)
+    assert version() > seen
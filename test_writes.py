@@ -0,0 +1,148 @@
+# test_writes.py
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from db import SessionLocal, Project, Task
+from writes import (
+    with_retry, add_task, activate_milestone, create_milestone, complete_task, delete_task, _retryable
+)
+
+
+def _active(db, ws):
+    return [i for (i,) in db.query(Task.id).filter(Task.workspace_id == ws, Task.is_active_milestone == True)]
+
+
+def _milestone(db, ws, title, **fields):
+    m = add_task(db, ws, title=title, status="next", is_milestone=True, **fields)
+    db.commit()
+    return m.id
+
+
+def test_activate_switches_the_active_milestone(db, ws):
+    a = create_milestone(db, ws, "a", None, None, active=True).id
+    b = _milestone(db, ws, "b")
+    db.commit()
+    assert _active(db, ws) == [a]
+    version = db.query(Task.version).filter(Task.id == a).scalar()
+
+    assert with_retry(db, lambda db: activate_milestone(db, ws, b))
+    assert _active(db, ws) == [b]
+    assert db.query(Task.version).filter(Task.id == a).scalar() == version + 1
+
+
+def test_activate_refuses_done_tasks_and_keeps_the_current_one(db, ws):
+    a = _milestone(db, ws, "a")
+    done = _milestone(db, ws, "done")
+    plain = add_task(db, ws, title="plain", status="next").id
+    with_retry(db, lambda db: activate_milestone(db, ws, a))
+    with_retry(db, lambda db: complete_task(db, ws, done))
+    for target in (done, plain, a, 10 ** 9):
+        assert not with_retry(db, lambda db: activate_milestone(db, ws, target))
+    assert _active(db, ws) == [a]
+    # Other workspaces keep their own
+    other = _milestone(db, ws + "-other", "x")
+    assert with_retry(db, lambda db: activate_milestone(db, ws + "-other", other))
+    assert _active(db, ws) == [a]
+
+
+def test_only_the_milestone_race_is_retryable(db, ws):
+    _milestone(db, ws, "a", is_active_milestone=True)
+    db.add(Task(workspace_id=ws, title="b", is_milestone=True, is_active_milestone=True))
+    with pytest.raises(IntegrityError) as race:
+        db.commit()
+    db.rollback()
+    assert _retryable(race.value)
+
+    db.add(Task(workspace_id=ws, title="c", status="Bogus"))
+    with pytest.raises(IntegrityError) as check:
+        db.commit()
+    db.rollback()
+    assert not _retryable(check.value)
+
+
+def test_with_retry_replays_transient_errors():
+    calls = []
+
+    class FakeSession:
+        def commit(self):
+            pass
+
+        def rollback(self):
+            calls.append("rollback")
+
+    def flaky(db):
+        calls.append("apply")
+        if calls.count("apply") < 3:
+            raise OperationalError("UPDATE", {}, Exception("database is locked"))
+        return "ok"
+
+    assert with_retry(FakeSession(), flaky, base_delay=0) == "ok"
+    assert calls == ["apply", "rollback", "apply", "rollback", "apply"]
+
+    # Gives up after `attempts`, raising the last error
+    calls.clear()
+
+    def locked(db):
+        calls.append("apply")
+        raise OperationalError("UPDATE", {}, Exception("database is locked"))
+
+    with pytest.raises(OperationalError):
+        with_retry(FakeSession(), locked, attempts=2, base_delay=0)
+    assert calls.count("apply") == 2
+
+    # Anything else is raised at once
+    calls.clear()
+
+    def broken(db):
+        calls.append("apply")
+        raise OperationalError("SELECT", {}, Exception("no such table: tasks"))
+
+    with pytest.raises(OperationalError):
+        with_retry(FakeSession(), broken, base_delay=0)
+    assert calls == ["apply", "rollback"]
+
+
+def test_stale_version_is_replayed_from_fresh_state(db, ws):
+    t = add_task(db, ws, title="draft", status="next", description="")
+    db.commit()
+    other = SessionLocal()
+    attempts = []
+
+    def append_note(db):
+        task = db.get(Task, t.id)
+        if not attempts:
+            # Someone else edits the task between our read and our write
+            theirs = other.get(Task, t.id)
+            theirs.description += "theirs;"
+            other.commit()
+        attempts.append(task.version)
+        task.description += "mine;"
+
+    try:
+        with_retry(db, append_note, base_delay=0)
+    finally:
+        other.close()
+    assert len(attempts) == 2
+    db.expire_all()
+    assert db.get(Task, t.id).description == "theirs;mine;"
+
+
+def test_task_writes_bump_their_projects_version(db, ws):
+    mine, other = Project(workspace_id=ws, name="mine"), Project(workspace_id=ws, name="other")
+    db.add_all([mine, other])
+    db.commit()
+    stamp = mine.updated_at
+
+    def versions():
+        db.expire_all()
+        return db.get(Project, mine.id).version, db.get(Project, other.id).version
+
+    t = add_task(db, ws, title="a", status="next", project_id=mine.id)
+    db.commit()
+    assert versions() == (2, 1)
+    with_retry(db, lambda db: complete_task(db, ws, t.id))
+    assert versions() == (3, 1)
+    with_retry(db, lambda db: delete_task(db, ws, t.id))
+    assert versions() == (4, 1)
+    # Not an edit of the project itself
+    assert db.get(Project, mine.id).updated_at == stamp
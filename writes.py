@@ -0,0 +1,135 @@
+# writes.py
+# Conflict-safe write paths for the dashboard.
+# Each operation re-reads what it changes inside the transaction, so it can be
+# replayed by with_retry() after a lock error, a StaleDataError (Task.version
+# moved underneath us) or the one-active-milestone index rejecting a race.
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import update, exists, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.exc import StaleDataError
+
+from db import scoped, touch_projects, Task
+from dependencies import propagate, detach
+from events import (
+    record_event, record_task_created, set_task_status,
+    TASK_DELETED, MILESTONE_ACTIVATED
+)
+
+# What a caller may see once retries are exhausted
+CONFLICT_ERRORS = (OperationalError, IntegrityError, StaleDataError)
+
+_TRANSIENT_MESSAGES = ("database is locked", "database is busy", "deadlock", "could not serialize")
+
+# The only integrity error a replay can fix: another session activated a
+# milestone first. SQLite names the indexed column rather than the index.
+_RACE_CONSTRAINTS = ("uq_tasks_ws_active_milestone", "unique constraint failed: tasks.workspace_id")
+
+
+def _retryable(exc):
+    text = str(getattr(exc, "orig", None) or exc).lower()
+    if isinstance(exc, OperationalError):
+        return any(m in text for m in _TRANSIENT_MESSAGES)
+    if isinstance(exc, IntegrityError):
+        # CHECK, NOT NULL and other unique violations fail the same way every time
+        return any(c in text for c in _RACE_CONSTRAINTS)
+    return isinstance(exc, StaleDataError)
+
+
+def with_retry(db, apply, attempts=3, base_delay=0.05):
+    """Run `apply(db)` and commit, replaying it on transient conflicts.
+
+    Backoff is exponential with jitter so competing sessions don't retry in
+    lockstep; after `attempts` tries the last error is raised.
+    """
+    for attempt in range(attempts):
+        try:
+            result = apply(db)
+            db.commit()
+            return result
+        except CONFLICT_ERRORS as e:
+            db.rollback()
+            if attempt == attempts - 1 or not _retryable(e):
+                raise
+            time.sleep(base_delay * (2 ** attempt) * (0.5 + random.random()))
+
+
+def add_task(db, ws, **fields):
+    t = Task(workspace_id=ws, **fields)
+    db.add(t)
+    record_task_created(db, t)
+    touch_projects(db, ws, [t.project_id])
+    return t
+
+
+def complete_task(db, ws, task_id):
+    """Mark a task (or milestone) done; a no-op if someone already did."""
+    t = scoped(db, Task, ws).filter(Task.id == task_id).first()
+    if t is None or t.status == "done":
+        return False
+    set_task_status(db, t, "done")
+    t.is_active_milestone = False
+    propagate(db, ws, [t.id])
+    touch_projects(db, ws, [t.project_id])
+    return True
+
+
+def delete_task(db, ws, task_id):
+    t = scoped(db, Task, ws).filter(Task.id == task_id).first()
+    if t is None:
+        return False
+    record_event(db, ws, TASK_DELETED, t.id, t.project_id, title=t.title)
+    detach(db, ws, [t.id])
+    touch_projects(db, ws, [t.project_id])
+    db.delete(t)
+    return True
+
+
+def activate_milestone(db, ws, task_id):
+    """Make `task_id` the workspace's only active milestone.
+
+    Two guarded UPDATEs in one transaction (both bump versions): the current
+    active milestone is switched off only if the target is still an open
+    milestone, then the target is switched on. The unique index is checked
+    row by row, so off-then-on is the order that can never trip it; a
+    concurrent activation elsewhere surfaces as IntegrityError and is retried.
+    """
+    target = aliased(Task)
+    target_open = exists(select(target.id).where(
+        target.id == task_id, target.workspace_id == ws,
+        target.is_milestone == True, target.status != "done",
+    ))
+    db.execute(
+        update(Task)
+        .where(Task.workspace_id == ws, Task.is_active_milestone == True, Task.id != task_id, target_open)
+        .values(is_active_milestone=False, version=Task.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(
+        update(Task)
+        .where(
+            Task.workspace_id == ws, Task.id == task_id,
+            Task.is_milestone == True, Task.status != "done",
+            Task.is_active_milestone.isnot(True),
+        )
+        .values(is_active_milestone=True, version=Task.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        return False
+    record_event(db, ws, MILESTONE_ACTIVATED, task_id)
+    return True
+
+
+def create_milestone(db, ws, title, description, due_date, active):
+    m = add_task(
+        db, ws, title=title, description=description, due_date=due_date,
+        is_milestone=True, is_active_milestone=False, status="next",
+        created_at=datetime.now(),
+    )
+    if active:
+        activate_milestone(db, ws, m.id)
+    return m